@@ -22,7 +22,10 @@ import yaml
 import tarfile
 import hashlib
 import re
+import bisect
+import fnmatch
 import subprocess
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Tuple, Optional
@@ -31,6 +34,34 @@ import shutil
 # Maximum file size for AI upload (in bytes) - 10MB default
 MAX_AI_FILE_SIZE = 10 * 1024 * 1024
 
+# Chunk size for streamed file hashing (1 MiB)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Files/directories excluded from config export, split by match cost:
+# plain suffixes and exact names are checked with C-level str operations,
+# only the remaining globs go through a single precompiled regex
+EXCLUDE_SUFFIXES = (".db", ".db-wal", ".db-shm", ".log", ".sqlite")
+EXCLUDE_NAMES = frozenset({".cloud", "deps", "tts", "__pycache__", ".DS_Store"})
+EXCLUDE_GLOBS = ("home-assistant.log*", "home-assistant_v2.db*", ".storage/lovelace*")
+EXCLUDE_GLOB_RE = re.compile("|".join(fnmatch.translate(glob) for glob in EXCLUDE_GLOBS))
+
+# Literal substrings (lowercase) that must be present for a sensitive pattern to match.
+# Patterns whose anchors are all absent are skipped without invoking the regex engine.
+SENSITIVE_ANCHORS = {
+    "password": ("password",),
+    "token": ("token",),
+    "api_key": ("api",),
+    "secret": ("secret",),
+    "webhook": ("webhook",),
+    "latitude": ("latitude",),
+    "longitude": ("longitude",),
+    "email": ("@",),
+    "ip_address": (".",),
+    "mac_address": (":", "-"),
+    "ssid": ("ssid",),
+    "username": ("username",),
+}
+
 
 class HAConfigExporter:
     def __init__(self, output_dir="/tmp/ha_export"):
@@ -70,6 +101,9 @@ class HAConfigExporter:
             "username": r'username["\']?\s*[:=]\s*["\']?([^"\'}\s,]+)',
         }
 
+        # Field names whose values are sensitive regardless of content (used by sanitize_obj)
+        self.sensitive_keys = ("password", "token", "api_key", "secret", "latitude", "longitude", "ssid", "username")
+
         # HA paths to export
         self.config_paths = {
             "config": "/config",
@@ -92,8 +126,12 @@ class HAConfigExporter:
         with open(os.path.join(self.secrets_path, ".gitignore"), "w") as f:
             f.write("# Never commit secrets\n*\n!.gitignore\n")
 
-    def run_command(self, cmd, shell=True):
-        """Run shell command and return output"""
+    def run_command(self, cmd, shell=False):
+        """Run command and return output
+
+        cmd is an argv list; it is executed directly without spawning /bin/sh
+        unless shell=True is passed explicitly.
+        """
         try:
             result = subprocess.run(cmd, shell=shell, capture_output=True, text=True, timeout=30)
             return result.stdout, result.stderr, result.returncode
@@ -110,31 +148,123 @@ class HAConfigExporter:
         self.secrets_map[value] = placeholder
         return placeholder
 
+    def is_excluded(self, rel_path):
+        """Check whether a config-relative path matches the export exclude list"""
+        name = os.path.basename(rel_path)
+        if name.endswith(EXCLUDE_SUFFIXES) or name in EXCLUDE_NAMES:
+            return True
+        return EXCLUDE_GLOB_RE.match(rel_path.replace(os.sep, "/")) is not None
+
     def sanitize_text(self, text, filename=""):
         """Replace sensitive data with placeholders"""
         if not isinstance(text, str):
             return text
 
         sanitized = text
+        lowered = text.lower()
 
         # Apply all sensitive patterns
         for secret_type, pattern in self.sensitive_patterns.items():
+            # Cheap substring prefilter: skip patterns that cannot possibly match
+            anchors = SENSITIVE_ANCHORS.get(secret_type)
+            if anchors and not any(anchor in lowered for anchor in anchors):
+                continue
             matches = re.finditer(pattern, sanitized, re.IGNORECASE)
             for match in matches:
-                if match.groups():
-                    original_value = match.group(1) if len(match.groups()) > 0 else match.group(0)
-                    # Skip obvious placeholders and examples
-                    if any(x in original_value.lower() for x in ["example", "placeholder", "xxx", "***"]):
-                        continue
-                    if len(original_value) < 3:  # Skip very short matches
-                        continue
-                    placeholder = self.generate_secret_placeholder(secret_type, original_value)
-                    sanitized = sanitized.replace(original_value, placeholder)
+                replacement = self._match_replacement(secret_type, match)
+                if replacement:
+                    sanitized = sanitized.replace(*replacement)
 
         return sanitized
 
-    def export_yaml_file(self, source_path, dest_path):
-        """Export and sanitize YAML file"""
+    def _match_replacement(self, secret_type, match):
+        """Return (value, placeholder) for a pattern match, or None if it is not a secret"""
+        if not match.groups():
+            return None
+        original_value = match.group(1) if len(match.groups()) > 0 else match.group(0)
+        # Skip obvious placeholders and examples
+        if any(x in original_value.lower() for x in ["example", "placeholder", "xxx", "***"]):
+            return None
+        if len(original_value) < 3:  # Skip very short matches
+            return None
+        return original_value, self.generate_secret_placeholder(secret_type, original_value)
+
+    def sanitize_many(self, texts):
+        """Sanitize a list of short strings, scanning them joined once per pattern
+
+        Values are joined with a unit separator so each pattern runs over all
+        of them in one regex pass. Each replacement is applied only to the value
+        its match came from, so a secret found in one value never rewrites the
+        same substring in another. Non-string values are returned unchanged.
+        """
+        separator = "\x1f"
+        strings = [t for t in texts if isinstance(t, str)]
+        if not strings:
+            return list(texts)
+
+        parts = None
+        if not any(separator in t for t in strings):
+            parts = self._sanitize_joined(strings, separator)
+        if parts is None:
+            # A value contained the separator, or a match spanned two values
+            parts = [self.sanitize_text(t) for t in strings]
+
+        sanitized = iter(parts)
+        return [next(sanitized) if isinstance(t, str) else t for t in texts]
+
+    def _sanitize_joined(self, strings, separator):
+        """Sanitize strings via joined scans; None if a match crosses a separator"""
+        parts = list(strings)
+        lowered = [t.lower() for t in strings]
+        lowered_joined = separator.join(lowered)
+        for secret_type, pattern in self.sensitive_patterns.items():
+            anchors = SENSITIVE_ANCHORS.get(secret_type)
+            if anchors and not any(anchor in lowered_joined for anchor in anchors):
+                continue
+            # Offset of each value within the joined string, to map matches back
+            joined = separator.join(parts)
+            offsets = [0]
+            for part in parts[:-1]:
+                offsets.append(offsets[-1] + len(part) + 1)
+            for match in re.finditer(pattern, joined, re.IGNORECASE):
+                if separator in match.group(0):
+                    return None
+                index = bisect.bisect_right(offsets, match.start()) - 1
+                # Same prefilter as sanitize_text, judged per value
+                if anchors and not any(anchor in lowered[index] for anchor in anchors):
+                    continue
+                replacement = self._match_replacement(secret_type, match)
+                if replacement:
+                    parts[index] = parts[index].replace(*replacement)
+        return parts
+
+    def sanitize_obj(self, obj, key=""):
+        """Sanitize a parsed JSON structure field by field
+
+        Only string leaves are run through sanitize_text, and values stored under
+        a sensitive field name are replaced outright, so the structure never has
+        to be serialized and scanned as one large document.
+        """
+        if isinstance(obj, dict):
+            return {k: self.sanitize_obj(v, str(k)) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.sanitize_obj(v, key) for v in obj]
+        if isinstance(obj, bool) or obj is None:
+            return obj
+
+        key_lower = key.lower()
+        if isinstance(obj, (str, int, float)) and key_lower:
+            for secret_type in self.sensitive_keys:
+                if secret_type in key_lower:
+                    value = str(obj)
+                    if len(value) < 3 or any(x in value.lower() for x in ["example", "placeholder", "xxx", "***"]):
+                        return obj
+                    return self.generate_secret_placeholder(secret_type, value)
+
+        return self.sanitize_text(obj)
+
+    def export_text_file(self, source_path, dest_path):
+        """Export and sanitize a text file (YAML, JSON, ...)"""
         try:
             with open(source_path, "r", encoding="utf-8") as f:
                 content = f.read()
@@ -150,22 +280,9 @@ class HAConfigExporter:
             print(f"  Error exporting {source_path}: {e}")
             return False
 
-    def export_json_file(self, source_path, dest_path):
-        """Export and sanitize JSON file"""
-        try:
-            with open(source_path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            sanitized = self.sanitize_text(content, os.path.basename(source_path))
-
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            with open(dest_path, "w", encoding="utf-8") as f:
-                f.write(sanitized)
-
-            return True
-        except Exception as e:
-            print(f"  Error exporting {source_path}: {e}")
-            return False
+    # YAML and JSON files are sanitized identically
+    export_yaml_file = export_text_file
+    export_json_file = export_text_file
 
     def export_entities_registry(self):
         """Export entities from core.entity_registry - stores in memory for AI context"""
@@ -189,41 +306,49 @@ class HAConfigExporter:
                 entities = registry.get("data", {}).get("entities", [])
                 self.entities_data["total_entities"] = len(entities)
 
+                entities_by_domain = defaultdict(list)
+                entities_by_platform = defaultdict(list)
+
+                # Bind hot-path list appends once instead of re-resolving them per entity
+                add_entity_id = self.entities_data["all_entity_ids"].append
+                add_entity_detail = self.entities_data["entity_details"].append
+                add_disabled = self.entities_data["disabled_entities"].append
+
                 for entity in entities:
-                    entity_id = entity.get("entity_id", "")
-                    domain = entity_id.split(".")[0] if "." in entity_id else "unknown"
-                    platform = entity.get("platform", "unknown")
+                    get = entity.get
+                    entity_id = get("entity_id", "")
+                    domain = entity_id.split(".", 1)[0] if "." in entity_id else "unknown"
+                    platform = get("platform", "unknown")
+                    disabled_by = get("disabled_by")
 
                     # Add to compact ID list
-                    self.entities_data["all_entity_ids"].append(entity_id)
+                    add_entity_id(entity_id)
 
                     # Detailed entity info
-                    entity_detail = {
-                        "entity_id": entity_id,
-                        "domain": domain,
-                        "platform": platform,
-                        "name": entity.get("name"),
-                        "original_name": entity.get("original_name"),
-                        "disabled": entity.get("disabled_by") is not None,
-                        "hidden": entity.get("hidden_by") is not None,
-                        "device_id": entity.get("device_id"),
-                        "device_class": entity.get("original_device_class"),
-                    }
-                    self.entities_data["entity_details"].append(entity_detail)
-
-                    # Count by domain
-                    if domain not in self.entities_data["entities_by_domain"]:
-                        self.entities_data["entities_by_domain"][domain] = []
-                    self.entities_data["entities_by_domain"][domain].append(entity_id)
+                    add_entity_detail(
+                        {
+                            "entity_id": entity_id,
+                            "domain": domain,
+                            "platform": platform,
+                            "name": get("name"),
+                            "original_name": get("original_name"),
+                            "disabled": disabled_by is not None,
+                            "hidden": get("hidden_by") is not None,
+                            "device_id": get("device_id"),
+                            "device_class": get("original_device_class"),
+                        }
+                    )
 
-                    # Count by platform
-                    if platform not in self.entities_data["entities_by_platform"]:
-                        self.entities_data["entities_by_platform"][platform] = []
-                    self.entities_data["entities_by_platform"][platform].append(entity_id)
+                    # Group by domain and platform
+                    entities_by_domain[domain].append(entity_id)
+                    entities_by_platform[platform].append(entity_id)
 
                     # Track disabled
-                    if entity.get("disabled_by"):
-                        self.entities_data["disabled_entities"].append(entity_id)
+                    if disabled_by:
+                        add_disabled(entity_id)
+
+                self.entities_data["entities_by_domain"] = dict(entities_by_domain)
+                self.entities_data["entities_by_platform"] = dict(entities_by_platform)
 
                 print(f"✓ Collected {self.entities_data['total_entities']} entities")
                 print(
@@ -268,7 +393,7 @@ class HAConfigExporter:
                     # Store state value
                     states_data["state_values"][entity_id] = {
                         "state": state_value,
-                        "attributes": state.get("attributes", {}),
+                        "attributes": self.sanitize_obj(state.get("attributes", {})),
                     }
 
                     # Count by domain
@@ -308,6 +433,9 @@ class HAConfigExporter:
                 devices = registry.get("data", {}).get("devices", [])
                 self.devices_data["total_devices"] = len(devices)
 
+                devices_by_manufacturer = Counter()
+                devices_by_integration = Counter()
+
                 for device in devices:
                     manufacturer = device.get("manufacturer", "Unknown")
 
@@ -317,22 +445,25 @@ class HAConfigExporter:
 
                     device_info = {
                         "id": device.get("id"),
-                        "name": self.sanitize_text(device.get("name", "")),
+                        "name": device.get("name", ""),
                         "manufacturer": manufacturer,
                         "model": device.get("model"),
                         "integration": integration,
                     }
                     self.devices_data["device_list"].append(device_info)
 
-                    # Count by manufacturer
-                    if manufacturer not in self.devices_data["devices_by_manufacturer"]:
-                        self.devices_data["devices_by_manufacturer"][manufacturer] = 0
-                    self.devices_data["devices_by_manufacturer"][manufacturer] += 1
+                    # Count by manufacturer and integration
+                    devices_by_manufacturer[manufacturer] += 1
+                    devices_by_integration[integration] += 1
 
-                    # Count by integration
-                    if integration not in self.devices_data["devices_by_integration"]:
-                        self.devices_data["devices_by_integration"][integration] = 0
-                    self.devices_data["devices_by_integration"][integration] += 1
+                # Sanitize all device names in one pass instead of once per device
+                device_list = self.devices_data["device_list"]
+                names = self.sanitize_many([info["name"] for info in device_list])
+                for device_info, name in zip(device_list, names):
+                    device_info["name"] = name
+
+                self.devices_data["devices_by_manufacturer"] = dict(devices_by_manufacturer)
+                self.devices_data["devices_by_integration"] = dict(devices_by_integration)
 
                 print(f"✓ Collected {self.devices_data['total_devices']} devices")
                 print(f"  - Manufacturers: {len(self.devices_data['devices_by_manufacturer'])}")
@@ -351,23 +482,6 @@ class HAConfigExporter:
         print("\n=== Exporting Configuration Files ===")
         config_dir = "/config"
 
-        # Files to exclude
-        exclude_patterns = [
-            "*.db",
-            "*.db-wal",
-            "*.db-shm",
-            "*.log",
-            "home-assistant.log*",
-            "home-assistant_v2.db*",
-            "*.sqlite",
-            ".cloud",
-            ".storage/lovelace*",
-            "deps",
-            "tts",
-            "__pycache__",
-            ".DS_Store",
-        ]
-
         exported_count = 0
 
         # Collect automations
@@ -423,8 +537,12 @@ class HAConfigExporter:
         if os.path.exists(packages_dir):
             packages_content = []
             for root, dirs, files in os.walk(packages_dir):
+                # Exclude globs match config-relative paths, not bare names
+                config_rel_root = os.path.relpath(root, config_dir)
+                # Prune excluded directories so os.walk never descends into them
+                dirs[:] = [d for d in dirs if not self.is_excluded(os.path.join(config_rel_root, d))]
                 for file in files:
-                    if file.endswith((".yaml", ".yml")):
+                    if file.endswith((".yaml", ".yml")) and not self.is_excluded(os.path.join(config_rel_root, file)):
                         try:
                             file_path = os.path.join(root, file)
                             rel_path = os.path.relpath(file_path, packages_dir)
@@ -470,7 +588,9 @@ class HAConfigExporter:
         }
 
         # Get list of installed add-ons via API
-        stdout, _, _ = self.run_command("ha addons --raw-json 2>/dev/null || echo '{}'")
+        stdout, _, code = self.run_command(["ha", "addons", "--raw-json"])
+        if code != 0:
+            stdout = ""
         try:
             addons_info = json.loads(stdout) if stdout.strip() else {}
             if "data" in addons_info and "addons" in addons_info["data"]:
@@ -500,7 +620,7 @@ class HAConfigExporter:
         }
 
         # Get HA version
-        stdout, _, code = self.run_command("ha core info --raw-json")
+        stdout, _, code = self.run_command(["ha", "core", "info", "--raw-json"])
         if code == 0:
             try:
                 info = json.loads(stdout)
@@ -509,7 +629,7 @@ class HAConfigExporter:
                 pass
 
         # Get supervisor version
-        stdout, _, code = self.run_command("ha supervisor info --raw-json")
+        stdout, _, code = self.run_command(["ha", "supervisor", "info", "--raw-json"])
         if code == 0:
             try:
                 info = json.loads(stdout)
@@ -928,8 +1048,12 @@ These files are sanitized and safe to upload to AI assistants.
 
         full_size_mb = os.path.getsize(full_tarball_path) / (1024 * 1024)
 
+        # Hash in fixed-size chunks so large archives are never fully loaded into memory
+        sha256 = hashlib.sha256()
         with open(full_tarball_path, "rb") as f:
-            file_hash = hashlib.sha256(f.read()).hexdigest()
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        file_hash = sha256.hexdigest()
 
         print(f"✓ Created full archive: {full_tarball_path}")
         print(f"  Size: {full_size_mb:.2f} MB")
@@ -6,154 +6,479 @@ Verifies completeness of exported configuration
 
 import os
 import sys
+import io
+import heapq
+import functools
 import json
 import tarfile
-from pathlib import Path
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Any, List
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import msgspec
+
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+
+# JSON files read by the verify_* checks, relative to the export root
+EXPORT_JSON_FILES = {
+    "entities": "diagnostics/entities_registry.json",
+    "devices": "diagnostics/devices_registry.json",
+    "integrations": "diagnostics/integrations.json",
+    "secrets": "secrets/secrets_map.json",
+    "addons": "addons/addons_summary.json",
+}
+
+
+# Summary lines of the verification report: (stats section, line template)
+REPORT_SCHEMA = [
+    ("entities", "  Entities: {total} ({active} active)"),
+    ("devices", "  Devices: {total}"),
+    ("integrations", "  Integrations: {configured}"),
+    ("integrations", "  Custom Components: {custom}"),
+    ("addons", "  Add-ons: {total}"),
+    ("config_files", "  Config Files: {yaml} YAML, {json} JSON"),
+    ("secrets", "  Secrets Replaced: {total}"),
+]
+
+
+if MSGSPEC_AVAILABLE:
+    # Partial schemas for the list-shaped exports: msgspec decodes straight into
+    # these, skipping undeclared fields instead of building a dict per record.
+    # Fields default to UNSET so missing keys fall back to the callers' defaults.
+
+    class Addon(msgspec.Struct):
+        name: Any = msgspec.UNSET
+        version: Any = msgspec.UNSET
+        state: Any = msgspec.UNSET
+
+    class Integration(msgspec.Struct):
+        domain: Any = msgspec.UNSET
+        title: Any = msgspec.UNSET
+
+    class AddonsSummary(msgspec.Struct):
+        installed_addons: List[Addon] = []
+
+    class IntegrationsSummary(msgspec.Struct):
+        configured_integrations: List[Integration] = []
+        # Only counted, so items are kept as undecoded raw JSON
+        custom_components: List[msgspec.Raw] = []
+
+    MSGSPEC_SCHEMAS = {
+        EXPORT_JSON_FILES["addons"]: AddonsSummary,
+        EXPORT_JSON_FILES["integrations"]: IntegrationsSummary,
+    }
+else:
+    MSGSPEC_SCHEMAS = {}
+
+
+def _struct_to_dict(item):
+    """Convert a decoded record back to a dict, dropping fields absent from the JSON"""
+    if not isinstance(item, msgspec.Struct):
+        return item
+    return {field: value for field, value in msgspec.structs.asdict(item).items() if value is not msgspec.UNSET}
+
+
+class ArchiveEntry:
+    """DirEntry-like view of a tarball member (stat() exposes st_size only)"""
+
+    def __init__(self, name, path, is_dir, size=0):
+        self.name = name
+        self.path = path
+        self.st_size = size
+        self._is_dir = is_dir
+
+    def is_dir(self):
+        return self._is_dir
+
+    def is_file(self):
+        return not self._is_dir
+
+    def stat(self):
+        return self
+
+
+class ArchiveIndex:
+    """In-memory index of an export tarball, built in one streaming pass
+
+    Member names and sizes are recorded for every entry, but only the files
+    the verifier parses are read into memory - nothing is written to disk.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.children = defaultdict(dict)
+        self.contents = {}
+
+    def _add(self, rel_path, is_dir, size):
+        parent, _, name = rel_path.rpartition("/")
+        self.children[parent][name] = ArchiveEntry(name, rel_path, is_dir, size)
+        # Register implied parent directories (tar members may omit them),
+        # stopping at the first one already indexed
+        while parent:
+            grandparent, _, parent_name = parent.rpartition("/")
+            if parent_name in self.children[grandparent]:
+                break
+            self.children[grandparent][parent_name] = ArchiveEntry(parent_name, parent, True)
+            parent = grandparent
+
+    @classmethod
+    def from_tarball(cls, tarball_path, load_paths=()):
+        """Index a tarball, keeping the contents of load_paths (relative to the export root)"""
+        index = cls()
+        load_paths = set(load_paths)
+        with tarfile.open(tarball_path, "r|*") as tar:
+            for member in tar:
+                name = member.name[2:] if member.name.startswith("./") else member.name
+                root, _, rel_path = name.partition("/")
+                if index.root is None:
+                    index.root = root
+                rel_path = rel_path.rstrip("/")
+                if root != index.root or not rel_path:
+                    continue
+                index._add(rel_path, member.isdir(), member.size)
+                if member.isfile() and rel_path in load_paths:
+                    index.contents[rel_path] = tar.extractfile(member).read()
+        return index
+
+    def exists(self, rel_path):
+        parent, _, name = rel_path.rpartition("/")
+        return name in self.children.get(parent, {})
+
+    def scandir(self, rel_dir):
+        if rel_dir and not self.exists(rel_dir):
+            raise FileNotFoundError(rel_dir)
+        return list(self.children.get(rel_dir, {}).values())
+
+    def walk_files(self, rel_dir):
+        for entry in self.scandir(rel_dir):
+            if entry.is_dir():
+                yield from self.walk_files(entry.path)
+            else:
+                yield entry.name
+
+    def open(self, rel_path):
+        if rel_path not in self.contents:
+            raise FileNotFoundError(rel_path)
+        return io.BytesIO(self.contents[rel_path])
+
+
+def _field_counts(data):
+    """Map each top-level field to its length (lists/dicts) or its value (scalars)"""
+    return {key: len(value) if isinstance(value, (list, dict)) else value for key, value in data.items()}
+
+
+def _parse_json(f):
+    """Parse JSON from a binary file object"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(f.read())
+    return json.load(f)
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_json_file(path, mtime_ns, size):
+    """Parse a JSON file; mtime_ns/size are part of the cache key only"""
+    with open(path, "rb") as f:
+        return _parse_json(f)
 
 
 class ExportVerifier:
-    def __init__(self, export_path):
+    def __init__(self, export_path, archive=None):
         self.export_path = export_path
+        self.archive = archive
         self.issues = []
         self.warnings = []
         self.stats = {}
+        self._local = threading.local()
+
+        # Absolute paths are fixed per instance - build the known ones once
+        self._paths = {"": export_path}
+        for rel_path in ("config", "config/.storage", *EXPORT_JSON_FILES.values()):
+            self._paths[rel_path] = os.path.join(export_path, rel_path)
+
+    def _abspath(self, rel_path):
+        """Return the absolute path for a path relative to the export root"""
+        path = self._paths.get(rel_path)
+        if path is None:
+            path = self._paths[rel_path] = os.path.join(self.export_path, rel_path)
+        return path
+
+    def _print(self, line=""):
+        """Print a line, or buffer it when running inside _run_check"""
+        output = getattr(self._local, "output", None)
+        if output is None:
+            print(line)
+        else:
+            output.append(line)
+
+    def _add_issue(self, issue):
+        """Record a critical issue (buffered when running inside _run_check)"""
+        issues = getattr(self._local, "issues", None)
+        (self.issues if issues is None else issues).append(issue)
+
+    def _add_warning(self, warning):
+        """Record a warning (buffered when running inside _run_check)"""
+        warnings = getattr(self._local, "warnings", None)
+        (self.warnings if warnings is None else warnings).append(warning)
+
+    def _run_check(self, check):
+        """Run a verify_* check, collecting its output, issues and warnings per thread"""
+        local = self._local
+        local.output, local.issues, local.warnings = [], [], []
+        try:
+            result = check()
+            return result, local.output, local.issues, local.warnings
+        finally:
+            local.output = local.issues = local.warnings = None
+
+    def _open(self, rel_path):
+        """Open a file relative to the export root for binary reading"""
+        if self.archive is not None:
+            return self.archive.open(rel_path)
+        return open(self._abspath(rel_path), "rb")
+
+    def _scandir(self, rel_dir):
+        """Return {name: DirEntry-like} for the direct children of an export directory"""
+        if self.archive is not None:
+            return {entry.name: entry for entry in self.archive.scandir(rel_dir)}
+        with os.scandir(self._abspath(rel_dir)) as it:
+            return {entry.name: entry for entry in it}
+
+    def _walk_files(self, rel_dir):
+        """Yield the names of all files below an export directory"""
+        if self.archive is not None:
+            yield from self.archive.walk_files(rel_dir)
+            return
+        for _, _, files in os.walk(self._abspath(rel_dir)):
+            yield from files
+
+    def _load_json(self, path):
+        """Load a JSON file, using orjson when available and stdlib json otherwise
+
+        Files on disk are parsed through _cached_json_file, so checks sharing a
+        file share one parse. The result may be shared - treat it as read-only.
+        """
+        if self.archive is None:
+            abs_path = self._abspath(path)
+            st = os.stat(abs_path)
+            return _cached_json_file(abs_path, st.st_mtime_ns, st.st_size)
+        with self._open(path) as f:
+            return _parse_json(f)
+
+    def _load_list_heads(self, path, limits):
+        """Return {key: (first items, total length)} for top-level lists in a JSON file
+
+        With msgspec installed, known exports are decoded into partial structs
+        (see MSGSPEC_SCHEMAS). With ijson installed the document is stream-parsed
+        once: only the first `limit` items of each list are materialized, the
+        rest are just counted from parser events. Otherwise the document is
+        loaded via _load_json.
+        """
+        schema = MSGSPEC_SCHEMAS.get(path)
+        if schema is not None:
+            with self._open(path) as f:
+                doc = msgspec.json.decode(f.read(), type=schema)
+            result = {}
+            for key, limit in limits.items():
+                items = getattr(doc, key)
+                result[key] = ([_struct_to_dict(item) for item in items[:limit]], len(items))
+            return result
+
+        if not IJSON_AVAILABLE:
+            data = self._load_json(path)
+            result = {}
+            for key, limit in limits.items():
+                items = data.get(key, [])
+                result[key] = (items[:limit], len(items))
+            return result
+
+        item_prefixes = {f"{key}.item": key for key in limits}
+        heads = {key: [] for key in limits}
+        totals = dict.fromkeys(limits, 0)
+        builder = None
+
+        with self._open(path) as f:
+            for prefix, event, value in ijson.parse(f):
+                if builder is not None:
+                    # Building one of the displayed items
+                    builder.event(event, value)
+                    if prefix == builder_prefix and event in ("end_map", "end_array"):
+                        heads[item_prefixes[prefix]].append(builder.value)
+                        builder = None
+                    continue
+
+                key = item_prefixes.get(prefix)
+                if key is None or event in ("end_map", "end_array", "map_key"):
+                    continue
+
+                # Start of a new list item: count it, materialize only the first `limit`
+                totals[key] += 1
+                if len(heads[key]) < limits[key]:
+                    if event in ("start_map", "start_array"):
+                        builder = ijson.ObjectBuilder()
+                        builder_prefix = prefix
+                        builder.event(event, value)
+                    else:
+                        heads[key].append(value)
+
+        return {key: (heads[key], totals[key]) for key in limits}
 
     def verify_structure(self):
         """Verify directory structure"""
-        print("\n=== Verifying Export Structure ===")
+        self._print("\n=== Verifying Export Structure ===")
 
         required_dirs = ["config", "diagnostics", "secrets", "addons"]
         required_files = ["METADATA.json", "README.md"]
 
         all_ok = True
 
+        # One directory read of the export root instead of a stat per required entry
+        try:
+            entries = self._scandir("")
+        except FileNotFoundError:
+            entries = {}
+
         for dir_name in required_dirs:
-            dir_path = os.path.join(self.export_path, dir_name)
-            if os.path.exists(dir_path):
-                print(f"✓ {dir_name}/ directory exists")
+            if dir_name in entries:
+                self._print(f"✓ {dir_name}/ directory exists")
             else:
-                print(f"✗ {dir_name}/ directory missing")
-                self.issues.append(f"Missing directory: {dir_name}/")
+                self._print(f"✗ {dir_name}/ directory missing")
+                self._add_issue(f"Missing directory: {dir_name}/")
                 all_ok = False
 
         for file_name in required_files:
-            file_path = os.path.join(self.export_path, file_name)
-            if os.path.exists(file_path):
-                print(f"✓ {file_name} exists")
+            if file_name in entries:
+                self._print(f"✓ {file_name} exists")
             else:
-                print(f"✗ {file_name} missing")
-                self.issues.append(f"Missing file: {file_name}")
+                self._print(f"✗ {file_name} missing")
+                self._add_issue(f"Missing file: {file_name}")
                 all_ok = False
 
         return all_ok
 
     def verify_entities(self):
         """Verify entity registry export"""
-        print("\n=== Verifying Entity Registry ===")
-
-        entities_file = os.path.join(self.export_path, "diagnostics", "entities_registry.json")
+        self._print("\n=== Verifying Entity Registry ===")
 
-        if not os.path.exists(entities_file):
-            print("✗ entities_registry.json not found")
-            self.issues.append("Entity registry not exported")
-            return False
+        entities_file = EXPORT_JSON_FILES["entities"]
 
         try:
-            with open(entities_file, "r") as f:
-                entity_data = json.load(f)
-
-            total = entity_data.get("total_entities", 0)
-            active = total - len(entity_data.get("disabled_entities", []))
-            domains = len(entity_data.get("entities_by_domain", {}))
-            platforms = len(entity_data.get("entities_by_platform", {}))
-
-            print(f"✓ Entity registry exported successfully")
-            print(f"  Total entities: {total}")
-            print(f"  Active entities: {active}")
-            print(f"  Disabled entities: {len(entity_data.get('disabled_entities', []))}")
-            print(f"  Entity domains: {domains}")
-            print(f"  Platforms: {platforms}")
+            entity_data = self._load_json(entities_file)
+
+            counts = _field_counts(entity_data)
+            total = counts.get("total_entities", 0)
+            disabled = counts.get("disabled_entities", 0)
+            active = total - disabled
+            domains = counts.get("entities_by_domain", 0)
+            platforms = counts.get("entities_by_platform", 0)
+
+            self._print(f"✓ Entity registry exported successfully")
+            self._print(f"  Total entities: {total}")
+            self._print(f"  Active entities: {active}")
+            self._print(f"  Disabled entities: {disabled}")
+            self._print(f"  Entity domains: {domains}")
+            self._print(f"  Platforms: {platforms}")
 
             # Store stats
             self.stats["entities"] = {"total": total, "active": active, "domains": domains, "platforms": platforms}
 
-            # Check for common entity types
+            # Per-domain sizes, computed once and shared by the breakdown and the ranking
             entities_by_domain = entity_data.get("entities_by_domain", {})
+            domain_sizes = {domain: len(entities) for domain, entities in entities_by_domain.items()}
+
+            # Check for common entity types
             common_domains = ["light", "switch", "sensor", "binary_sensor", "automation", "script"]
 
-            print(f"\n  Entity breakdown:")
+            self._print(f"\n  Entity breakdown:")
             for domain in common_domains:
-                count = len(entities_by_domain.get(domain, []))
+                count = domain_sizes.get(domain, 0)
                 if count > 0:
-                    print(f"    - {domain}: {count}")
+                    self._print(f"    - {domain}: {count}")
 
             # Show top 5 domains
-            top_domains = sorted(entities_by_domain.items(), key=lambda x: len(x[1]), reverse=True)[:5]
+            top_domains = heapq.nlargest(5, domain_sizes.items(), key=itemgetter(1))
             if top_domains:
-                print(f"\n  Top 5 entity types:")
-                for domain, entities in top_domains:
-                    print(f"    - {domain}: {len(entities)} entities")
+                self._print(f"\n  Top 5 entity types:")
+                for domain, count in top_domains:
+                    self._print(f"    - {domain}: {count} entities")
 
             return True
 
+        except FileNotFoundError:
+            self._print("✗ entities_registry.json not found")
+            self._add_issue("Entity registry not exported")
+            return False
         except Exception as e:
-            print(f"✗ Error reading entity registry: {e}")
-            self.issues.append(f"Entity registry parse error: {e}")
+            self._print(f"✗ Error reading entity registry: {e}")
+            self._add_issue(f"Entity registry parse error: {e}")
             return False
 
     def verify_devices(self):
         """Verify device registry export"""
-        print("\n=== Verifying Device Registry ===")
+        self._print("\n=== Verifying Device Registry ===")
 
-        devices_file = os.path.join(self.export_path, "diagnostics", "devices_registry.json")
-
-        if not os.path.exists(devices_file):
-            print("✗ devices_registry.json not found")
-            self.issues.append("Device registry not exported")
-            return False
+        devices_file = EXPORT_JSON_FILES["devices"]
 
         try:
-            with open(devices_file, "r") as f:
-                device_data = json.load(f)
+            device_data = self._load_json(devices_file)
 
-            total = device_data.get("total_devices", 0)
-            manufacturers = len(device_data.get("devices_by_manufacturer", {}))
-            integrations = len(device_data.get("devices_by_integration", {}))
+            counts = _field_counts(device_data)
+            total = counts.get("total_devices", 0)
+            manufacturers = counts.get("devices_by_manufacturer", 0)
+            integrations = counts.get("devices_by_integration", 0)
 
-            print(f"✓ Device registry exported successfully")
-            print(f"  Total devices: {total}")
-            print(f"  Manufacturers: {manufacturers}")
-            print(f"  Integrations: {integrations}")
+            self._print(f"✓ Device registry exported successfully")
+            self._print(f"  Total devices: {total}")
+            self._print(f"  Manufacturers: {manufacturers}")
+            self._print(f"  Integrations: {integrations}")
 
             # Store stats
             self.stats["devices"] = {"total": total, "manufacturers": manufacturers, "integrations": integrations}
 
             # Show top manufacturers
             by_manufacturer = device_data.get("devices_by_manufacturer", {})
-            top_manufacturers = sorted(by_manufacturer.items(), key=lambda x: x[1], reverse=True)[:5]
+            top_manufacturers = heapq.nlargest(5, by_manufacturer.items(), key=itemgetter(1))
 
             if top_manufacturers:
-                print(f"\n  Top 5 manufacturers:")
+                self._print(f"\n  Top 5 manufacturers:")
                 for mfr, count in top_manufacturers:
-                    print(f"    - {mfr}: {count} devices")
+                    self._print(f"    - {mfr}: {count} devices")
 
             return True
 
+        except FileNotFoundError:
+            self._print("✗ devices_registry.json not found")
+            self._add_issue("Device registry not exported")
+            return False
         except Exception as e:
-            print(f"✗ Error reading device registry: {e}")
-            self.issues.append(f"Device registry parse error: {e}")
+            self._print(f"✗ Error reading device registry: {e}")
+            self._add_issue(f"Device registry parse error: {e}")
             return False
 
     def verify_config_files(self):
         """Verify configuration files"""
-        print("\n=== Verifying Configuration Files ===")
+        self._print("\n=== Verifying Configuration Files ===")
 
-        config_dir = os.path.join(self.export_path, "config")
-
-        if not os.path.exists(config_dir):
-            print("✗ config/ directory not found")
-            self.issues.append("Configuration directory missing")
-            return False
+        config_dir = "config"
 
         # Check for key files
         key_files = {
@@ -165,220 +490,232 @@ class ExportVerifier:
 
         found_files = []
 
+        # Read the top level once; DirEntry caches file type and stat results
+        try:
+            top_level = self._scandir(config_dir)
+        except FileNotFoundError:
+            self._print("✗ config/ directory not found")
+            self._add_issue("Configuration directory missing")
+            return False
+
         for file_name, description in key_files.items():
-            file_path = os.path.join(config_dir, file_name)
-            if os.path.exists(file_path):
-                size = os.path.getsize(file_path)
-                print(f"✓ {file_name} ({description}) - {size} bytes")
+            entry = top_level.get(file_name)
+            if entry is not None and entry.is_file():
+                size = entry.stat().st_size
+                self._print(f"✓ {file_name} ({description}) - {size} bytes")
                 found_files.append(file_name)
             else:
-                print(f"⚠️  {file_name} not found (may not exist in your setup)")
-                self.warnings.append(f"{file_name} not found")
+                self._print(f"⚠️  {file_name} not found (may not exist in your setup)")
+                self._add_warning(f"{file_name} not found")
 
-        # Count all YAML files
-        yaml_files = list(Path(config_dir).rglob("*.yaml")) + list(Path(config_dir).rglob("*.yml"))
-        json_files = list(Path(config_dir).rglob("*.json"))
+        # Count all YAML and JSON files in a single tree walk
+        yaml_files = 0
+        json_files = 0
+        for name in self._walk_files(config_dir):
+            if name.endswith((".yaml", ".yml")):
+                yaml_files += 1
+            elif name.endswith(".json"):
+                json_files += 1
 
-        print(f"\n  Total YAML files: {len(yaml_files)}")
-        print(f"  Total JSON files: {len(json_files)}")
+        self._print(f"\n  Total YAML files: {yaml_files}")
+        self._print(f"  Total JSON files: {json_files}")
 
         self.stats["config_files"] = {
-            "yaml": len(yaml_files),
-            "json": len(json_files),
+            "yaml": yaml_files,
+            "json": json_files,
             "key_files_found": len(found_files),
         }
 
         # Check .storage directory
-        storage_dir = os.path.join(config_dir, ".storage")
-        if os.path.exists(storage_dir):
-            storage_files = list(Path(storage_dir).glob("*.json"))
-            print(f"  Storage files: {len(storage_files)}")
+        storage_entry = top_level.get(".storage")
+        if storage_entry is not None and storage_entry.is_dir():
+            storage_files = sum(1 for name in self._scandir(f"{config_dir}/.storage") if name.endswith(".json"))
+            self._print(f"  Storage files: {storage_files}")
 
         return len(found_files) > 0
 
     def verify_secrets(self):
         """Verify secrets mapping"""
-        print("\n=== Verifying Secrets Mapping ===")
+        self._print("\n=== Verifying Secrets Mapping ===")
 
-        secrets_file = os.path.join(self.export_path, "secrets", "secrets_map.json")
-
-        if not os.path.exists(secrets_file):
-            print("✗ secrets_map.json not found")
-            self.issues.append("Secrets mapping file missing")
-            return False
+        secrets_file = EXPORT_JSON_FILES["secrets"]
 
         try:
-            with open(secrets_file, "r") as f:
-                secrets_data = json.load(f)
+            secrets_data = self._load_json(secrets_file)
 
             total_secrets = secrets_data.get("total_secrets", 0)
             secrets = secrets_data.get("secrets", {})
 
-            print(f"✓ Secrets mapping exported")
-            print(f"  Total secrets replaced: {total_secrets}")
+            self._print(f"✓ Secrets mapping exported")
+            self._print(f"  Total secrets replaced: {total_secrets}")
 
             # Count by type
-            secret_types = {}
-            for placeholder in secrets.keys():
-                stype = placeholder.split("_")[0].replace("<<", "")
-                secret_types[stype] = secret_types.get(stype, 0) + 1
+            secret_types = Counter(placeholder.split("_", 1)[0].lstrip("<") for placeholder in secrets)
 
             if secret_types:
-                print(f"\n  Secret types:")
-                for stype, count in sorted(secret_types.items(), key=lambda x: x[1], reverse=True):
-                    print(f"    - {stype}: {count}")
+                self._print(f"\n  Secret types:")
+                for stype, count in secret_types.most_common():
+                    self._print(f"    - {stype}: {count}")
 
             self.stats["secrets"] = {"total": total_secrets, "types": len(secret_types)}
 
             return True
 
+        except FileNotFoundError:
+            self._print("✗ secrets_map.json not found")
+            self._add_issue("Secrets mapping file missing")
+            return False
         except Exception as e:
-            print(f"✗ Error reading secrets: {e}")
-            self.issues.append(f"Secrets parse error: {e}")
+            self._print(f"✗ Error reading secrets: {e}")
+            self._add_issue(f"Secrets parse error: {e}")
             return False
 
     def verify_addons(self):
         """Verify add-on configurations"""
-        print("\n=== Verifying Add-on Configurations ===")
+        self._print("\n=== Verifying Add-on Configurations ===")
 
-        addons_file = os.path.join(self.export_path, "addons", "addons_summary.json")
-
-        if not os.path.exists(addons_file):
-            print("⚠️  addons_summary.json not found (may not have add-ons)")
-            self.warnings.append("Add-on summary not found")
-            return True
+        addons_file = EXPORT_JSON_FILES["addons"]
 
         try:
-            with open(addons_file, "r") as f:
-                addon_data = json.load(f)
-
-            installed = addon_data.get("installed_addons", [])
+            installed, total = self._load_list_heads(addons_file, {"installed_addons": 10})["installed_addons"]
 
-            print(f"✓ Add-on configurations exported")
-            print(f"  Total add-ons: {len(installed)}")
+            self._print(f"✓ Add-on configurations exported")
+            self._print(f"  Total add-ons: {total}")
 
             if installed:
-                print(f"\n  Installed add-ons:")
-                for addon in installed[:10]:
+                self._print(f"\n  Installed add-ons:")
+                for addon in installed:
                     name = addon.get("name", "Unknown")
                     version = addon.get("version", "?")
                     state = addon.get("state", "?")
-                    print(f"    - {name} v{version} ({state})")
+                    self._print(f"    - {name} v{version} ({state})")
 
-                if len(installed) > 10:
-                    print(f"    ... and {len(installed) - 10} more")
+                if total > 10:
+                    self._print(f"    ... and {total - 10} more")
 
-            self.stats["addons"] = {"total": len(installed)}
+            self.stats["addons"] = {"total": total}
 
             return True
 
+        except FileNotFoundError:
+            self._print("⚠️  addons_summary.json not found (may not have add-ons)")
+            self._add_warning("Add-on summary not found")
+            return True
         except Exception as e:
-            print(f"✗ Error reading add-ons: {e}")
-            self.issues.append(f"Add-on parse error: {e}")
+            self._print(f"✗ Error reading add-ons: {e}")
+            self._add_issue(f"Add-on parse error: {e}")
             return False
 
     def verify_integrations(self):
         """Verify integrations export"""
-        print("\n=== Verifying Integrations ===")
+        self._print("\n=== Verifying Integrations ===")
 
-        integrations_file = os.path.join(self.export_path, "diagnostics", "integrations.json")
-
-        if not os.path.exists(integrations_file):
-            print("✗ integrations.json not found")
-            self.issues.append("Integrations file missing")
-            return False
+        integrations_file = EXPORT_JSON_FILES["integrations"]
 
         try:
-            with open(integrations_file, "r") as f:
-                integ_data = json.load(f)
-
-            configured = integ_data.get("configured_integrations", [])
-            custom = integ_data.get("custom_components", [])
+            lists = self._load_list_heads(integrations_file, {"configured_integrations": 10, "custom_components": 0})
+            configured, configured_total = lists["configured_integrations"]
+            custom_total = lists["custom_components"][1]
 
-            print(f"✓ Integrations exported")
-            print(f"  Configured integrations: {len(configured)}")
-            print(f"  Custom components: {len(custom)}")
+            self._print(f"✓ Integrations exported")
+            self._print(f"  Configured integrations: {configured_total}")
+            self._print(f"  Custom components: {custom_total}")
 
             if configured:
-                print(f"\n  Sample integrations:")
-                for integ in configured[:10]:
+                self._print(f"\n  Sample integrations:")
+                for integ in configured:
                     domain = integ.get("domain", "unknown")
                     title = integ.get("title", domain)
-                    print(f"    - {title} ({domain})")
+                    self._print(f"    - {title} ({domain})")
 
-            self.stats["integrations"] = {"configured": len(configured), "custom": len(custom)}
+            self.stats["integrations"] = {"configured": configured_total, "custom": custom_total}
 
             return True
 
+        except FileNotFoundError:
+            self._print("✗ integrations.json not found")
+            self._add_issue("Integrations file missing")
+            return False
         except Exception as e:
-            print(f"✗ Error reading integrations: {e}")
-            self.issues.append(f"Integrations parse error: {e}")
+            self._print(f"✗ Error reading integrations: {e}")
+            self._add_issue(f"Integrations parse error: {e}")
             return False
 
     def generate_report(self):
         """Generate verification report"""
-        print("\n" + "=" * 70)
-        print("Verification Summary")
-        print("=" * 70)
-
-        print(f"\n📊 Export Statistics:")
-        if "entities" in self.stats:
-            print(f"  Entities: {self.stats['entities']['total']} ({self.stats['entities']['active']} active)")
-        if "devices" in self.stats:
-            print(f"  Devices: {self.stats['devices']['total']}")
-        if "integrations" in self.stats:
-            print(f"  Integrations: {self.stats['integrations']['configured']}")
-            print(f"  Custom Components: {self.stats['integrations']['custom']}")
-        if "addons" in self.stats:
-            print(f"  Add-ons: {self.stats['addons']['total']}")
-        if "config_files" in self.stats:
-            print(
-                f"  Config Files: {self.stats['config_files']['yaml']} YAML, {self.stats['config_files']['json']} JSON"
-            )
-        if "secrets" in self.stats:
-            print(f"  Secrets Replaced: {self.stats['secrets']['total']}")
+        lines = []
+        emit = lines.append
+
+        emit("\n" + "=" * 70)
+        emit("Verification Summary")
+        emit("=" * 70)
+
+        emit(f"\n📊 Export Statistics:")
+        for stat_key, line_format in REPORT_SCHEMA:
+            section = self.stats.get(stat_key)
+            if section is not None:
+                emit(line_format.format_map(section))
 
         if self.issues:
-            print(f"\n❌ Critical Issues Found: {len(self.issues)}")
+            emit(f"\n❌ Critical Issues Found: {len(self.issues)}")
             for issue in self.issues:
-                print(f"  - {issue}")
+                emit(f"  - {issue}")
         else:
-            print(f"\n✅ No critical issues found")
+            emit(f"\n✅ No critical issues found")
 
         if self.warnings:
-            print(f"\n⚠️  Warnings: {len(self.warnings)}")
+            emit(f"\n⚠️  Warnings: {len(self.warnings)}")
             for warning in self.warnings:
-                print(f"  - {warning}")
+                emit(f"  - {warning}")
 
         # Overall status
-        print("\n" + "=" * 70)
+        emit("\n" + "=" * 70)
         if not self.issues:
-            print("✅ Export verification PASSED")
-            print("\nYour export is complete and ready to use with AI assistants!")
+            emit("✅ Export verification PASSED")
+            emit("\nYour export is complete and ready to use with AI assistants!")
         else:
-            print("❌ Export verification FAILED")
-            print("\nPlease re-run the export script to fix issues.")
-        print("=" * 70)
+            emit("❌ Export verification FAILED")
+            emit("\nPlease re-run the export script to fix issues.")
+        emit("=" * 70)
+
+        # Single write for the whole report instead of one per line
+        sys.stdout.write("\n".join(lines) + "\n")
 
         return len(self.issues) == 0
 
     def run(self):
         """Run all verification checks"""
-        print("=" * 70)
-        print("Home Assistant Export Verification Tool")
-        print("=" * 70)
-        print(f"\nVerifying: {self.export_path}")
+        lines = [
+            "=" * 70,
+            "Home Assistant Export Verification Tool",
+            "=" * 70,
+            f"\nVerifying: {self.export_path}",
+        ]
 
         checks = [
-            self.verify_structure(),
-            self.verify_entities(),
-            self.verify_devices(),
-            self.verify_config_files(),
-            self.verify_integrations(),
-            self.verify_secrets(),
-            self.verify_addons(),
+            self.verify_structure,
+            self.verify_entities,
+            self.verify_devices,
+            self.verify_config_files,
+            self.verify_integrations,
+            self.verify_secrets,
+            self.verify_addons,
         ]
 
+        # The checks read disjoint files, so run them concurrently and
+        # merge their buffered output/findings back in a fixed order
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [executor.submit(self._run_check, check) for check in checks]
+            outcomes = [future.result() for future in futures]
+
+        for _, output, issues, warnings in outcomes:
+            lines.extend(output)
+            self.issues.extend(issues)
+            self.warnings.extend(warnings)
+
+        # Flush the header and all check output with a single write
+        sys.stdout.write("\n".join(lines) + "\n")
+
         return self.generate_report()
 
 
@@ -392,32 +729,27 @@ def main():
 
     export_path = args.export_path
 
-    # Check if it's a tarball
+    # Tarballs are indexed in a single streaming pass instead of being extracted to disk
     if export_path.endswith(".tar.gz") or export_path.endswith(".tgz"):
-        print("Extracting tarball...")
-        extract_dir = "/tmp/ha_verify_temp"
-        os.makedirs(extract_dir, exist_ok=True)
-
+        print("Reading tarball...")
         try:
-            with tarfile.open(export_path, "r:gz") as tar:
-                tar.extractall(extract_dir)
-
-            # Find extracted directory
-            extracted_dirs = [d for d in os.listdir(extract_dir) if os.path.isdir(os.path.join(extract_dir, d))]
-            if extracted_dirs:
-                export_path = os.path.join(extract_dir, extracted_dirs[0])
-            else:
-                print("Error: No directory found in tarball")
-                sys.exit(1)
+            archive = ArchiveIndex.from_tarball(export_path, EXPORT_JSON_FILES.values())
         except Exception as e:
-            print(f"Error extracting tarball: {e}")
+            print(f"Error reading tarball: {e}")
+            sys.exit(1)
+
+        if archive.root is None:
+            print("Error: No directory found in tarball")
+            sys.exit(1)
+
+        verifier = ExportVerifier(export_path, archive=archive)
+    else:
+        if not os.path.exists(export_path):
+            print(f"Error: Export path not found: {export_path}")
             sys.exit(1)
 
-    if not os.path.exists(export_path):
-        print(f"Error: Export path not found: {export_path}")
-        sys.exit(1)
+        verifier = ExportVerifier(export_path)
 
-    verifier = ExportVerifier(export_path)
     success = verifier.run()
 
     sys.exit(0 if success else 1)
@@ -9,14 +9,18 @@ import sys
 import json
 import base64
 import hashlib
+import mmap
 import re
+import shutil
+import tempfile
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 # Try to import cryptography, fall back to basic encoding if not available
 try:
     from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
     from cryptography.hazmat.primitives import hashes
     from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
@@ -25,10 +29,226 @@ except ImportError:
     CRYPTO_AVAILABLE = False
     print("⚠ cryptography not installed. Using base64 encoding (not secure for production)")
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from argon2.low_level import Type as Argon2Type, hash_secret_raw
+
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+
+try:
+    import hyperscan
+
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+try:
+    import ahocorasick
+
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# First byte of an AES-GCM vault (followed by 12-byte nonce + ciphertext/tag).
+# Legacy Fernet vaults are base64 text and never start with this byte.
+VAULT_VERSION_AESGCM = b"\x01"
+AESGCM_NONCE_SIZE = 12
+
+# Passphrase mode: the vault key is derived with Argon2id from this environment
+# variable, and the key file only holds the salt and KDF parameters
+PASSPHRASE_ENV = "HA_SECRETS_PASSPHRASE"
+ARGON2_TIME_COST = 3
+ARGON2_MEMORY_COST = 65536  # KiB
+ARGON2_PARALLELISM = 2
+ARGON2_SALT_SIZE = 16
+
+# Value shapes used by _detect_secret_type when the key name gives no hint
+JWT_VALUE_RE = re.compile(r"^[\w-]+\.[\w-]+\.[\w-]+$")
+HEX_KEY_VALUE_RE = re.compile(r"^[a-f0-9]{32,}$", re.IGNORECASE)
+IP_VALUE_RE = re.compile(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$")
+
+# Approximate size of the blocks of whole lines streamed through sanitize/restore
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Scheme of the duplicate-detection hashes in the mapping file
+# (1: truncated SHA-256, 2: 8-byte BLAKE2b)
+HASH_VERSION = 2
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    # ensure_ascii (the default) guarantees ASCII output, the cheapest encode;
+    # unindented output (the vault payload) is written compactly like orjson's
+    text = json.dumps(obj, indent=2) if indent else json.dumps(obj, separators=(",", ":"))
+    return text.encode("ascii")
+
+
+def _json_loads(data: bytes):
+    """Parse JSON bytes, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _rewrite_file(file_path: str, output_path: Optional[str], transform) -> None:
+    """Stream a text file through transform into output_path (default: in place).
+
+    transform receives blocks of whole lines (about STREAM_CHUNK_SIZE characters),
+    so only one block is held in memory. In-place rewrites go through a temporary
+    file in the same directory that replaces the original once complete.
+    """
+    out_path = output_path or file_path
+    in_place = os.path.abspath(out_path) == os.path.abspath(file_path)
+    if in_place:
+        fd, write_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(out_path)), suffix=".tmp")
+        os.close(fd)
+    else:
+        write_path = out_path
+
+    try:
+        with open(file_path, "r") as fin, open(write_path, "w") as fout:
+            while True:
+                lines = fin.readlines(STREAM_CHUNK_SIZE)
+                if not lines:
+                    break
+                fout.write(transform(lines))
+        if in_place:
+            shutil.copymode(file_path, write_path)
+            os.replace(write_path, out_path)
+    except BaseException:
+        if in_place and os.path.exists(write_path):
+            os.remove(write_path)
+        raise
+
+
+def _atomic_write(path: Path, data: bytes, mode: Optional[int] = None) -> None:
+    """Write data to path via a temporary sibling file and os.replace.
+
+    Readers (and a crash mid-write) see either the old or the new file, never
+    a truncated one.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def _build_hyperscan_db(patterns):
+    """Compile regex patterns into one Hyperscan database, or None if unavailable."""
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[pattern.encode() for pattern in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=[flags] * len(patterns),
+        )
+    except hyperscan.error as e:
+        print(f"⚠ Hyperscan unavailable for secret patterns: {e}")
+        return None
+    return db
+
+
+def _stop_on_match(pattern_id, start, end, flags, hits):
+    """Hyperscan match handler: record the hit and stop scanning."""
+    hits.append(pattern_id)
+    return True
+
+
+def _hyperscan_matches(db, text: str) -> bool:
+    """Check whether any pattern in a Hyperscan database matches text."""
+    hits = []
+    try:
+        db.scan(text.encode(), match_event_handler=_stop_on_match, context=hits)
+    except hyperscan.ScanTerminated:
+        pass
+    return bool(hits)
+
+
+def _file_contains(file_path: str, needle: bytes) -> bool:
+    """Check whether a file contains a byte string, scanning it through mmap."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False  # empty files cannot be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(needle) != -1
+
 
 class SecretsManager:
     """Manages encryption and storage of secrets with labeled placeholders."""
 
+    # Fixed attribute layout: no per-instance __dict__, faster attribute access in add_secret
+    __slots__ = (
+        "secrets_dir",
+        "label_prefix",
+        "secrets_file",
+        "mapping_file",
+        "key_file",
+        "_fernet",
+        "_aead",
+        "_passphrase_protected",
+        "_secrets",
+        "_mapping",
+        "_hash_to_label",
+        "_ai_mapping_cache",
+        "_dirty",
+        "_unstamped",
+        "_counter",
+        "_restore_re",
+        "_automaton",
+    )
+
+    # Key name substrings per secret type, in priority order (first matching type wins)
+    SECRET_TYPE_KEYWORDS = {
+        "PASSWORD": ["password", "passwd", "pass", "pwd"],
+        "TOKEN": ["token", "access_token", "bearer", "jwt"],
+        "API_KEY": ["api_key", "apikey", "api-key", "key"],
+        "SECRET": ["secret", "client_secret"],
+        "CREDENTIAL": ["credential", "auth", "login"],
+        "EMAIL": ["email", "mail"],
+        "PHONE": ["phone", "mobile", "tel"],
+        "LATITUDE": ["latitude", "lat"],
+        "LONGITUDE": ["longitude", "lon", "lng"],
+        "IP_ADDRESS": ["ip", "host", "address"],
+        "URL": ["url", "uri", "endpoint"],
+        "CERTIFICATE": ["cert", "certificate", "pem", "crt"],
+        "PRIVATE_KEY": ["private_key", "privkey", "ssh_key"],
+    }
+
+    # One alternative per type, tried in order: a lookahead for any of its keywords
+    # followed by an empty group named after the type (reported as match.lastgroup)
+    _SECRET_TYPE_RE = re.compile(
+        "^(?:"
+        + "|".join(
+            f"(?=.*?(?:{'|'.join(map(re.escape, keywords))}))(?P<{secret_type}>)"
+            for secret_type, keywords in SECRET_TYPE_KEYWORDS.items()
+        )
+        + ")",
+        re.DOTALL,
+    )
+
     def __init__(self, secrets_dir: str = "./secrets", label_prefix: str = "HA_SECRET"):
         """Initialize secrets manager.
 
@@ -44,11 +264,21 @@ class SecretsManager:
         self.mapping_file = self.secrets_dir / "secrets_mapping.json"
         self.key_file = self.secrets_dir / ".encryption_key"
 
-        self._fernet = None
-        self._secrets: Dict[str, Any] = {}
+        self._fernet = None  # only used to read legacy Fernet vaults
+        self._aead = None
+        self._passphrase_protected = False
+        self._secrets: Optional[Dict[str, Any]] = None  # decrypted lazily by _ensure_secrets_loaded
         self._mapping: Dict[str, Dict] = {}  # label -> {type, description, hash}
+        self._hash_to_label: Dict[str, str] = {}  # value hash -> label, for duplicate detection
+        self._ai_mapping_cache: Optional[Dict[str, Dict]] = None  # reset when _mapping changes
+        self._dirty = False  # in-memory state differs from the saved files
+        self._unstamped: List[str] = []  # labels added since the last save, stamped in save()
         self._counter = 0
 
+        # Matches <<LABEL>> placeholders; types may contain underscores (API_KEY, IP_ADDRESS)
+        self._restore_re = re.compile(r"<<(" + re.escape(label_prefix) + r"_[A-Z_]+_\d{3,})>>")
+        self._automaton = None  # placeholder matcher for restore, rebuilt when _secrets changes
+
         self._init_encryption()
         self._load_existing()
 
@@ -57,42 +287,128 @@ class SecretsManager:
         if not CRYPTO_AVAILABLE:
             return
 
+        key = None
         if self.key_file.exists():
             with open(self.key_file, "rb") as f:
                 key = f.read()
-        else:
+
+        passphrase = os.environ.get(PASSPHRASE_ENV)
+        if key is not None and key.startswith(b"{"):
+            # Key file holds KDF parameters: the vault is passphrase-protected
+            if not passphrase:
+                raise ValueError(f"{self.key_file} is passphrase-protected; set {PASSPHRASE_ENV}")
+            self._aead = AESGCM(self._derive_passphrase_key(passphrase, _json_loads(key)))
+            self._passphrase_protected = True
+            return
+        if passphrase and key is None:
+            if ARGON2_AVAILABLE:
+                params = {
+                    "kdf": "argon2id",
+                    "salt": base64.b64encode(os.urandom(ARGON2_SALT_SIZE)).decode(),
+                    "time_cost": ARGON2_TIME_COST,
+                    "memory_cost": ARGON2_MEMORY_COST,
+                    "parallelism": ARGON2_PARALLELISM,
+                }
+                with open(self.key_file, "wb") as f:
+                    f.write(_json_dumps(params, indent=True))
+                os.chmod(self.key_file, 0o600)
+                print(f"✓ Passphrase key parameters generated: {self.key_file}")
+                self._aead = AESGCM(self._derive_passphrase_key(passphrase, params))
+                self._passphrase_protected = True
+                return
+            print(f"⚠ argon2-cffi not installed. Ignoring {PASSPHRASE_ENV}, using a stored key")
+        elif passphrase:
+            print(f"⚠ {self.key_file} holds a stored key. Ignoring {PASSPHRASE_ENV}")
+
+        if key is None:
             key = Fernet.generate_key()
             with open(self.key_file, "wb") as f:
                 f.write(key)
             os.chmod(self.key_file, 0o600)  # Restrict permissions
             print(f"✓ New encryption key generated: {self.key_file}")
 
+        # The key file keeps the Fernet format (urlsafe base64 of 32 random bytes);
+        # the raw bytes are used as an AES-256-GCM key for the vault
         self._fernet = Fernet(key)
+        self._aead = AESGCM(base64.urlsafe_b64decode(key))
+
+    def _derive_passphrase_key(self, passphrase: str, params: Dict[str, Any]) -> bytes:
+        """Derive the 32-byte vault key from a passphrase with Argon2id.
+
+        Args:
+            passphrase: Passphrase from the environment
+            params: KDF parameters stored in the key file
+
+        Returns:
+            Raw AES-256 key
+        """
+        if not ARGON2_AVAILABLE:
+            raise ValueError(f"{self.key_file} is passphrase-protected; install argon2-cffi")
+        return hash_secret_raw(
+            passphrase.encode(),
+            base64.b64decode(params["salt"]),
+            time_cost=params["time_cost"],
+            memory_cost=params["memory_cost"],
+            parallelism=params["parallelism"],
+            hash_len=32,
+            type=Argon2Type.ID,
+        )
 
     def _load_existing(self):
         """Load existing secrets and mapping if available."""
         # Load mapping (unencrypted - contains only labels and metadata)
+        hash_version = HASH_VERSION
         if self.mapping_file.exists():
             try:
-                with open(self.mapping_file, "r") as f:
-                    data = json.load(f)
+                with open(self.mapping_file, "rb") as f:
+                    data = _json_loads(f.read())
                     self._mapping = data.get("mapping", {})
                     self._counter = data.get("counter", 0)
+                    hash_version = data.get("hash_version", 1)
                 print(f"✓ Loaded {len(self._mapping)} secret mappings")
             except Exception as e:
                 print(f"⚠ Error loading mapping: {e}")
 
-        # Load encrypted secrets
-        if self.secrets_file.exists() and self._fernet:
+        # The encrypted vault is only decrypted on first use (_ensure_secrets_loaded)
+
+        # Re-hash entries from older mapping files with the current scheme
+        if hash_version != HASH_VERSION:
+            self._dirty = True
+            secrets = self._ensure_secrets_loaded()
+            for label, meta in self._mapping.items():
+                if label in secrets:
+                    meta["hash"] = self._hash_value(secrets[label])
+
+        for label, meta in self._mapping.items():
+            self._hash_to_label.setdefault(meta.get("hash"), label)
+
+    def _ensure_secrets_loaded(self) -> Dict[str, Any]:
+        """Decrypt the vault on first use and return the label -> value dict."""
+        if self._secrets is not None:
+            return self._secrets
+
+        secrets = {}
+        if self.secrets_file.exists() and self._aead:
             try:
                 with open(self.secrets_file, "rb") as f:
                     encrypted = f.read()
-                decrypted = self._fernet.decrypt(encrypted)
-                self._secrets = json.loads(decrypted.decode())
-                print(f"✓ Loaded {len(self._secrets)} encrypted secrets")
+                if encrypted[:1] == VAULT_VERSION_AESGCM:
+                    nonce = encrypted[1 : 1 + AESGCM_NONCE_SIZE]
+                    decrypted = self._aead.decrypt(nonce, encrypted[1 + AESGCM_NONCE_SIZE :], None)
+                else:
+                    decrypted = self._fernet.decrypt(encrypted)
+                    self._dirty = True  # rewrite legacy vaults in the current format
+                secrets = _json_loads(decrypted)
+                print(f"✓ Loaded {len(secrets)} encrypted secrets")
             except Exception as e:
+                if self._passphrase_protected:
+                    # Never fall through to an empty vault that save() would overwrite
+                    raise ValueError(f"Cannot decrypt {self.secrets_file}: wrong {PASSPHRASE_ENV}?") from e
                 print(f"⚠ Error loading secrets: {e}")
 
+        self._secrets = secrets
+        return secrets
+
     def _generate_label(self, secret_type: str) -> str:
         """Generate unique label for a secret.
 
@@ -112,9 +428,9 @@ class SecretsManager:
             value: Value to hash
 
         Returns:
-            SHA256 hash of value
+            16-character hex BLAKE2b digest of value
         """
-        return hashlib.sha256(value.encode()).hexdigest()[:16]
+        return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
 
     def _detect_secret_type(self, key: str, value: str) -> str:
         """Detect type of secret based on key name and value.
@@ -126,34 +442,16 @@ class SecretsManager:
         Returns:
             Secret type string
         """
-        key_lower = key.lower()
-
-        type_patterns = {
-            "PASSWORD": ["password", "passwd", "pass", "pwd"],
-            "TOKEN": ["token", "access_token", "bearer", "jwt"],
-            "API_KEY": ["api_key", "apikey", "api-key", "key"],
-            "SECRET": ["secret", "client_secret"],
-            "CREDENTIAL": ["credential", "auth", "login"],
-            "EMAIL": ["email", "mail"],
-            "PHONE": ["phone", "mobile", "tel"],
-            "LATITUDE": ["latitude", "lat"],
-            "LONGITUDE": ["longitude", "lon", "lng"],
-            "IP_ADDRESS": ["ip", "host", "address"],
-            "URL": ["url", "uri", "endpoint"],
-            "CERTIFICATE": ["cert", "certificate", "pem", "crt"],
-            "PRIVATE_KEY": ["private_key", "privkey", "ssh_key"],
-        }
-
-        for secret_type, patterns in type_patterns.items():
-            if any(p in key_lower for p in patterns):
-                return secret_type
+        match = self._SECRET_TYPE_RE.match(key.lower())
+        if match:
+            return match.lastgroup
 
         # Check value patterns
-        if re.match(r"^[\w-]+\.[\w-]+\.[\w-]+$", value):  # JWT pattern
+        if JWT_VALUE_RE.match(value):  # JWT pattern
             return "TOKEN"
-        if re.match(r"^[a-f0-9]{32,}$", value.lower()):  # Hash/key pattern
+        if HEX_KEY_VALUE_RE.match(value):  # Hash/key pattern
             return "API_KEY"
-        if re.match(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$", value):  # IP pattern
+        if IP_VALUE_RE.match(value):  # IP pattern
             return "IP_ADDRESS"
         if "@" in value and "." in value:  # Email pattern
             return "EMAIL"
@@ -176,16 +474,20 @@ class SecretsManager:
 
         # Check if value already exists (by hash)
         value_hash = self._hash_value(value)
-        for label, meta in self._mapping.items():
-            if meta.get("hash") == value_hash:
-                return f"<<{label}>>"
+        existing = self._hash_to_label.get(value_hash)
+        if existing is not None:
+            return f"<<{existing}>>"
+
+        # New value: the vault must be loaded before it can be extended
+        secrets = self._ensure_secrets_loaded()
 
         # Detect secret type and generate label
         secret_type = self._detect_secret_type(key, value)
         label = self._generate_label(secret_type)
 
         # Store encrypted value
-        self._secrets[label] = value
+        secrets[label] = value
+        self._automaton = None
 
         # Store mapping metadata (no actual secret value)
         self._mapping[label] = {
@@ -193,8 +495,11 @@ class SecretsManager:
             "original_key": key,
             "description": description or f"Secret from {key}",
             "hash": value_hash,
-            "created": datetime.now().isoformat(),
         }
+        self._unstamped.append(label)
+        self._dirty = True
+        self._ai_mapping_cache = None
+        self._hash_to_label[value_hash] = label
 
         return f"<<{label}>>"
 
@@ -209,44 +514,58 @@ class SecretsManager:
         """
         # Strip << >> if present
         clean_label = label.replace("<<", "").replace(">>", "").strip()
-        return self._secrets.get(clean_label)
+        return self._ensure_secrets_loaded().get(clean_label)
 
     def save(self):
-        """Save secrets and mapping to files."""
-        # Save mapping (metadata only - safe to include in repo with caution)
-        mapping_data = {"counter": self._counter, "mapping": self._mapping, "updated": datetime.now().isoformat()}
-        with open(self.mapping_file, "w") as f:
-            json.dump(mapping_data, f, indent=2)
-
-        # Save encrypted secrets
-        if self._fernet:
-            secrets_json = json.dumps(self._secrets).encode()
-            encrypted = self._fernet.encrypt(secrets_json)
-            with open(self.secrets_file, "wb") as f:
-                f.write(encrypted)
-            os.chmod(self.secrets_file, 0o600)
-            print(f"✓ Saved {len(self._secrets)} encrypted secrets")
+        """Save secrets and mapping to files (skipped when nothing changed since the last save)."""
+        if not self._dirty and self.secrets_file.exists() and self.mapping_file.exists():
+            print("✓ Secrets unchanged, nothing to save")
+            return
+
+        now = datetime.now().isoformat()
+
+        # New entries share one creation timestamp per save
+        for label in self._unstamped:
+            self._mapping[label]["created"] = now
+        self._unstamped.clear()
+
+        secrets = self._ensure_secrets_loaded()
+
+        # Save encrypted secrets first, so a saved mapping never names labels missing from the vault
+        if self._aead:
+            secrets_json = _json_dumps(secrets)
+            nonce = os.urandom(AESGCM_NONCE_SIZE)
+            encrypted = VAULT_VERSION_AESGCM + nonce + self._aead.encrypt(nonce, secrets_json, None)
+            _atomic_write(self.secrets_file, encrypted, mode=0o600)
+            print(f"✓ Saved {len(secrets)} encrypted secrets")
         else:
             # Fallback: base64 encoding (NOT secure!)
-            encoded = base64.b64encode(json.dumps(self._secrets).encode())
-            with open(self.secrets_file, "wb") as f:
-                f.write(encoded)
+            encoded = base64.b64encode(_json_dumps(secrets))
+            _atomic_write(self.secrets_file, encoded)
             print("⚠ Saved secrets with base64 encoding (install cryptography for encryption)")
 
+        # Save mapping (metadata only - safe to include in repo with caution)
+        mapping_data = {
+            "counter": self._counter,
+            "hash_version": HASH_VERSION,
+            "mapping": self._mapping,
+            "updated": now,
+        }
+        _atomic_write(self.mapping_file, _json_dumps(mapping_data, indent=True))
+        self._dirty = False
+
     def get_mapping_for_ai(self) -> Dict[str, Dict]:
         """Get mapping info suitable for AI context (no actual secrets).
 
         Returns:
-            Dictionary with label metadata for AI
+            Dictionary with label metadata for AI (cached - do not modify)
         """
-        ai_mapping = {}
-        for label, meta in self._mapping.items():
-            ai_mapping[label] = {
-                "type": meta["type"],
-                "description": meta["description"],
-                "placeholder": f"<<{label}>>",
+        if self._ai_mapping_cache is None:
+            self._ai_mapping_cache = {
+                label: {"type": meta["type"], "description": meta["description"], "placeholder": f"<<{label}>>"}
+                for label, meta in self._mapping.items()
             }
-        return ai_mapping
+        return self._ai_mapping_cache
 
     def restore_secrets_in_text(self, text: str) -> str:
         """Replace all secret labels in text with actual values.
@@ -257,16 +576,47 @@ class SecretsManager:
         Returns:
             Text with secrets restored
         """
-        pattern = r"<<(" + re.escape(self.label_prefix) + r"_[A-Z]+_\d{3})>>"
+        if "<<" not in text:
+            return text
+
+        if AHOCORASICK_AVAILABLE:
+            automaton = self._restore_automaton()
+            if automaton.kind != ahocorasick.AHOCORASICK:
+                return text  # no restorable secrets
+
+            # Single scan for all known placeholders, stitching the output together
+            parts = []
+            pos = 0
+            for end, (length, secret) in automaton.iter(text):
+                start = end - length + 1
+                if start < pos:
+                    continue
+                parts.append(text[pos:start])
+                parts.append(secret)
+                pos = end + 1
+            parts.append(text[pos:])
+            return "".join(parts)
+
+        secrets = self._ensure_secrets_loaded()
 
         def replace_match(match):
-            label = match.group(1)
-            secret = self._secrets.get(label)
-            if secret:
-                return secret
-            return match.group(0)  # Keep original if not found
-
-        return re.sub(pattern, replace_match, text)
+            # Keep original if not found
+            return secrets.get(match.group(1)) or match.group(0)
+
+        return self._restore_re.sub(replace_match, text)
+
+    def _restore_automaton(self):
+        """Build (or reuse) an Aho-Corasick automaton over the stored <<LABEL>> placeholders."""
+        if self._automaton is None:
+            automaton = ahocorasick.Automaton()
+            for label, secret in self._ensure_secrets_loaded().items():
+                placeholder = f"<<{label}>>"
+                # Same placeholders the restore regex would replace
+                if secret and self._restore_re.fullmatch(placeholder):
+                    automaton.add_word(placeholder, (len(placeholder), secret))
+            automaton.make_automaton()
+            self._automaton = automaton
+        return self._automaton
 
     def restore_secrets_in_file(self, file_path: str, output_path: Optional[str] = None) -> bool:
         """Restore secrets in a file.
@@ -279,15 +629,14 @@ class SecretsManager:
             True if successful
         """
         try:
-            with open(file_path, "r") as f:
-                content = f.read()
-
-            restored = self.restore_secrets_in_text(content)
-
-            out_path = output_path or file_path
-            with open(out_path, "w") as f:
-                f.write(restored)
-
+            # Files without any placeholder are scanned in place and never rewritten
+            if not _file_contains(file_path, b"<<"):
+                if output_path and os.path.abspath(output_path) != os.path.abspath(file_path):
+                    shutil.copyfile(file_path, output_path)
+                return True
+
+            # Placeholders never span lines, so blocks of whole lines restore independently
+            _rewrite_file(file_path, output_path, lambda lines: self.restore_secrets_in_text("".join(lines)))
             return True
         except Exception as e:
             print(f"✗ Error restoring secrets in {file_path}: {e}")
@@ -312,8 +661,8 @@ class SecretsManager:
             "secret_labels": self.get_mapping_for_ai(),
         }
 
-        with open(output_file, "w") as f:
-            json.dump(ai_data, f, indent=2)
+        with open(output_file, "wb") as f:
+            f.write(_json_dumps(ai_data, indent=True))
 
         print(f"✓ AI secrets mapping exported to: {output_file}")
 
@@ -328,10 +677,15 @@ class SecretsManager:
             t = meta["type"]
             type_counts[t] = type_counts.get(t, 0) + 1
 
+        if self._passphrase_protected:
+            encryption = "AES-256-GCM (Argon2id passphrase)"
+        else:
+            encryption = "AES-256-GCM" if CRYPTO_AVAILABLE else "Base64 (not secure)"
+
         return {
-            "total_secrets": len(self._secrets),
+            "total_secrets": len(self._mapping),
             "by_type": type_counts,
-            "encryption": "Fernet (AES-128-CBC)" if CRYPTO_AVAILABLE else "Base64 (not secure)",
+            "encryption": encryption,
         }
 
     def print_summary(self):
@@ -352,6 +706,8 @@ class SecretsManager:
 class SecretsSanitizer:
     """Sanitizes configuration files by replacing secrets with labels."""
 
+    __slots__ = ("secrets_manager",)
+
     SENSITIVE_PATTERNS = {
         "password": r'(password|passwd|pass|pwd)\s*[:=]\s*["\']?([^"\'\n]+)["\']?',
         "token": r'(token|access_token|bearer_token)\s*[:=]\s*["\']?([^"\'\n]+)["\']?',
@@ -363,7 +719,19 @@ class SecretsSanitizer:
         "longitude": r"(longitude|lon|lng)\s*[:=]\s*(-?\d+\.?\d*)",
     }
 
-    SKIP_VALUES = ["example", "placeholder", "your_", "xxx", "***", "none", "null", "true", "false"]
+    # Compiled once per class; sanitize_yaml_content runs every pattern on every line
+    _COMPILED_PATTERNS = [
+        (pattern_type, re.compile(pattern, re.IGNORECASE)) for pattern_type, pattern in SENSITIVE_PATTERNS.items()
+    ]
+
+    # With Hyperscan installed, all patterns are first checked in a single DFA scan
+    # per line; only lines with a hit go through the re patterns that extract values
+    _HYPERSCAN_DB = _build_hyperscan_db(list(SENSITIVE_PATTERNS.values()))
+
+    SKIP_VALUES = frozenset(["example", "placeholder", "your_", "xxx", "***", "none", "null", "true", "false"])
+
+    # Any SKIP_VALUES substring, found in one scan
+    _SKIP_RE = re.compile("|".join(map(re.escape, sorted(SKIP_VALUES))))
 
     def __init__(self, secrets_manager: SecretsManager):
         """Initialize sanitizer with secrets manager.
@@ -385,8 +753,7 @@ class SecretsSanitizer:
         if not value or len(value) < 3:
             return True
 
-        value_lower = value.lower()
-        return any(skip in value_lower for skip in self.SKIP_VALUES)
+        return self._SKIP_RE.search(value.lower()) is not None
 
     def sanitize_yaml_content(self, content: str) -> str:
         """Sanitize YAML content by replacing secrets.
@@ -397,38 +764,68 @@ class SecretsSanitizer:
         Returns:
             Sanitized content with labels
         """
-        lines = content.split("\n")
-        sanitized_lines = []
+        return "\n".join(map(self.sanitize_line, content.split("\n")))
 
-        for line in lines:
-            sanitized_line = line
+    def sanitize_line(self, line: str) -> str:
+        """Sanitize a single line (without its line terminator).
 
-            # Skip comments
-            if line.strip().startswith("#"):
-                sanitized_lines.append(line)
-                continue
-
-            # Check each pattern
-            for pattern_type, pattern in self.SENSITIVE_PATTERNS.items():
-                matches = re.finditer(pattern, line, re.IGNORECASE)
-                for match in matches:
-                    if pattern_type in ["email", "ip_address"]:
-                        value = match.group(0)
-                        key = pattern_type
-                    else:
-                        try:
-                            key = match.group(1)
-                            value = match.group(2)
-                        except:
-                            continue
+        Args:
+            line: Line of YAML content
 
-                    if not self.should_skip(value):
-                        label = self.secrets_manager.add_secret(key, value.strip())
-                        sanitized_line = sanitized_line.replace(value, label)
+        Returns:
+            Sanitized line with labels
+        """
+        # Skip comments
+        if line.strip().startswith("#"):
+            return line
+
+        # Every pattern needs a separator (key/value), '@' (email) or '.' (IP address)
+        if ":" not in line and "=" not in line and "@" not in line and "." not in line:
+            return line
+        # Hyperscan scans bytes with ASCII-only classes and case folding, so it
+        # can only rule out lines that re would also read as plain ASCII
+        if self._HYPERSCAN_DB is not None and line.isascii() and not _hyperscan_matches(self._HYPERSCAN_DB, line):
+            return line
+
+        # Collect (start, end, pattern order, key, value) for every value to replace
+        spans = []
+        for order, (pattern_type, pattern) in enumerate(self._COMPILED_PATTERNS):
+            for match in pattern.finditer(line):
+                if pattern_type in ["email", "ip_address"]:
+                    group = 0
+                    key = pattern_type
+                else:
+                    group = 2
+                    key = match.group(1)
+
+                value = match.group(group)
+                if not self.should_skip(value):
+                    start, end = match.span(group)
+                    spans.append((start, end, order, key, value))
+
+        if not spans:
+            return line
+
+        # Splice labels in by position; a span overlapping an earlier one is dropped
+        spans.sort()
+        parts = []
+        pos = 0
+        for start, end, _, key, value in spans:
+            if start < pos:
+                continue
+            parts.append(line[pos:start])
+            parts.append(self.secrets_manager.add_secret(key, value.strip()))
+            pos = end
+        parts.append(line[pos:])
 
-            sanitized_lines.append(sanitized_line)
+        return "".join(parts)
 
-        return "\n".join(sanitized_lines)
+    def _sanitize_lines(self, lines) -> str:
+        """Sanitize lines that keep their trailing newline (as read from a file)."""
+        sanitize_line = self.sanitize_line
+        return "".join(
+            sanitize_line(line[:-1]) + "\n" if line.endswith("\n") else sanitize_line(line) for line in lines
+        )
 
     def sanitize_file(self, file_path: str, output_path: Optional[str] = None) -> bool:
         """Sanitize a file.
@@ -441,15 +838,7 @@ class SecretsSanitizer:
             True if successful
         """
         try:
-            with open(file_path, "r") as f:
-                content = f.read()
-
-            sanitized = self.sanitize_yaml_content(content)
-
-            out_path = output_path or file_path
-            with open(out_path, "w") as f:
-                f.write(sanitized)
-
+            _rewrite_file(file_path, output_path, self._sanitize_lines)
             return True
         except Exception as e:
             print(f"✗ Error sanitizing {file_path}: {e}")
@@ -9,17 +9,356 @@ import sys
 import subprocess
 import logging
 import time
+import random
 import shlex
+import shutil
+import tempfile
+import threading
+import asyncio
+import atexit
+import collections
+import fnmatch
+import contextlib
+import functools
+import hashlib
+import json
+import re
+import socket
+import stat
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Literal, Union
 from datetime import datetime
 
+try:
+    import blake3
+
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+try:
+    import xxhash
+
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import paramiko
+
+    PARAMIKO_AVAILABLE = True
+except ImportError:
+    PARAMIKO_AVAILABLE = False
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Idle paramiko clients keyed by connection identity, shared by SSHTransfer instances
+_SSH_POOL: Dict[tuple, collections.deque] = {}
+_SSH_POOL_LOCK = threading.Lock()
+
+# Seconds between keepalive packets on pooled paramiko and ControlMaster connections
+SSH_KEEPALIVE = 30
+
+# SFTP downloads from this size on are preallocated and written through a
+# large buffer, so the local side makes few big writes instead of many 32KB ones
+SFTP_LARGE_FILE = 64 * 1024 * 1024
+SFTP_WRITE_BUFFER = 4 * 1024 * 1024
+
+# Concurrent SFTP channels for directory uploads over one paramiko connection
+SFTP_UPLOAD_WORKERS = 8
+
+# Worker threads shared by parallel rsync downloads and SFTP uploads
+TRANSFER_WORKERS = 8
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Directory holding OpenSSH ControlMaster sockets (one per user@host:port and transport settings)
+CONTROL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ha_ai_gen")
+CONTROL_PERSIST = "60s"
+
+# Control sockets opened by this process, mapped to their destination, so the
+# masters can be shut down on interpreter exit.
+_control_masters = {}
+
+# Restart methods as (probe, command), checked in order: Home Assistant OS,
+# Docker, systemd, Supervisor. The first method whose probe succeeds is used.
+RESTART_METHODS = [
+    ("command -v ha >/dev/null 2>&1", "ha core restart"),
+    ("docker ps --format '{{.Names}}' 2>/dev/null | grep -qx homeassistant", "docker restart homeassistant"),
+    (
+        "systemctl list-units --all 2>/dev/null | grep -q home-assistant",
+        "systemctl restart home-assistant@homeassistant",
+    ),
+    ("command -v supervisorctl >/dev/null 2>&1", "supervisorctl restart homeassistant"),
+]
+RESTART_COMMANDS = [command for _, command in RESTART_METHODS]
+
+# The restart methods as one shell if/elif chain, so the remote shell picks the
+# installation type in a single SSH call. The chosen method announces itself
+# with TRIED:<command>; the script exits 1 if no probe matches.
+RESTART_SCRIPT = " ".join(
+    f"{'elif' if i else 'if'} {probe}; then echo 'TRIED:{cmd}'; {cmd} >/dev/null 2>&1;"
+    for i, (probe, cmd) in enumerate(RESTART_METHODS)
+) + " else exit 1; fi"
+
+# Configuration check with the ha CLI where installed, else Home Assistant's own
+# check_config script; format with the shell-quoted config path
+CONFIG_CHECK_SCRIPT = (
+    "if command -v ha >/dev/null 2>&1; then ha core check; "
+    "else hass --script check_config -c {config_path}; fi"
+)
+
+# stderr fragments of errors that retrying cannot fix (bad path, credentials, host)
+UNRECOVERABLE_PATTERNS = (
+    "Permission denied",
+    "No such file",
+    "Could not resolve hostname",
+    "Authentication failed",
+    "Host key verification failed",
+)
+
+# stderr fragments of errors that may clear up on their own (network, restarts)
+RECOVERABLE_PATTERNS = (
+    "Connection reset",
+    "timed out",
+    "Connection refused",
+    "No route to host",
+    "Network is unreachable",
+)
+
+# rsync transfer flags: compressed delta transfer for slow links, and whole-file
+# in-place copies for LANs where compression and rolling checksums cost more
+# CPU than they save in bandwidth. Level 1 compression keeps zlib from becoming
+# the bottleneck on small HA hosts, and interrupted files wait in a partial dir
+# for the next run instead of leaving truncated files in place.
+RSYNC_FLAGS = ["-avz", "--compress-level=1", "--partial-dir=.rsync-partial", "--info=stats2"]
+RSYNC_LAN_FLAGS = ["-av", "--whole-file", "--inplace", "--info=stats2"]
+
+# rsync gives up when no data moves for this many seconds, so a stalled
+# transfer fails early instead of waiting out the overall transfer timeout
+RSYNC_IO_TIMEOUT = 120
+
+# ssh options for rsync's transport: no tty, no ssh-level compression on top of
+# rsync's own, and throughput-oriented IP QoS marking
+RSYNC_SSH_OPTIONS = ["-T", "-o", "Compression=no", "-o", "IPQoS=throughput"]
+
+# Prints "no" when the remote host has no rsync; run once per connection
+REMOTE_RSYNC_PROBE = "command -v rsync >/dev/null 2>&1 && echo yes || echo no"
+
+# Upper bound on concurrent rsync processes for one parallel directory download
+RSYNC_MAX_WORKERS = 8
+
+# rsync filter merge files written by this process, keyed by their patterns
+_filter_files: Dict[Tuple[str, ...], str] = {}
+_filter_files_lock = threading.Lock()
+
+# Remote entry names that can be passed to rsync without shell quoting
+_SAFE_ENTRY_RE = re.compile(r"[\w.@+-]+")
+
+# Remote backup compressors, best first: name -> (tar compress program, archive suffix).
+# zstd and pigz use every core; gzip (tar -z) is the portable fallback.
+BACKUP_COMPRESSORS = {
+    "zstd": ("zstd -T0 -3", ".tar.zst"),
+    "pigz": ("pigz", ".tar.gz"),
+    "gzip": (None, ".tar.gz"),
+}
+
+# Prints the best available compressor; --use-compress-program needs GNU tar
+_COMPRESSOR_PROBE = (
+    "if tar --version 2>/dev/null | grep -q GNU; then "
+    "for c in zstd pigz; do command -v $c >/dev/null 2>&1 && { echo $c; exit 0; }; done; fi; echo gzip"
+)
+
+# Remote checksum tools that can be verified locally, fastest first
+HASH_TOOLS = [
+    tool
+    for tool, available in (("b3sum", BLAKE3_AVAILABLE), ("xxh64sum", XXHASH_AVAILABLE), ("sha256sum", True))
+    if available
+]
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Local file digests keyed by tool and path, reused while size and mtime match
+HASH_CACHE_FILE = os.path.join(CONTROL_DIR, "hashes.json")
+_hash_cache: Optional[Dict[str, list]] = None
+_hash_cache_lock = threading.Lock()
+
+# Lines of streamed command output kept for error reporting
+OUTPUT_TAIL_LINES = 200
+
+# Files and directories never worth exporting from a Home Assistant config dir
+DEFAULT_EXPORT_EXCLUDES = ["*.log", "*.db", "*.db-*", "deps/", "__pycache__/", "tts/", ".cloud/", "backups/"]
+
+_UNRECOVERABLE_RE = re.compile("|".join(map(re.escape, UNRECOVERABLE_PATTERNS)))
+_RECOVERABLE_RE = re.compile("|".join(map(re.escape, RECOVERABLE_PATTERNS)))
+
+# Known ssh/scp error fragments, matched in a single scan of stderr
+_ERR_RE = re.compile(
+    r"(Connection refused|Permission denied|Authentication failed|No route to host"
+    r"|Network is unreachable|Could not resolve hostname|No such file or directory)"
+)
+
+# User-facing test_connection() messages for the errors matched by _ERR_RE
+CONNECTION_ERROR_MESSAGES = {
+    "Connection refused": "Connection refused: SSH service may not be running on {host}:{port}",
+    "Permission denied": "Authentication failed: Check username, password, or SSH key",
+    "Authentication failed": "Authentication failed: Check username, password, or SSH key",
+    "No route to host": "Network unreachable: Cannot reach host {host}",
+    "Network is unreachable": "Network unreachable: Cannot reach host {host}",
+    "Could not resolve hostname": "Cannot resolve hostname: {host}",
+}
+
+# Sentinels framing each step's output in execute_script()
+_STEP_MARKER_RE = re.compile(r"^---(STEP|EXIT):(.+)---$")
+
+# Seconds a timed-out child gets to exit after SIGTERM before it is killed
+TERMINATE_GRACE = 2.0
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_executable(name: str) -> Optional[str]:
+    """Resolve a program name on PATH once per process."""
+    return name if os.path.isabs(name) else shutil.which(name)
+
+
+def _spawn_kwargs(cmd: List[str]) -> dict:
+    """Get Popen keyword arguments that let CPython start cmd with posix_spawn.
+
+    CPython only uses posix_spawn, which skips copying the parent's page
+    tables, for an absolute executable with close_fds=False. Not closing fds
+    is safe here: fds Python opens are non-inheritable (PEP 446) and closed
+    on exec anyway.
+    """
+    kwargs = {"close_fds": False}
+    executable = _resolve_executable(cmd[0])
+    if executable:
+        kwargs["executable"] = executable
+    return kwargs
+
+
+def run_with_grace(
+    cmd: List[str], timeout: float, grace: float = TERMINATE_GRACE, **kwargs
+) -> subprocess.CompletedProcess:
+    """Run a command like subprocess.run(), but stop it gently on timeout.
+
+    subprocess.run() SIGKILLs a timed-out child, so ssh/scp never close their
+    session and the remote command keeps running. Here the child gets SIGTERM
+    first and grace seconds to shut down before SIGKILL.
+
+    Args:
+        cmd: Command to run
+        timeout: Seconds before the command is terminated
+        grace: Seconds between SIGTERM and SIGKILL
+        **kwargs: Passed to subprocess.Popen (stdout, stderr, text, ...)
+
+    Returns:
+        CompletedProcess with returncode, stdout and stderr
+
+    Raises:
+        subprocess.TimeoutExpired: If the command did not finish in time
+    """
+    with subprocess.Popen(cmd, **{**_spawn_kwargs(cmd), **kwargs}) as proc:
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+            try:
+                proc.communicate(timeout=grace)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def _close_control_master(control_path: str, destination: str) -> None:
+    """Ask the ControlMaster behind control_path to exit, if it is running."""
+    if not os.path.exists(control_path):
+        return
+    try:
+        subprocess.run(
+            ["ssh", "-O", "exit", "-o", f"ControlPath={control_path}", destination],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not close SSH control master {control_path}: {e}")
+
+
+@atexit.register
+def _close_control_masters() -> None:
+    """Shut down every ControlMaster started by this process."""
+    for control_path, destination in list(_control_masters.items()):
+        _close_control_master(control_path, destination)
+    _control_masters.clear()
+
+
+def _get_filter_file(patterns: Tuple[str, ...]) -> str:
+    """Get an rsync filter merge file excluding patterns, writing it on first use.
+
+    rsync checks the rules in order and stops at the first match, so
+    directory patterns, which prune whole subtrees, are listed before file
+    globs. With exclude rules only, the order does not change what matches.
+    """
+    with _filter_files_lock:
+        path = _filter_files.get(patterns)
+        if path is None or not os.path.exists(path):
+            ordered = sorted(patterns, key=lambda pattern: not pattern.endswith("/"))
+            fd, path = tempfile.mkstemp(prefix="ha_rsync_filter_", suffix=".txt")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("".join(f"- {pattern}\n" for pattern in ordered))
+            _filter_files[patterns] = path
+        return path
+
+
+@atexit.register
+def _remove_filter_files() -> None:
+    """Delete the filter files written by this process."""
+    with _filter_files_lock:
+        for path in _filter_files.values():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        _filter_files.clear()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by all transfers, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TRANSFER_WORKERS, thread_name_prefix="ha-ssh")
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+@atexit.register
+def _close_pooled_clients() -> None:
+    """Close every idle paramiko client left in the pool."""
+    with _SSH_POOL_LOCK:
+        clients = [client for pool in _SSH_POOL.values() for client in pool]
+        _SSH_POOL.clear()
+    for client in clients:
+        client.close()
+
 
 class SSHTransfer:
-    """Handles SSH/SCP file transfers to/from Home Assistant."""
+    """Handles SSH/SCP file transfers to/from Home Assistant.
+
+    All ssh, scp and rsync invocations share one TCP connection through
+    OpenSSH ControlMaster multiplexing: the first command opens a master
+    connection (ControlMaster=auto) bound to a private socket under
+    CONTROL_DIR, and ControlPersist keeps it alive in the background so later
+    commands skip the TCP handshake, key exchange and authentication. The
+    master is shut down on interpreter exit or by calling close().
+    """
+
+    # rsync and tar resolved once on PATH at import time
+    _rsync_path = shutil.which("rsync")
+    _tar_path = shutil.which("tar")
 
     def __init__(
         self,
@@ -32,6 +371,12 @@ class SSHTransfer:
         transfer_timeout: int = 600,
         retry_attempts: int = 3,
         retry_delay: int = 2,
+        multiplex: bool = True,
+        retry_max_delay: int = 30,
+        retry_jitter: float = 0.5,
+        compress: bool = True,
+        cipher: Optional[str] = "aes128-gcm@openssh.com",
+        use_paramiko: bool = False,
     ):
         """Initialize SSH transfer.
 
@@ -44,7 +389,20 @@ class SSHTransfer:
             connection_timeout: SSH connection timeout in seconds (default: 30)
             transfer_timeout: File transfer timeout in seconds (default: 600)
             retry_attempts: Number of retry attempts for transient failures (default: 3)
-            retry_delay: Delay between retries in seconds (default: 2)
+            retry_delay: Base delay between retries in seconds, doubled per attempt (default: 2)
+            multiplex: Reuse one connection via OpenSSH ControlMaster (default: True)
+            retry_max_delay: Upper bound for the retry delay in seconds (default: 30)
+            retry_jitter: Random +/- fraction applied to each retry delay (default: 0.5)
+            compress: Enable SSH compression for ssh/scp (default: True)
+            cipher: SSH cipher to prefer, moved to the front of OpenSSH's default list so
+                hosts without it still negotiate another; None keeps the default order
+                (default: aes128-gcm@openssh.com, which uses AES-NI where available)
+            use_paramiko: Run commands and single-file transfers over pooled paramiko
+                connections instead of ssh/scp subprocesses; ignored if paramiko is not
+                installed (default: False)
+
+        Raises:
+            FileNotFoundError: If password authentication is requested but sshpass is not installed
         """
         self.host = host
         self.user = user
@@ -55,12 +413,293 @@ class SSHTransfer:
         self.transfer_timeout = transfer_timeout
         self.retry_attempts = retry_attempts
         self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self.retry_jitter = retry_jitter
+        self.compress = compress
+        self.cipher = cipher
+
+        self.use_paramiko = use_paramiko and PARAMIKO_AVAILABLE
+        if use_paramiko and not PARAMIKO_AVAILABLE:
+            logger.warning("paramiko not installed, falling back to ssh/scp subprocesses")
+
+        # Password authentication goes through sshpass; resolve it once and fail early
+        self._sshpass_path = None
+        if self.password and not self.key_path:
+            self._sshpass_path = shutil.which("sshpass")
+            if not self._sshpass_path:
+                raise FileNotFoundError(
+                    "sshpass not found on PATH: install sshpass or use key_path for SSH key authentication"
+                )
 
         self._client = None
         self._sftp = None
 
+        self._remote_compressor = None
+        self._remote_rsync: Optional[bool] = None
+
+        # Connection identity; instances with the same identity are interchangeable
+        self._connection = (self.host, self.user, self.port, self.key_path, self.password)
+
+        # Compression and cipher belong to the master's transport and cannot be
+        # changed by multiplexed clients, so ssh/scp and rsync (which compresses
+        # with -z itself) get separate masters unless ssh compression is off
+        self._control_path = self._init_control_path(self.compress) if multiplex else None
+        self._rsync_control_path = self._init_control_path(False) if multiplex else None
+
+        # Base commands depend only on the settings above, so build them once
+        self._ssh_base: Tuple[str, ...] = tuple(self._build_ssh_base())
+        self._scp_base: Tuple[str, ...] = tuple(self._build_scp_base())
+        self._rsync_prefix, self._rsync_ssh = self._build_rsync_transport()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SSHTransfer):
+            return NotImplemented
+        return self._connection == other._connection
+
+    def __hash__(self) -> int:
+        return hash(self._connection)
+
+    def _init_control_path(self, compress: bool) -> Optional[str]:
+        """Return the ControlMaster socket path for this connection.
+
+        The file name is a short digest of user@host:port and the transport
+        settings the master is opened with, so it stays well below the unix
+        socket path length limit. Returns None when multiplexing is
+        unavailable on this platform.
+
+        Args:
+            compress: Whether the master connection uses ssh compression
+        """
+        if os.name != "posix":
+            return None
+        try:
+            os.makedirs(CONTROL_DIR, mode=0o700, exist_ok=True)
+        except OSError as e:
+            logger.debug(f"SSH multiplexing disabled, cannot create {CONTROL_DIR}: {e}")
+            return None
+
+        identity = f"{self.user}@{self.host}:{self.port}:{os.getuid()}:{int(compress)}:{self.cipher or ''}"
+        digest = hashlib.blake2b(identity.encode("utf-8"), digest_size=8).hexdigest()
+        control_path = os.path.join(CONTROL_DIR, f"cm-{digest}.sock")
+        _control_masters[control_path] = f"{self.user}@{self.host}"
+        return control_path
+
+    def _backoff(self, attempt: int) -> float:
+        """Get the delay before the next retry.
+
+        Truncated exponential backoff with jitter, so retries from several
+        clients do not hit a recovering host in lockstep.
+
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+
+        Returns:
+            Delay in seconds
+        """
+        delay = min(self.retry_max_delay, self.retry_delay * (2 ** attempt))
+        return delay * (1 + random.uniform(-self.retry_jitter, self.retry_jitter))
+
+    @staticmethod
+    def _classify_stderr(err: str) -> Literal["perm", "transient", "unknown"]:
+        """Classify an ssh/scp error as permanent, transient or unknown.
+
+        Permanent errors fail immediately; transient and unknown errors are
+        retried.
+        """
+        if _UNRECOVERABLE_RE.search(err):
+            return "perm"
+        if _RECOVERABLE_RE.search(err):
+            return "transient"
+        return "unknown"
+
+    @staticmethod
+    def _match_err(err: str) -> Optional[str]:
+        """Return the first known error fragment in an ssh/scp error, if any."""
+        match = _ERR_RE.search(err)
+        return match.group(1) if match else None
+
+    def _get_control_options(self, control_path: Optional[str]) -> List[str]:
+        """Get ssh -o options enabling ControlMaster multiplexing over control_path."""
+        if not control_path:
+            return []
+        return [
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={control_path}",
+            "-o", f"ControlPersist={CONTROL_PERSIST}",
+            # Keep NAT mappings open while the idle master persists
+            "-o", f"ServerAliveInterval={SSH_KEEPALIVE}",
+        ]
+
+    def _get_transport_options(self, compress: bool) -> List[str]:
+        """Get ssh options for compression and cipher selection."""
+        options = ["-C"] if compress else []
+        if self.cipher:
+            # '^' prepends to the default cipher list; -c would replace it
+            options.extend(["-o", f"Ciphers=^{self.cipher}"])
+        return options
+
+    def close(self) -> None:
+        """Shut down the multiplexed master connection and pooled paramiko clients, if any."""
+        for control_path in {self._control_path, self._rsync_control_path} - {None}:
+            _close_control_master(control_path, f"{self.user}@{self.host}")
+        with _SSH_POOL_LOCK:
+            clients = _SSH_POOL.pop(self._connection, ())
+        for client in clients:
+            client.close()
+
+    def _connect_client(self) -> "paramiko.SSHClient":
+        """Open a new paramiko connection with this instance's settings."""
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        # Same trust-on-first-use policy as StrictHostKeyChecking=accept-new
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname=self.host,
+            port=self.port,
+            username=self.user,
+            key_filename=self.key_path,
+            password=self.password,
+            timeout=self.connection_timeout,
+            compress=self.compress,
+        )
+        client.get_transport().set_keepalive(SSH_KEEPALIVE)
+        return client
+
+    @contextlib.contextmanager
+    def _borrow_client(self):
+        """Borrow a connected paramiko client from the pool, opening one if none is idle.
+
+        The client goes back to the pool when the block exits, unless it
+        raised or the connection dropped, in which case it is closed.
+        """
+        client = None
+        with _SSH_POOL_LOCK:
+            pool = _SSH_POOL.get(self._connection)
+            while pool:
+                candidate = pool.pop()
+                transport = candidate.get_transport()
+                if transport is not None and transport.is_active():
+                    client = candidate
+                    break
+                candidate.close()
+        if client is None:
+            client = self._connect_client()
+
+        try:
+            yield client
+        except BaseException:
+            client.close()
+            raise
+
+        transport = client.get_transport()
+        if transport is not None and transport.is_active():
+            with _SSH_POOL_LOCK:
+                _SSH_POOL.setdefault(self._connection, collections.deque()).append(client)
+        else:
+            client.close()
+
+    def _paramiko_execute(self, command: str, timeout: int, capture: bool) -> Tuple[bool, str, str]:
+        """Run a command over a pooled paramiko connection; see execute_command."""
+        try:
+            with self._borrow_client() as client:
+                _, stdout, stderr = client.exec_command(command, timeout=timeout)
+                out = stdout.read().decode("utf-8", "replace")
+                err = stderr.read().decode("utf-8", "replace")
+                returncode = stdout.channel.recv_exit_status()
+        except socket.timeout:
+            logger.error(f"Command timeout after {timeout}s: {command}")
+            return False, "", f"Command timeout after {timeout}s"
+        except (paramiko.SSHException, OSError) as e:
+            logger.error(f"SSH error executing command: {e}")
+            return False, "", str(e)
+
+        if returncode == 0:
+            logger.debug(f"Command executed successfully: {command}")
+        else:
+            logger.warning(f"Command failed with exit code {returncode}: {command}")
+        return returncode == 0, out if capture else "", err
+
+    @staticmethod
+    def _sftp_get_large(sftp: "paramiko.SFTPClient", remote_path: str, local_path: str, size: int) -> None:
+        """Download a large file with read-ahead into a preallocated, heavily buffered local file."""
+        with open(local_path, "wb", buffering=SFTP_WRITE_BUFFER) as f:
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                except OSError:
+                    pass  # Not supported by this filesystem; the file just grows as it is written
+            sftp.getfo(remote_path, f, prefetch=True)
+
+    def _sftp_transfer(self, local_path: str, remote_path: str, upload: bool) -> Optional[bool]:
+        """Copy a single file over SFTP on a pooled paramiko connection.
+
+        Args:
+            local_path: Local file path
+            remote_path: Remote file path
+            upload: True to copy local_path to remote_path, False for the reverse
+
+        Returns:
+            True if successful, False if every attempt failed, or None if the
+            source is a directory, which is left to scp's recursive copy
+        """
+        for attempt in range(self.retry_attempts):
+            try:
+                with self._borrow_client() as client:
+                    with client.open_sftp() as sftp:
+                        sftp.get_channel().settimeout(self.transfer_timeout)
+                        if upload:
+                            if os.path.isdir(local_path):
+                                return None
+                            sftp.put(local_path, remote_path)
+                        else:
+                            attrs = sftp.stat(remote_path)
+                            if stat.S_ISDIR(attrs.st_mode):
+                                return None
+                            if attrs.st_size >= SFTP_LARGE_FILE:
+                                self._sftp_get_large(sftp, remote_path, local_path, attrs.st_size)
+                            else:
+                                sftp.get(remote_path, local_path)
+                return True
+
+            except FileNotFoundError as e:
+                logger.error(f"SFTP path not found: {e}")
+                return False
+
+            except paramiko.AuthenticationException as e:
+                logger.error(f"SFTP authentication failed: {e}")
+                return False
+
+            except (paramiko.SSHException, OSError) as e:
+                logger.warning(f"SFTP transfer failed (attempt {attempt + 1}/{self.retry_attempts}): {e}")
+                if attempt < self.retry_attempts - 1:
+                    time.sleep(self._backoff(attempt))
+
+        return False
+
     def _get_ssh_command_base(self) -> List[str]:
         """Get base SSH command with authentication.
+
+        Returns a fresh copy of the command built at construction, so callers
+        may extend it.
+
+        Note: For password authentication, caller must set SSHPASS environment
+        variable before calling and clean it up afterward.
+        """
+        return list(self._ssh_base)
+
+    def _get_scp_command_base(self) -> List[str]:
+        """Get base SCP command with authentication.
+
+        Returns a fresh copy of the command built at construction, so callers
+        may extend it.
+
+        Note: For password authentication, caller must set SSHPASS environment
+        variable before calling and clean it up afterward.
+        """
+        return list(self._scp_base)
+
+    def _build_ssh_base(self) -> List[str]:
+        """Build base SSH command with authentication.
         
         Note: For password authentication, caller must set SSHPASS environment
         variable before calling and clean it up afterward.
@@ -69,7 +708,7 @@ class SSHTransfer:
         
         # Use sshpass for password authentication with environment variable (more secure)
         if self.password and not self.key_path:
-            cmd.extend(["sshpass", "-e"])  # -e flag reads password from SSHPASS env var
+            cmd.extend([self._sshpass_path, "-e"])  # -e flag reads password from SSHPASS env var
         
         cmd.extend(["ssh", "-p", str(self.port)])
 
@@ -79,11 +718,13 @@ class SSHTransfer:
             cmd.extend(["-o", "BatchMode=yes"])
         
         cmd.extend(["-o", "StrictHostKeyChecking=accept-new"])
+        cmd.extend(self._get_control_options(self._control_path))
+        cmd.extend(self._get_transport_options(self.compress))
 
         return cmd
 
-    def _get_scp_command_base(self) -> List[str]:
-        """Get base SCP command with authentication.
+    def _build_scp_base(self) -> List[str]:
+        """Build base SCP command with authentication.
         
         Note: For password authentication, caller must set SSHPASS environment
         variable before calling and clean it up afterward.
@@ -92,7 +733,7 @@ class SSHTransfer:
         
         # Use sshpass for password authentication with environment variable (more secure)
         if self.password and not self.key_path:
-            cmd.extend(["sshpass", "-e"])  # -e flag reads password from SSHPASS env var
+            cmd.extend([self._sshpass_path, "-e"])  # -e flag reads password from SSHPASS env var
         
         cmd.extend(["scp", "-P", str(self.port)])
 
@@ -100,6 +741,8 @@ class SSHTransfer:
             cmd.extend(["-i", self.key_path])
 
         cmd.extend(["-o", "StrictHostKeyChecking=accept-new"])
+        cmd.extend(self._get_control_options(self._control_path))
+        cmd.extend(self._get_transport_options(self.compress))
         cmd.extend(["-r"])  # Recursive by default
 
         return cmd
@@ -117,9 +760,12 @@ class SSHTransfer:
                     os.environ['SSHPASS'] = self.password
                 
                 cmd = self._get_ssh_command_base()
-                cmd.extend([f"{self.user}@{self.host}", "echo 'Connection successful'"])
+                # Only the exit status matters, so run a no-op and discard stdout
+                cmd.extend([f"{self.user}@{self.host}", "true"])
 
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.connection_timeout)
+                result = run_with_grace(
+                    cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=self.connection_timeout
+                )
 
                 if result.returncode == 0:
                     logger.info(f"SSH connection successful to {self.user}@{self.host}:{self.port}")
@@ -129,28 +775,31 @@ class SSHTransfer:
                     logger.warning(f"SSH connection failed (attempt {attempt + 1}/{self.retry_attempts}): {error_msg}")
 
                     # Check for specific error conditions
-                    if "Connection refused" in error_msg:
-                        return False, f"Connection refused: SSH service may not be running on {self.host}:{self.port}"
-                    elif "Permission denied" in error_msg or "Authentication failed" in error_msg:
-                        return False, "Authentication failed: Check username, password, or SSH key"
-                    elif "No route to host" in error_msg or "Network is unreachable" in error_msg:
-                        return False, f"Network unreachable: Cannot reach host {self.host}"
-                    elif "Could not resolve hostname" in error_msg:
-                        return False, f"Cannot resolve hostname: {self.host}"
+                    template = CONNECTION_ERROR_MESSAGES.get(self._match_err(error_msg))
+                    if template:
+                        message = template.format(host=self.host, port=self.port)
+                    else:
+                        message = f"Connection failed: {error_msg}"
+
+                    # Permanent errors will not go away by retrying
+                    if self._classify_stderr(error_msg) == "perm":
+                        return False, message
 
                     # For other errors, retry if attempts remain
                     if attempt < self.retry_attempts - 1:
-                        logger.info(f"Retrying in {self.retry_delay} seconds...")
-                        time.sleep(self.retry_delay)
+                        delay = self._backoff(attempt)
+                        logger.info(f"Retrying in {delay:.1f} seconds...")
+                        time.sleep(delay)
                         continue
 
-                    return False, f"Connection failed: {error_msg}"
+                    return False, message
 
             except subprocess.TimeoutExpired:
                 logger.warning(f"SSH connection timeout (attempt {attempt + 1}/{self.retry_attempts})")
                 if attempt < self.retry_attempts - 1:
-                    logger.info(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
+                    delay = self._backoff(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
                     continue
                 return False, f"Connection timeout after {self.connection_timeout}s. Host may be unreachable."
 
@@ -169,12 +818,86 @@ class SSHTransfer:
 
         return False, "Connection failed after all retry attempts"
 
-    def execute_command(self, command: str, timeout: Optional[int] = None) -> Tuple[bool, str, str]:
+    def _control_check_command(self) -> List[str]:
+        """Get the 'ssh -O check' command asking the master whether it is alive."""
+        return ["ssh", "-O", "check", "-o", f"ControlPath={self._control_path}", f"{self.user}@{self.host}"]
+
+    def _has_control_master(self) -> bool:
+        """Check whether a multiplexed master connection is already up.
+
+        A socket left behind by a killed master still exists on disk, so the
+        master itself is asked over the socket; this is local and costs no
+        network round trip.
+        """
+        if not self._control_path or not os.path.exists(self._control_path):
+            return False
+        try:
+            result = run_with_grace(
+                self._control_check_command(), timeout=5, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"Could not check SSH master connection: {e}")
+            return False
+        return result.returncode == 0
+
+    def start_master(self) -> bool:
+        """Open the multiplexed master connection in the background now.
+
+        Normally the first ssh command becomes the master; starting it up
+        front moves the handshake ahead of the first real operation.
+
+        Returns:
+            True if a master connection is running
+        """
+        if not self._control_path:
+            return False
+        if self._has_control_master():
+            return True
+
+        try:
+            if self.password and not self.key_path:
+                os.environ['SSHPASS'] = self.password
+
+            cmd = self._get_ssh_command_base()
+            # -N: no remote command, -f: fork once authenticated. ControlMaster=auto makes it the master.
+            cmd.extend(["-N", "-f", f"{self.user}@{self.host}"])
+            # The forked master inherits stdio, so piping it would block until the master exits
+            result = run_with_grace(
+                cmd, timeout=self.connection_timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            return result.returncode == 0
+
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Could not start SSH master connection: {e}")
+            return False
+
+        finally:
+            if 'SSHPASS' in os.environ:
+                del os.environ['SSHPASS']
+
+    def ensure_connected(self) -> Tuple[bool, str]:
+        """Make sure the host is reachable, probing only when necessary.
+
+        A running ControlMaster already proves connectivity, so the probe is
+        skipped; otherwise this falls back to test_connection().
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if self._has_control_master():
+            logger.debug(f"Reusing SSH master connection to {self.user}@{self.host}:{self.port}")
+            return True, "Connection active"
+        return self.test_connection()
+
+    def execute_command(
+        self, command: str, timeout: Optional[int] = None, capture: bool = True
+    ) -> Tuple[bool, str, str]:
         """Execute command on remote host with timeout.
 
         Args:
             command: Command to execute
             timeout: Command timeout in seconds (default: uses connection_timeout * 4)
+            capture: Capture stdout; when False it is discarded and "" returned (default: True)
 
         Returns:
             Tuple of (success, stdout, stderr)
@@ -182,6 +905,9 @@ class SSHTransfer:
         if timeout is None:
             timeout = self.connection_timeout * 4  # Allow longer for command execution
 
+        if self.use_paramiko:
+            return self._paramiko_execute(command, timeout, capture)
+
         try:
             # Set SSHPASS for password authentication
             if self.password and not self.key_path:
@@ -190,7 +916,19 @@ class SSHTransfer:
             cmd = self._get_ssh_command_base()
             cmd.extend([f"{self.user}@{self.host}", command])
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            if capture:
+                result = subprocess.run(
+                    cmd, capture_output=True, text=True, timeout=timeout, **_spawn_kwargs(cmd)
+                )
+            else:
+                result = subprocess.run(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    timeout=timeout,
+                    **_spawn_kwargs(cmd),
+                )
 
             success = result.returncode == 0
             if success:
@@ -198,7 +936,7 @@ class SSHTransfer:
             else:
                 logger.warning(f"Command failed with exit code {result.returncode}: {command}")
 
-            return success, result.stdout, result.stderr
+            return success, result.stdout or "", result.stderr
 
         except subprocess.TimeoutExpired:
             logger.error(f"Command timeout after {timeout}s: {command}")
@@ -217,29 +955,207 @@ class SSHTransfer:
             if 'SSHPASS' in os.environ:
                 del os.environ['SSHPASS']
 
-    def download_file(self, remote_path: str, local_path: str) -> bool:
+    def execute_script(
+        self, steps: List[Tuple[str, str]], timeout: Optional[int] = None
+    ) -> Tuple[bool, Dict[str, Tuple[int, str]], str]:
+        """Execute several named commands on the remote host in one SSH session.
+
+        The steps are sent as a single shell script on stdin. Each step's
+        combined stdout/stderr is framed by ---STEP:name--- / ---EXIT:code---
+        sentinels, and the script stops at the first failing step.
+
+        Args:
+            steps: List of (name, command) pairs, run in order
+            timeout: Script timeout in seconds (default: uses connection_timeout * 4)
+
+        Returns:
+            Tuple of (success, {name: (exit_code, output)} for each step that ran, stderr)
+        """
+        if timeout is None:
+            timeout = self.connection_timeout * 4
+
+        script_lines = []
+        for name, command in steps:
+            script_lines.append(f"echo '---STEP:{name}---'")
+            script_lines.append(f"( {command} ) 2>&1")
+            script_lines.append('rc=$?; echo "---EXIT:$rc---"; [ "$rc" -eq 0 ] || exit "$rc"')
+        script = "\n".join(script_lines) + "\n"
+
+        try:
+            # Set SSHPASS for password authentication
+            if self.password and not self.key_path:
+                os.environ['SSHPASS'] = self.password
+
+            cmd = self._get_ssh_command_base()
+            cmd.extend([f"{self.user}@{self.host}", "sh -s"])
+
+            result = subprocess.run(
+                cmd, input=script, capture_output=True, text=True, timeout=timeout, **_spawn_kwargs(cmd)
+            )
+
+        except subprocess.TimeoutExpired:
+            logger.error(f"Script timeout after {timeout}s: {[name for name, _ in steps]}")
+            return False, {}, f"Command timeout after {timeout}s"
+
+        except FileNotFoundError as e:
+            logger.error(f"SSH command not found: {e}")
+            return False, {}, "SSH command not found. Please install OpenSSH client."
+
+        except Exception as e:
+            logger.exception(f"Unexpected error executing script: {e}")
+            return False, {}, str(e)
+
+        finally:
+            # Clean up SSHPASS environment variable
+            if 'SSHPASS' in os.environ:
+                del os.environ['SSHPASS']
+
+        results = {}
+        current, output = None, []
+        for line in result.stdout.splitlines():
+            marker = _STEP_MARKER_RE.match(line)
+            if not marker:
+                if current is not None:
+                    output.append(line)
+            elif marker.group(1) == "STEP":
+                current, output = marker.group(2), []
+            elif current is not None:
+                results[current] = (int(marker.group(2)), "\n".join(output))
+                current = None
+
+        success = result.returncode == 0
+        if not success:
+            logger.warning(f"Script failed with exit code {result.returncode}: {list(results)}")
+
+        return success, results, result.stderr
+
+    def _remote_hash(self, remote_path: str) -> Optional[Tuple[str, str]]:
+        """Hash a remote file with the fastest tool available on both ends.
+
+        Returns:
+            Tuple of (tool, hex digest), or None if the file could not be hashed
+        """
+        script = (
+            f"for t in {' '.join(HASH_TOOLS)}; do command -v $t >/dev/null 2>&1 && "
+            f"{{ echo $t; $t {shlex.quote(remote_path)}; exit $?; }}; done; exit 1"
+        )
+        success, stdout, _ = self.execute_command(script)
+        lines = stdout.split("\n") if success else []
+        if len(lines) < 2 or lines[0] not in HASH_TOOLS or not lines[1]:
+            return None
+        return lines[0], lines[1].split()[0].lower()
+
+    @staticmethod
+    def _local_hash(local_path: str, tool: str) -> str:
+        """Hash a local file the same way the remote tool does."""
+        if tool == "b3sum":
+            hasher = blake3.blake3()
+        elif tool == "xxh64sum":
+            hasher = xxhash.xxh64()
+        else:
+            hasher = hashlib.sha256()
+        with open(local_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @classmethod
+    def _cached_local_hash(cls, local_path: str, tool: str) -> str:
+        """Hash a local file like _local_hash, reusing the digest from HASH_CACHE_FILE while it is unchanged."""
+        global _hash_cache
+        st = os.stat(local_path)
+        key = f"{tool}:{os.path.abspath(local_path)}"
+
+        with _hash_cache_lock:
+            if _hash_cache is None:
+                try:
+                    with open(HASH_CACHE_FILE, "r", encoding="utf-8") as f:
+                        _hash_cache = json.load(f)
+                except (OSError, ValueError):
+                    _hash_cache = {}
+            entry = _hash_cache.get(key)
+            if entry and entry[:2] == [st.st_size, st.st_mtime_ns]:
+                return entry[2]
+
+        digest = cls._local_hash(local_path, tool)
+
+        with _hash_cache_lock:
+            _hash_cache[key] = [st.st_size, st.st_mtime_ns, digest]
+            try:
+                os.makedirs(os.path.dirname(HASH_CACHE_FILE), mode=0o700, exist_ok=True)
+                tmp_path = f"{HASH_CACHE_FILE}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(_hash_cache, f)
+                os.replace(tmp_path, HASH_CACHE_FILE)
+            except OSError as e:
+                logger.debug(f"Could not save hash cache: {e}")
+        return digest
+
+    def _contents_match(self, remote_path: str, local_path: str) -> bool:
+        """Check whether local_path and remote_path hold the same contents."""
+        if not os.path.isfile(local_path):
+            return False
+        remote = self._remote_hash(remote_path)
+        if remote is None:
+            return False
+        tool, digest = remote
+        try:
+            return self._cached_local_hash(local_path, tool) == digest
+        except OSError:
+            return False
+
+    def download_file(self, remote_path: str, local_path: str, skip_unchanged: bool = False) -> bool:
         """Download file from remote host with retry logic.
 
         Args:
             remote_path: Path on remote host
             local_path: Local destination path
+            skip_unchanged: Skip the transfer if local_path already matches the remote
+                file's checksum (default: False)
 
         Returns:
             True if successful
         """
+        # Ensure local directory exists
+        try:
+            Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+        except PermissionError:
+            logger.error(f"Permission denied writing to: {local_path}")
+            print(f"✗ Download error: Permission denied: {local_path}")
+            return False
+
+        if skip_unchanged and self._contents_match(remote_path, local_path):
+            logger.info(f"Skipped unchanged file: {remote_path}")
+            print(f"✓ Up to date: {local_path}")
+            return True
+
+        if self.use_paramiko:
+            result = self._sftp_transfer(local_path, remote_path, upload=False)
+            if result is not None:
+                if result:
+                    print(f"✓ Downloaded: {remote_path} → {local_path}")
+                else:
+                    print(f"✗ Download failed: {remote_path}")
+                return result
+
         for attempt in range(self.retry_attempts):
+            # A failed attempt may still have delivered the file; skip the re-transfer if so
+            if attempt > 0 and self._contents_match(remote_path, local_path):
+                logger.info(f"Downloaded (verified by checksum): {remote_path} → {local_path}")
+                print(f"✓ Downloaded: {remote_path} → {local_path}")
+                return True
+
             try:
                 # Set SSHPASS for password authentication
                 if self.password and not self.key_path:
                     os.environ['SSHPASS'] = self.password
-                
-                # Ensure local directory exists
-                Path(local_path).parent.mkdir(parents=True, exist_ok=True)
 
                 cmd = self._get_scp_command_base()
                 cmd.extend([f"{self.user}@{self.host}:{remote_path}", local_path])
 
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.transfer_timeout)
+                result = run_with_grace(
+                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=self.transfer_timeout
+                )
 
                 if result.returncode == 0:
                     logger.info(f"Downloaded: {remote_path} → {local_path}")
@@ -250,19 +1166,25 @@ class SSHTransfer:
                     logger.warning(f"Download failed (attempt {attempt + 1}/{self.retry_attempts}): {error_msg}")
 
                     # Check for specific error conditions
-                    if "No such file or directory" in error_msg:
+                    error = self._match_err(error_msg)
+                    if error == "No such file or directory":
                         logger.error(f"Remote file not found: {remote_path}")
                         print(f"✗ Download failed: Remote file not found: {remote_path}")
                         return False
-                    elif "Permission denied" in error_msg:
+                    elif error == "Permission denied":
                         logger.error(f"Permission denied accessing: {remote_path}")
                         print(f"✗ Download failed: Permission denied: {remote_path}")
                         return False
+                    elif self._classify_stderr(error_msg) == "perm":
+                        logger.error(f"Download failed permanently: {error_msg}")
+                        print(f"✗ Download failed: {error_msg}")
+                        return False
 
                     # Retry for transient errors
                     if attempt < self.retry_attempts - 1:
-                        logger.info(f"Retrying in {self.retry_delay} seconds...")
-                        time.sleep(self.retry_delay)
+                        delay = self._backoff(attempt)
+                        logger.info(f"Retrying in {delay:.1f} seconds...")
+                        time.sleep(delay)
                         continue
 
                     print(f"✗ Download failed: {error_msg}")
@@ -271,8 +1193,9 @@ class SSHTransfer:
             except subprocess.TimeoutExpired:
                 logger.warning(f"Download timeout (attempt {attempt + 1}/{self.retry_attempts})")
                 if attempt < self.retry_attempts - 1:
-                    logger.info(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
+                    delay = self._backoff(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
                     continue
                 print(f"✗ Download timeout after {self.transfer_timeout}s")
                 return False
@@ -299,32 +1222,50 @@ class SSHTransfer:
 
         return False
 
-    def upload_file(self, local_path: str, remote_path: str) -> bool:
+    def upload_file(self, local_path: str, remote_path: str, skip_unchanged: bool = False) -> bool:
         """Upload file to remote host with retry logic.
 
         Args:
             local_path: Local source path
             remote_path: Path on remote host
+            skip_unchanged: Skip the transfer if remote_path already matches the local
+                file's checksum (default: False)
 
         Returns:
             True if successful
         """
+        # Check if local file exists
+        if not Path(local_path).exists():
+            logger.error(f"Local file not found: {local_path}")
+            print(f"✗ Upload failed: Local file not found: {local_path}")
+            return False
+
+        if skip_unchanged and self._contents_match(remote_path, local_path):
+            logger.info(f"Skipped unchanged file: {local_path}")
+            print(f"✓ Up to date: {remote_path}")
+            return True
+
+        if self.use_paramiko:
+            result = self._sftp_transfer(local_path, remote_path, upload=True)
+            if result is not None:
+                if result:
+                    print(f"✓ Uploaded: {local_path} → {remote_path}")
+                else:
+                    print(f"✗ Upload failed: {local_path}")
+                return result
+
         for attempt in range(self.retry_attempts):
             try:
                 # Set SSHPASS for password authentication
                 if self.password and not self.key_path:
                     os.environ['SSHPASS'] = self.password
-                
-                # Check if local file exists
-                if not Path(local_path).exists():
-                    logger.error(f"Local file not found: {local_path}")
-                    print(f"✗ Upload failed: Local file not found: {local_path}")
-                    return False
 
                 cmd = self._get_scp_command_base()
                 cmd.extend([local_path, f"{self.user}@{self.host}:{remote_path}"])
 
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.transfer_timeout)
+                result = run_with_grace(
+                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=self.transfer_timeout
+                )
 
                 if result.returncode == 0:
                     logger.info(f"Uploaded: {local_path} → {remote_path}")
@@ -335,19 +1276,25 @@ class SSHTransfer:
                     logger.warning(f"Upload failed (attempt {attempt + 1}/{self.retry_attempts}): {error_msg}")
 
                     # Check for specific error conditions
-                    if "Permission denied" in error_msg:
+                    error = self._match_err(error_msg)
+                    if error == "Permission denied":
                         logger.error(f"Permission denied writing to: {remote_path}")
                         print(f"✗ Upload failed: Permission denied: {remote_path}")
                         return False
-                    elif "No such file or directory" in error_msg:
+                    elif error == "No such file or directory":
                         logger.error(f"Remote directory not found for: {remote_path}")
                         print(f"✗ Upload failed: Remote directory not found: {remote_path}")
                         return False
+                    elif self._classify_stderr(error_msg) == "perm":
+                        logger.error(f"Upload failed permanently: {error_msg}")
+                        print(f"✗ Upload failed: {error_msg}")
+                        return False
 
                     # Retry for transient errors
                     if attempt < self.retry_attempts - 1:
-                        logger.info(f"Retrying in {self.retry_delay} seconds...")
-                        time.sleep(self.retry_delay)
+                        delay = self._backoff(attempt)
+                        logger.info(f"Retrying in {delay:.1f} seconds...")
+                        time.sleep(delay)
                         continue
 
                     print(f"✗ Upload failed: {error_msg}")
@@ -356,8 +1303,9 @@ class SSHTransfer:
             except subprocess.TimeoutExpired:
                 logger.warning(f"Upload timeout (attempt {attempt + 1}/{self.retry_attempts})")
                 if attempt < self.retry_attempts - 1:
-                    logger.info(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
+                    delay = self._backoff(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
                     continue
                 print(f"✗ Upload timeout after {self.transfer_timeout}s")
                 return False
@@ -389,7 +1337,12 @@ class SSHTransfer:
         return False
 
     def download_directory(
-        self, remote_path: str, local_path: str, exclude_patterns: Optional[List[str]] = None
+        self,
+        remote_path: str,
+        local_path: str,
+        exclude_patterns: Optional[List[str]] = None,
+        lan_mode: bool = False,
+        parallel: int = 1,
     ) -> bool:
         """Download directory from remote host using rsync if available.
 
@@ -397,69 +1350,213 @@ class SSHTransfer:
             remote_path: Path on remote host
             local_path: Local destination path
             exclude_patterns: List of patterns to exclude
+            lan_mode: Use uncompressed whole-file rsync transfers for fast local networks
+            parallel: Number of concurrent rsync processes, capped at RSYNC_MAX_WORKERS (default: 1)
 
         Returns:
             True if successful
         """
         exclude_patterns = exclude_patterns or []
 
-        # Try rsync first (more efficient)
-        if self._has_rsync():
-            return self._rsync_download(remote_path, local_path, exclude_patterns)
+        # Try rsync first (more efficient), then a tar stream, then scp
+        if self._can_rsync():
+            return self._rsync_download(remote_path, local_path, exclude_patterns, lan_mode, parallel)
+        elif self._tar_path:
+            return self._tar_download_dir(remote_path, local_path, exclude_patterns)
         else:
             return self._scp_download_dir(remote_path, local_path)
 
     def _has_rsync(self) -> bool:
         """Check if rsync is available."""
-        try:
-            result = subprocess.run(["which", "rsync"], capture_output=True)
-            return result.returncode == 0
-        except Exception:
-            return False
+        return self.__class__._rsync_path is not None
+
+    @staticmethod
+    def _parse_rsync_probe(success: bool, stdout: str) -> Optional[bool]:
+        """Interpret REMOTE_RSYNC_PROBE output; None if the probe itself failed."""
+        if not success:
+            return None
+        return stdout.strip() != "no"
+
+    def _has_remote_rsync(self) -> bool:
+        """Check if the remote host has rsync, probing it once per instance.
+
+        A failed probe is not cached and counts as available, so the real
+        transfer reports the connection error.
+        """
+        if self._remote_rsync is None:
+            success, stdout, _ = self.execute_command(REMOTE_RSYNC_PROBE)
+            self._remote_rsync = self._parse_rsync_probe(success, stdout)
+            if self._remote_rsync is False:
+                logger.info(f"rsync not installed on {self.host}, using scp")
+        return self._remote_rsync is not False
+
+    def _can_rsync(self) -> bool:
+        """Check if rsync is available on both ends."""
+        return self._has_rsync() and self._has_remote_rsync()
+
+    def _build_rsync_transport(self) -> Tuple[Tuple[str, ...], str]:
+        """Build the rsync launcher and its -e ssh command, once per instance.
+
+        Returns:
+            Tuple of (command prefix ending in "rsync", ssh command string for -e)
+        """
+        prefix = []
+        # Use shlex.quote to properly escape shell arguments
+        ssh_opts = f"ssh -p {shlex.quote(str(self.port))}"
+
+        if self.key_path:
+            ssh_opts += f" -i {shlex.quote(self.key_path)}"
+        elif self.password:
+            # -e flag reads password from SSHPASS env var
+            prefix.extend([self._sshpass_path, "-e"])
+
+        # Reuse the uncompressed master connection; rsync -z already compresses
+        ssh_opts += "".join(
+            f" {shlex.quote(opt)}"
+            for opt in (
+                RSYNC_SSH_OPTIONS + self._get_control_options(self._rsync_control_path)
+                + self._get_transport_options(False)
+            )
+        )
+
+        prefix.append("rsync")
+        return tuple(prefix), ssh_opts
+
+    def _build_rsync_command(
+        self, source: Union[str, List[str]], destination: str, exclude_patterns: List[str], lan_mode: bool = False
+    ) -> List[str]:
+        """Build an rsync command over this connection's SSH transport.
+
+        source may be a list to copy several sources in one rsync run.
+        In lan_mode rsync copies changed files whole, uncompressed and in
+        place instead of compressing a delta into a temporary file.
+
+        Note: For password authentication, caller must set SSHPASS environment
+        variable before running the command and clean it up afterward.
+        """
+        cmd = list(self._rsync_prefix)
+        cmd.extend(RSYNC_LAN_FLAGS if lan_mode else RSYNC_FLAGS)
+        cmd.extend([
+            f"--timeout={RSYNC_IO_TIMEOUT}",
+            "-e",
+            self._rsync_ssh,
+        ])
+        # Overall progress only for a person watching; logs get the summary from --info=stats2
+        if sys.stdout.isatty():
+            cmd.append("--info=progress2")
+
+        # One filter file per pattern list, shared by every rsync run using it
+        if exclude_patterns:
+            cmd.append(f"--filter=merge {_get_filter_file(tuple(exclude_patterns))}")
+
+        cmd.extend([source] if isinstance(source, str) else source)
+        cmd.append(destination)
+        return cmd
+
+    def _stream_command(self, cmd: List[str], timeout: int, echo: bool = True) -> Tuple[int, str]:
+        """Run a command, echoing its output live instead of buffering it.
+
+        stderr is merged into stdout. Only the last OUTPUT_TAIL_LINES lines
+        are kept, so memory stays bounded however much the command prints.
+
+        Args:
+            cmd: Command to run
+            timeout: Seconds before the command is killed
+            echo: Write the output to stdout as it arrives (default: True)
+
+        Returns:
+            Tuple of (returncode, tail of the output)
+
+        Raises:
+            subprocess.TimeoutExpired: If the command was killed after timeout
+        """
+        tail = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        timed_out = threading.Event()
+
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, **_spawn_kwargs(cmd)
+        )
+
+        def kill():
+            timed_out.set()
+            proc.terminate()
+            try:
+                proc.wait(TERMINATE_GRACE)
+            except subprocess.TimeoutExpired:
+                proc.kill()
 
-    def _rsync_download(self, remote_path: str, local_path: str, exclude_patterns: List[str]) -> bool:
-        """Download using rsync with timeout."""
+        timer = threading.Timer(timeout, kill)
+        timer.start()
         try:
-            Path(local_path).mkdir(parents=True, exist_ok=True)
+            for line in proc.stdout:
+                if echo:
+                    sys.stdout.write(line)
+                tail.append(line)
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+            proc.stdout.close()
 
-            # Build rsync command with proper password handling and security
-            cmd = []
-            # Use shlex.quote to properly escape shell arguments
-            ssh_opts = f"ssh -p {shlex.quote(str(self.port))}"
-            
-            if self.key_path:
-                ssh_opts += f" -i {shlex.quote(self.key_path)}"
-            elif self.password:
-                # Use sshpass with environment variable for rsync
-                os.environ['SSHPASS'] = self.password
-                cmd.extend(["sshpass", "-e"])
-            
-            cmd.extend([
-                "rsync",
-                "-avz",
-                "--progress",
-                "-e",
-                ssh_opts,
-            ])
+        output = "".join(tail)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout, output=output)
+        return returncode, output
+
+    def _split_remote_entries(self, remote_path: str, parts: int) -> Optional[List[List[str]]]:
+        """Split the top-level entries of a remote directory into up to parts groups.
+
+        Returns None if the directory cannot be listed, has fewer than two
+        entries, or has an entry name that would need shell quoting.
+        """
+        success, stdout, _ = self.execute_command(f"ls -1A -- {shlex.quote(remote_path)}")
+        entries = stdout.splitlines() if success else []
+        if len(entries) < 2 or not all(_SAFE_ENTRY_RE.fullmatch(entry) for entry in entries):
+            return None
+        parts = min(parts, len(entries), RSYNC_MAX_WORKERS)
+        return [entries[i::parts] for i in range(parts)]
+
+    def _stream_commands(self, cmds: List[List[str]]) -> Tuple[int, str]:
+        """Run commands concurrently via _stream_command, echoing only the first.
+
+        Returns:
+            Result of the first command that failed, else of the last one
+        """
+        if len(cmds) == 1:
+            return self._stream_command(cmds[0], self.transfer_timeout)
 
-            for pattern in exclude_patterns:
-                cmd.extend(["--exclude", pattern])
+        pool = _get_executor()
+        futures = [pool.submit(self._stream_command, cmd, self.transfer_timeout, i == 0) for i, cmd in enumerate(cmds)]
+        results = [future.result() for future in futures]
+        return next((result for result in results if result[0] != 0), results[-1])
 
-            cmd.append(f"{self.user}@{self.host}:{remote_path}/")
-            cmd.append(f"{local_path}/")
+    def _run_rsync(self, cmds: List[List[str]], verb: str, subject: str) -> bool:
+        """Run rsync commands from _build_rsync_command and report the outcome.
 
-            print(f"Downloading {remote_path} with rsync...")
-            logger.info(f"Starting rsync download from {remote_path}")
+        Args:
+            cmds: rsync commands; more than one run concurrently
+            verb: "download" or "upload", used in messages
+            subject: What is being transferred, used in messages
+
+        Returns:
+            True if every command succeeded
+        """
+        try:
+            # Use sshpass with environment variable for rsync
+            if self.password and not self.key_path:
+                os.environ['SSHPASS'] = self.password
+
+            print(f"{verb.capitalize()}ing {subject} with rsync...")
+            logger.info(f"Starting rsync {verb} of {subject} ({len(cmds)} worker(s))")
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.transfer_timeout)
+            returncode, output = self._stream_commands(cmds)
 
-            if result.returncode == 0:
-                logger.info(f"Directory downloaded successfully: {remote_path}")
-                print(f"✓ Directory downloaded: {remote_path}")
+            if returncode == 0:
+                logger.info(f"Directory {verb}ed successfully: {subject}")
+                print(f"✓ Directory {verb}ed: {subject}")
                 return True
             else:
-                logger.error(f"rsync failed: {result.stderr}")
-                print(f"✗ rsync failed: {result.stderr}")
+                logger.error(f"rsync failed with exit code {returncode}: {output}")
+                print(f"✗ rsync failed with exit code {returncode}")
                 return False
 
         except subprocess.TimeoutExpired:
@@ -481,90 +1578,481 @@ class SSHTransfer:
             if 'SSHPASS' in os.environ:
                 del os.environ['SSHPASS']
 
-    def _scp_download_dir(self, remote_path: str, local_path: str) -> bool:
-        """Download directory using SCP."""
-        return self.download_file(remote_path, local_path)
-
-    def upload_directory(self, local_path: str, remote_path: str, exclude_patterns: Optional[List[str]] = None) -> bool:
-        """Upload directory to remote host.
+    def _rsync_download(
+        self,
+        remote_path: str,
+        local_path: str,
+        exclude_patterns: List[str],
+        lan_mode: bool = False,
+        parallel: int = 1,
+    ) -> bool:
+        """Download using rsync with timeout.
 
-        Args:
-            local_path: Local source path
-            remote_path: Path on remote host
+        With parallel > 1 the top-level entries of remote_path are spread
+        over that many concurrent rsync processes, all riding the same
+        ControlMaster connection, which helps trees of many small files.
+        """
+        try:
+            Path(local_path).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Cannot create {local_path}: {e}")
+            print(f"✗ rsync error: {e}")
+            return False
+
+        source = f"{self.user}@{self.host}:{remote_path}"
+        groups = self._split_remote_entries(remote_path, parallel) if parallel > 1 else None
+        if groups:
+            cmds = [
+                self._build_rsync_command(
+                    [f"{source}/{entry}" for entry in group], f"{local_path}/", exclude_patterns, lan_mode
+                )
+                for group in groups
+            ]
+        else:
+            cmds = [self._build_rsync_command(f"{source}/", f"{local_path}/", exclude_patterns, lan_mode)]
+
+        return self._run_rsync(cmds, "download", remote_path)
+
+    def download_paths(
+        self,
+        remote_paths: List[str],
+        local_path: str,
+        exclude_patterns: Optional[List[str]] = None,
+        lan_mode: bool = False,
+    ) -> bool:
+        """Download several remote files or directories into one local directory.
+
+        With rsync all sources are copied by a single rsync run, which builds
+        one file list instead of one per source. Each source lands in
+        local_path under its own name.
+
+        Args:
+            remote_paths: Paths on remote host
+            local_path: Local destination directory
             exclude_patterns: List of patterns to exclude
+            lan_mode: Use uncompressed whole-file rsync transfers for fast local networks
 
         Returns:
-            True if successful
+            True if every path was downloaded
         """
-        exclude_patterns = exclude_patterns or []
+        if not self._can_rsync():
+            return all(
+                self.download_file(path, os.path.join(local_path, os.path.basename(path.rstrip("/"))))
+                for path in remote_paths
+            )
 
-        if self._has_rsync():
-            return self._rsync_upload(local_path, remote_path, exclude_patterns)
-        else:
-            return self.upload_file(local_path, remote_path)
-
-    def _rsync_upload(self, local_path: str, remote_path: str, exclude_patterns: List[str]) -> bool:
-        """Upload using rsync with timeout."""
         try:
-            # Build rsync command with proper password handling and security
-            cmd = []
-            # Use shlex.quote to properly escape shell arguments
-            ssh_opts = f"ssh -p {shlex.quote(str(self.port))}"
-            
-            if self.key_path:
-                ssh_opts += f" -i {shlex.quote(self.key_path)}"
-            elif self.password:
-                # Use sshpass with environment variable for rsync
-                os.environ['SSHPASS'] = self.password
-                cmd.extend(["sshpass", "-e"])
-            
-            cmd.extend([
-                "rsync",
-                "-avz",
-                "--progress",
-                "-e",
-                ssh_opts,
-            ])
+            Path(local_path).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Cannot create {local_path}: {e}")
+            print(f"✗ rsync error: {e}")
+            return False
+
+        sources = [f"{self.user}@{self.host}:{path.rstrip('/')}" for path in remote_paths]
+        cmd = self._build_rsync_command(sources, f"{local_path}/", exclude_patterns or [], lan_mode)
+        return self._run_rsync([cmd], "download", ", ".join(remote_paths))
+
+    def _scp_download_dir(self, remote_path: str, local_path: str) -> bool:
+        """Download directory using SCP."""
+        return self.download_file(remote_path, local_path)
+
+    @staticmethod
+    def _tar_create_args(directory: str, exclude_patterns: List[str]) -> List[str]:
+        """Build a tar command writing directory's contents to stdout.
+
+        rsync-style trailing slashes are dropped from the patterns, since
+        tar's --exclude matches directories by name.
+        """
+        excludes = [f"--exclude={pattern.rstrip('/')}" for pattern in exclude_patterns]
+        return ["tar", "cf", "-", *excludes, "-C", directory, "."]
 
-            for pattern in exclude_patterns:
-                cmd.extend(["--exclude", pattern])
+    def _run_pipeline(self, producer: List[str], consumer: List[str], timeout: int) -> Tuple[int, str]:
+        """Run producer | consumer as two processes joined by a pipe.
 
-            cmd.append(f"{local_path}/")
-            cmd.append(f"{self.user}@{self.host}:{remote_path}/")
+        Args:
+            producer: Command whose stdout feeds the consumer
+            consumer: Command reading the producer's output on stdin
+            timeout: Seconds before both processes are killed
+
+        Returns:
+            Tuple of (returncode, stderr) of the producer if it failed, else of the consumer
+
+        Raises:
+            subprocess.TimeoutExpired: If the pipeline was killed after timeout
+        """
+        with tempfile.TemporaryFile() as producer_err:
+            producer_proc = subprocess.Popen(
+                producer, stdout=subprocess.PIPE, stderr=producer_err, **_spawn_kwargs(producer)
+            )
+            try:
+                consumer_proc = subprocess.Popen(
+                    consumer,
+                    stdin=producer_proc.stdout,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    **_spawn_kwargs(consumer),
+                )
+            except OSError:
+                producer_proc.kill()
+                producer_proc.wait()
+                raise
+            finally:
+                # The consumer holds its own copy; closing ours lets the producer see EPIPE
+                producer_proc.stdout.close()
+
+            deadline = time.monotonic() + timeout
+            try:
+                _, consumer_err = consumer_proc.communicate(timeout=timeout)
+                producer_proc.wait(timeout=max(deadline - time.monotonic(), TERMINATE_GRACE))
+            except subprocess.TimeoutExpired:
+                for proc in (producer_proc, consumer_proc):
+                    proc.kill()
+                    proc.wait()
+                raise
+
+            if producer_proc.returncode != 0:
+                producer_err.seek(0)
+                return producer_proc.returncode, producer_err.read().decode("utf-8", "replace")
+            return consumer_proc.returncode, consumer_err.decode("utf-8", "replace")
+
+    def _tar_transfer(self, producer: List[str], consumer: List[str], verb: str, subject: str) -> bool:
+        """Stream a tar archive between the hosts and report the outcome."""
+        try:
+            if self.password and not self.key_path:
+                os.environ['SSHPASS'] = self.password
 
-            print(f"Uploading to {remote_path} with rsync...")
-            logger.info(f"Starting rsync upload to {remote_path}")
+            print(f"{verb.capitalize()}ing {subject} with tar...")
+            logger.info(f"Starting tar {verb} of {subject}")
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.transfer_timeout)
+            returncode, error = self._run_pipeline(producer, consumer, self.transfer_timeout)
 
-            if result.returncode == 0:
-                logger.info(f"Directory uploaded successfully: {local_path}")
-                print(f"✓ Directory uploaded: {local_path}")
+            if returncode == 0:
+                logger.info(f"Directory {verb}ed successfully: {subject}")
+                print(f"✓ Directory {verb}ed: {subject}")
                 return True
-            else:
-                logger.error(f"rsync failed: {result.stderr}")
-                print(f"✗ rsync failed: {result.stderr}")
-                return False
+            logger.error(f"tar {verb} failed with exit code {returncode}: {error}")
+            print(f"✗ tar {verb} failed: {error.strip() or f'exit code {returncode}'}")
+            return False
 
         except subprocess.TimeoutExpired:
-            logger.error(f"rsync timeout after {self.transfer_timeout}s")
-            print(f"✗ rsync timeout after {self.transfer_timeout}s")
+            logger.error(f"tar {verb} timeout after {self.transfer_timeout}s")
+            print(f"✗ tar {verb} timeout after {self.transfer_timeout}s")
             return False
 
-        except FileNotFoundError as e:
-            logger.error(f"rsync command not found: {e}")
-            print("✗ rsync error: rsync command not found")
+        except OSError as e:
+            logger.error(f"tar {verb} error: {e}")
+            print(f"✗ tar {verb} error: {e}")
             return False
 
-        except Exception as e:
-            logger.exception(f"Unexpected rsync error: {e}")
-            print(f"✗ rsync error: {e}")
-            return False
         finally:
-            # Clean up environment variable
             if 'SSHPASS' in os.environ:
                 del os.environ['SSHPASS']
 
+    def _tar_download_dir(self, remote_path: str, local_path: str, exclude_patterns: List[str]) -> bool:
+        """Download a directory as one tar stream over ssh, without rsync.
+
+        Unlike scp -r there is no per-file round trip. The stream is plain
+        tar; ssh's own compression applies when enabled.
+        """
+        try:
+            Path(local_path).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Cannot create {local_path}: {e}")
+            print(f"✗ tar download error: {e}")
+            return False
+
+        producer = self._get_ssh_command_base()
+        producer.extend([
+            f"{self.user}@{self.host}",
+            shlex.join(self._tar_create_args(remote_path, exclude_patterns)),
+        ])
+        consumer = [self._tar_path, "xf", "-", "-C", local_path]
+        return self._tar_transfer(producer, consumer, "download", remote_path)
+
+    def _tar_upload_dir(self, local_path: str, remote_path: str, exclude_patterns: List[str]) -> bool:
+        """Upload a directory's contents as one tar stream over ssh, without rsync."""
+        if not Path(local_path).is_dir():
+            logger.error(f"Local directory not found: {local_path}")
+            print(f"✗ Upload failed: Local directory not found: {local_path}")
+            return False
+
+        producer = self._tar_create_args(local_path, exclude_patterns)
+        producer[0] = self._tar_path
+        remote = shlex.quote(remote_path)
+        consumer = self._get_ssh_command_base()
+        consumer.extend([f"{self.user}@{self.host}", f"mkdir -p {remote} && tar xf - -C {remote}"])
+        return self._tar_transfer(producer, consumer, "upload", local_path)
+
+    def upload_directory(
+        self,
+        local_path: str,
+        remote_path: str,
+        exclude_patterns: Optional[List[str]] = None,
+        lan_mode: bool = False,
+    ) -> bool:
+        """Upload directory to remote host.
+
+        Args:
+            local_path: Local source path
+            remote_path: Path on remote host
+            exclude_patterns: List of patterns to exclude
+            lan_mode: Use uncompressed whole-file rsync transfers for fast local networks
+
+        Returns:
+            True if successful
+        """
+        exclude_patterns = exclude_patterns or []
+
+        if self._can_rsync():
+            return self._rsync_upload(local_path, remote_path, exclude_patterns, lan_mode)
+        elif self._tar_path:
+            return self._tar_upload_dir(local_path, remote_path, exclude_patterns)
+        elif self.use_paramiko:
+            return self._sftp_upload_dir(local_path, remote_path, exclude_patterns)
+        else:
+            return self.upload_file(local_path, remote_path)
+
+    @staticmethod
+    def _is_excluded(relative_path: str, is_dir: bool, exclude_patterns: List[str]) -> bool:
+        """Match a path against rsync-style exclude patterns.
+
+        Patterns ending in / only match directories; patterns without a /
+        match the last path component, others the whole relative path.
+        """
+        name = os.path.basename(relative_path)
+        for pattern in exclude_patterns:
+            if pattern.endswith("/"):
+                if not is_dir:
+                    continue
+                pattern = pattern.rstrip("/")
+            if fnmatch.fnmatch(relative_path if "/" in pattern else name, pattern.lstrip("/")):
+                return True
+        return False
+
+    def _sftp_upload_dir(self, local_path: str, remote_path: str, exclude_patterns: List[str]) -> bool:
+        """Upload a directory's contents over SFTP on one pooled paramiko connection.
+
+        Remote directories are created first, parents before children. The
+        files are then spread over SFTP_UPLOAD_WORKERS channels on the same
+        transport and written without the per-file stat round trip.
+        """
+        if not Path(local_path).is_dir():
+            logger.error(f"Local directory not found: {local_path}")
+            print(f"✗ Upload failed: Local directory not found: {local_path}")
+            return False
+
+        dirs, files = [""], []
+        for root, dirnames, filenames in os.walk(local_path):
+            relative_root = os.path.relpath(root, local_path)
+            relative_root = "" if relative_root == "." else relative_root
+            dirnames[:] = [
+                d for d in dirnames if not self._is_excluded(os.path.join(relative_root, d), True, exclude_patterns)
+            ]
+            dirs.extend(os.path.join(relative_root, d) for d in dirnames)
+            files.extend(
+                os.path.join(relative_root, f)
+                for f in filenames
+                if not self._is_excluded(os.path.join(relative_root, f), False, exclude_patterns)
+            )
+
+        def remote(relative: str) -> str:
+            return f"{remote_path.rstrip('/')}/{relative.replace(os.sep, '/')}" if relative else remote_path
+
+        def upload_group(client: "paramiko.SSHClient", group: List[str]) -> None:
+            with client.open_sftp() as sftp:
+                sftp.get_channel().settimeout(self.transfer_timeout)
+                for relative in group:
+                    sftp.put(os.path.join(local_path, relative), remote(relative), confirm=False)
+
+        print(f"Uploading {local_path} with SFTP...")
+        try:
+            with self._borrow_client() as client:
+                with client.open_sftp() as sftp:
+                    for relative in sorted(dirs, key=lambda d: d.count(os.sep)):
+                        try:
+                            sftp.stat(remote(relative))
+                        except FileNotFoundError:
+                            sftp.mkdir(remote(relative))
+
+                workers = max(1, min(SFTP_UPLOAD_WORKERS, len(files)))
+                pool = _get_executor()
+                futures = [pool.submit(upload_group, client, files[i::workers]) for i in range(workers)]
+                # Let every worker finish with the client before it goes back to the pool
+                wait(futures)
+                for future in futures:
+                    future.result()
+
+        except (paramiko.SSHException, OSError) as e:
+            logger.error(f"SFTP upload of {local_path} failed: {e}")
+            print(f"✗ SFTP upload failed: {e}")
+            return False
+
+        logger.info(f"Directory uploaded successfully: {local_path} ({len(files)} files)")
+        print(f"✓ Directory uploaded: {local_path}")
+        return True
+
+    def _rsync_upload(
+        self, local_path: str, remote_path: str, exclude_patterns: List[str], lan_mode: bool = False
+    ) -> bool:
+        """Upload using rsync with timeout."""
+        cmd = self._build_rsync_command(
+            f"{local_path}/", f"{self.user}@{self.host}:{remote_path}/", exclude_patterns, lan_mode
+        )
+        return self._run_rsync([cmd], "upload", local_path)
+
+    def upload_paths(
+        self,
+        local_paths: List[str],
+        remote_path: str,
+        exclude_patterns: Optional[List[str]] = None,
+        lan_mode: bool = False,
+    ) -> bool:
+        """Upload several local files or directories into one remote directory.
+
+        With rsync all sources are copied by a single rsync run, which builds
+        one file list instead of one per source. Each source lands in
+        remote_path under its own name.
+
+        Args:
+            local_paths: Local source paths
+            remote_path: Destination directory on remote host
+            exclude_patterns: List of patterns to exclude
+            lan_mode: Use uncompressed whole-file rsync transfers for fast local networks
+
+        Returns:
+            True if every path was uploaded
+        """
+        if not self._can_rsync():
+            return all(
+                self.upload_file(path, f"{remote_path.rstrip('/')}/{os.path.basename(path.rstrip('/'))}")
+                for path in local_paths
+            )
+
+        sources = [path.rstrip("/") for path in local_paths]
+        cmd = self._build_rsync_command(
+            sources, f"{self.user}@{self.host}:{remote_path}/", exclude_patterns or [], lan_mode
+        )
+        return self._run_rsync([cmd], "upload", ", ".join(local_paths))
+
+    @staticmethod
+    def _background_command(command: str, log_path: str = "/dev/null") -> str:
+        """Wrap a shell command so it keeps running after the SSH session ends and prints its PID."""
+        return f"nohup sh -c {shlex.quote(command)} >{shlex.quote(log_path)} 2>&1 </dev/null & echo $!"
+
+    def execute_background(self, command: str, log_path: str = "/dev/null") -> Optional[str]:
+        """Start a command on the remote host without waiting for it to finish.
+
+        Args:
+            command: Command to execute
+            log_path: Remote file receiving the command's output
+
+        Returns:
+            PID of the remote process, or None if it could not be started
+        """
+        success, stdout, stderr = self.execute_command(self._background_command(command, log_path))
+        pid = stdout.strip()
+        if not success or not pid.isdigit():
+            logger.warning(f"Could not start background command: {stderr.strip() or command}")
+            return None
+        return pid
+
+    def wait_background(self, pid: str, check: Optional[str] = None, timeout: Optional[int] = None) -> bool:
+        """Wait for a process started by execute_background() to exit.
+
+        The exit status of a detached process cannot be collected from a new
+        SSH session, so pass a check command to verify its result.
+
+        Args:
+            pid: Remote PID returned by execute_background()
+            check: Optional command whose exit status decides success
+            timeout: Wait timeout in seconds (default: uses transfer_timeout)
+
+        Returns:
+            True if the process exited (and the check passed)
+        """
+        command = f"while kill -0 {int(pid)} 2>/dev/null; do sleep 1; done"
+        if check:
+            command += f"; {check}"
+        success, _, _ = self.execute_command(command, timeout=timeout or self.transfer_timeout, capture=False)
+        return success
+
+    def _get_remote_compressor(self) -> str:
+        """Get the best backup compressor on the remote host, probing it once."""
+        if self._remote_compressor is None:
+            success, stdout, _ = self.execute_command(_COMPRESSOR_PROBE)
+            compressor = stdout.strip() if success else ""
+            self._remote_compressor = compressor if compressor in BACKUP_COMPRESSORS else "gzip"
+            logger.debug(f"Remote backup compressor: {self._remote_compressor}")
+        return self._remote_compressor
+
+    def _backup_path(self, backup_name: str) -> str:
+        """Get the remote archive path for a backup name."""
+        _, suffix = BACKUP_COMPRESSORS[self._get_remote_compressor()]
+        return f"/root/{backup_name}{suffix}"
+
+    def _backup_command(self, source_dir: str, backup_path: str) -> str:
+        """Get the shell command archiving source_dir to backup_path."""
+        program, _ = BACKUP_COMPRESSORS[self._get_remote_compressor()]
+        if program:
+            return (
+                f"tar --use-compress-program={shlex.quote(program)} "
+                f"-cf {shlex.quote(backup_path)} -C {shlex.quote(source_dir)} ."
+            )
+        return f"tar -czf {shlex.quote(backup_path)} -C {shlex.quote(source_dir)} ."
+
+    def start_backup(
+        self, remote_path: str, backup_name: Optional[str] = None, background: bool = True
+    ) -> Tuple[bool, str, Optional[str]]:
+        """Start a remote backup that keeps compressing while new files are uploaded.
+
+        The directory is first snapshotted with hard links (metadata only, so
+        quick) and the snapshot is archived in the background. rsync replaces
+        changed files instead of rewriting them, so the snapshot keeps the old
+        contents during an upload. Without rsync, when the snapshot cannot be
+        made (e.g. the parent is another filesystem), or when background is
+        False, the backup runs synchronously like backup_remote().
+
+        Args:
+            remote_path: Path to backup
+            backup_name: Optional backup name
+            background: Allow archiving in the background; pass False when the
+                upload will rewrite files in place (rsync --inplace)
+
+        Returns:
+            Tuple of (success, backup_path, PID of the background archiver or
+            None when the backup already finished)
+        """
+        if not background or not self._can_rsync():
+            success, backup_path = self.backup_remote(remote_path, backup_name)
+            return success, backup_path, None
+
+        if not backup_name:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_name = f"config_backup_{timestamp}"
+
+        backup_path = self._backup_path(backup_name)
+        snapshot = f"{remote_path.rstrip('/')}.{backup_name}.snapshot"
+        archive = f"{self._backup_command(snapshot, backup_path)}; rc=$?; rm -rf {shlex.quote(snapshot)}; exit $rc"
+
+        script = (
+            f"if cp -al {shlex.quote(remote_path)} {shlex.quote(snapshot)} 2>/dev/null; then "
+            f"echo PID:$({self._background_command(archive)}); "
+            f"else rm -rf {shlex.quote(snapshot)}; {self._backup_command(remote_path, backup_path)} && echo PID:; fi"
+        )
+        success, stdout, stderr = self.execute_command(script)
+        lines = stdout.strip().splitlines()
+
+        if not success or not lines or not lines[-1].startswith("PID:"):
+            print(f"✗ Backup failed: {stderr}")
+            return False, "", None
+
+        pid = lines[-1][len("PID:"):] or None
+        if pid:
+            print(f"Creating remote backup in background: {backup_path}")
+        else:
+            print(f"✓ Remote backup created: {backup_path}")
+        return True, backup_path, pid
+
     def backup_remote(self, remote_path: str, backup_name: Optional[str] = None) -> Tuple[bool, str]:
         """Create backup on remote host.
 
@@ -579,10 +2067,10 @@ class SSHTransfer:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_name = f"config_backup_{timestamp}"
 
-        backup_path = f"/root/{backup_name}.tar.gz"
+        backup_path = self._backup_path(backup_name)
 
-        cmd = f"tar -czf {backup_path} -C {remote_path} ."
-        success, stdout, stderr = self.execute_command(cmd)
+        cmd = self._backup_command(remote_path, backup_path)
+        success, _, stderr = self.execute_command(cmd, capture=False)
 
         if success:
             print(f"✓ Remote backup created: {backup_path}")
@@ -597,19 +2085,12 @@ class SSHTransfer:
         Returns:
             True if successful
         """
-        # Try different restart methods
-        restart_commands = [
-            "ha core restart",  # Home Assistant OS
-            "docker restart homeassistant",  # Docker
-            "systemctl restart home-assistant@homeassistant",  # systemd
-            "supervisorctl restart homeassistant",  # Supervisor
-        ]
-
-        for cmd in restart_commands:
-            success, stdout, stderr = self.execute_command(cmd)
-            if success:
-                print(f"✓ Home Assistant restart initiated: {cmd}")
-                return True
+        # Detect the installation type and restart it in a single SSH session
+        success, stdout, stderr = self.execute_command(RESTART_SCRIPT)
+        if success:
+            tried = [line[len("TRIED:"):] for line in stdout.splitlines() if line.startswith("TRIED:")]
+            print(f"✓ Home Assistant restart initiated: {tried[-1] if tried else RESTART_COMMANDS[0]}")
+            return True
 
         print("⚠ Could not restart Home Assistant automatically")
         return False
@@ -623,19 +2104,231 @@ class SSHTransfer:
         Returns:
             Tuple of (valid, message)
         """
-        # Try Home Assistant config check
-        success, stdout, stderr = self.execute_command("ha core check")
+        # One SSH call; the remote shell picks the check available on the host
+        success, stdout, stderr = self.execute_command(
+            CONFIG_CHECK_SCRIPT.format(config_path=shlex.quote(config_path))
+        )
 
         if success:
-            return True, "Configuration check passed"
+            return True, stdout or "Configuration check passed"
+        else:
+            return False, stderr or stdout
+
+
+@functools.lru_cache(maxsize=32)
+def get_ssh(
+    host: str,
+    user: str = "root",
+    port: int = 22,
+    key_path: Optional[str] = None,
+    password: Optional[str] = None,
+    connection_timeout: int = 30,
+    transfer_timeout: int = 600,
+    retry_attempts: int = 3,
+    retry_delay: int = 2,
+    use_paramiko: bool = False,
+) -> SSHTransfer:
+    """Get a shared SSHTransfer for the given connection settings.
+
+    Callers asking for the same endpoint and settings get the same instance,
+    and with it the same ControlMaster connection. Arguments are as for
+    SSHTransfer.
+    """
+    return SSHTransfer(
+        host=host,
+        user=user,
+        port=port,
+        key_path=key_path,
+        password=password,
+        connection_timeout=connection_timeout,
+        transfer_timeout=transfer_timeout,
+        retry_attempts=retry_attempts,
+        retry_delay=retry_delay,
+        use_paramiko=use_paramiko,
+    )
+
+
+class SSHTransferAsync:
+    """asyncio counterpart of SSHTransfer for running many transfers concurrently.
+
+    Commands are built by the wrapped SSHTransfer (and so share its
+    ControlMaster socket) but run through asyncio.create_subprocess_exec, so
+    one event loop can await many ssh/scp/rsync children at once. The password
+    reaches sshpass through the child's environment rather than os.environ,
+    which concurrent tasks would otherwise race on.
+    """
+
+    def __init__(self, ssh: SSHTransfer):
+        """Initialize async SSH transfer.
+
+        Args:
+            ssh: Configured SSHTransfer used to build commands
+        """
+        self.ssh = ssh
+
+    @property
+    def host(self) -> str:
+        return self.ssh.host
+
+    async def _run(self, cmd: List[str], timeout: int) -> Tuple[int, str, str]:
+        """Run a command, killing it if it exceeds the timeout.
+
+        Returns:
+            Tuple of (returncode, stdout, stderr)
+
+        Raises:
+            asyncio.TimeoutError: If the command did not finish in time
+        """
+        env = None
+        if self.ssh.password and not self.ssh.key_path:
+            env = {**os.environ, "SSHPASS": self.ssh.password}
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, env=env, **_spawn_kwargs(cmd)
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+
+        return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+    async def _run_with_retries(self, cmd: List[str], timeout: int) -> Tuple[bool, str]:
+        """Run a command, retrying transient failures with backoff.
+
+        Returns:
+            Tuple of (success, error message)
+        """
+        error_msg = ""
+        for attempt in range(self.ssh.retry_attempts):
+            try:
+                returncode, _, stderr = await self._run(cmd, timeout)
+                if returncode == 0:
+                    return True, ""
+                error_msg = stderr.strip()
+                if self.ssh._classify_stderr(error_msg) == "perm":
+                    return False, error_msg
+            except asyncio.TimeoutError:
+                error_msg = f"timeout after {timeout}s"
+            except FileNotFoundError as e:
+                return False, f"command not found: {e}"
+
+            logger.warning(
+                f"{cmd[0]} failed on {self.host} (attempt {attempt + 1}/{self.ssh.retry_attempts}): {error_msg}"
+            )
+            if attempt < self.ssh.retry_attempts - 1:
+                await asyncio.sleep(self.ssh._backoff(attempt))
 
-        # Try hass --script check_config
-        success, stdout, stderr = self.execute_command(f"hass --script check_config -c {config_path}")
+        return False, error_msg
 
+    async def test_connection(self) -> Tuple[bool, str]:
+        """Test SSH connection with retry logic.
+
+        Returns:
+            Tuple of (success, message)
+        """
+        cmd = self.ssh._get_ssh_command_base()
+        cmd.extend([f"{self.ssh.user}@{self.host}", "true"])
+
+        success, error_msg = await self._run_with_retries(cmd, self.ssh.connection_timeout)
         if success:
-            return True, stdout
+            return True, "Connection successful"
+        return False, f"Connection failed: {error_msg}"
+
+    async def ensure_connected(self) -> Tuple[bool, str]:
+        """Make sure the host is reachable, probing only when no master is up.
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if await self._has_control_master():
+            return True, "Connection active"
+        return await self.test_connection()
+
+    async def _has_control_master(self) -> bool:
+        """Check whether the wrapped SSHTransfer's master connection is alive."""
+        if not self.ssh._control_path or not os.path.exists(self.ssh._control_path):
+            return False
+        try:
+            returncode, _, _ = await self._run(self.ssh._control_check_command(), 5)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.debug(f"Could not check SSH master connection: {e}")
+            return False
+        return returncode == 0
+
+    async def execute_command(self, command: str, timeout: Optional[int] = None) -> Tuple[bool, str, str]:
+        """Execute command on remote host with timeout.
+
+        Args:
+            command: Command to execute
+            timeout: Command timeout in seconds (default: uses connection_timeout * 4)
+
+        Returns:
+            Tuple of (success, stdout, stderr)
+        """
+        if timeout is None:
+            timeout = self.ssh.connection_timeout * 4
+
+        cmd = self.ssh._get_ssh_command_base()
+        cmd.extend([f"{self.ssh.user}@{self.host}", command])
+
+        try:
+            returncode, stdout, stderr = await self._run(cmd, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Command timeout after {timeout}s: {command}")
+            return False, "", f"Command timeout after {timeout}s"
+        except FileNotFoundError as e:
+            logger.error(f"SSH command not found: {e}")
+            return False, "", "SSH command not found. Please install OpenSSH client."
+
+        return returncode == 0, stdout, stderr
+
+    async def _can_rsync(self) -> bool:
+        """Check if rsync is available on both ends; see SSHTransfer._can_rsync."""
+        if not self.ssh._has_rsync():
+            return False
+        if self.ssh._remote_rsync is None:
+            success, stdout, _ = await self.execute_command(REMOTE_RSYNC_PROBE)
+            self.ssh._remote_rsync = SSHTransfer._parse_rsync_probe(success, stdout)
+        return self.ssh._remote_rsync is not False
+
+    async def download_directory(
+        self,
+        remote_path: str,
+        local_path: str,
+        exclude_patterns: Optional[List[str]] = None,
+        lan_mode: bool = False,
+    ) -> bool:
+        """Download directory from remote host using rsync if available.
+
+        Args:
+            remote_path: Path on remote host
+            local_path: Local destination path
+            exclude_patterns: List of patterns to exclude
+            lan_mode: Use uncompressed whole-file rsync transfers for fast local networks
+
+        Returns:
+            True if successful
+        """
+        source = f"{self.ssh.user}@{self.host}:{remote_path}"
+        if await self._can_rsync():
+            Path(local_path).mkdir(parents=True, exist_ok=True)
+            cmd = self.ssh._build_rsync_command(f"{source}/", f"{local_path}/", exclude_patterns or [], lan_mode)
         else:
-            return False, stderr or stdout
+            Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+            cmd = self.ssh._get_scp_command_base()
+            cmd.extend([source, local_path])
+
+        success, error_msg = await self._run_with_retries(cmd, self.ssh.transfer_timeout)
+        if success:
+            logger.info(f"Directory downloaded successfully: {remote_path} from {self.host}")
+            print(f"✓ Directory downloaded: {self.host}:{remote_path}")
+        else:
+            logger.error(f"Download from {self.host} failed: {error_msg}")
+            print(f"✗ Download from {self.host} failed: {error_msg}")
+        return success
 
 
 class HARemoteManager:
@@ -654,7 +2347,7 @@ class HARemoteManager:
         if not password:
             password = os.environ.get("SSH_PASSWORD")
         
-        self.ssh = SSHTransfer(
+        self.ssh = get_ssh(
             host=config.get("host", ""),
             user=config.get("user", "root"),
             port=config.get("port", 22),
@@ -664,8 +2357,27 @@ class HARemoteManager:
             transfer_timeout=config.get("transfer_timeout", 600),
             retry_attempts=config.get("retry_attempts", 3),
             retry_delay=config.get("retry_delay", 2),
+            use_paramiko=config.get("use_paramiko", False),
         )
         self.remote_config_path = config.get("remote_config_path", "/config")
+        self.lan_mode = config.get("lan_mode", False)
+        self.parallel_transfers = config.get("parallel_transfers", 1)
+
+    def __enter__(self) -> "HARemoteManager":
+        """Open the SSH master connection for the lifetime of the with block."""
+        self.ssh.start_master()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the SSH master connection.
+
+        Managers sharing the connection through get_ssh are unaffected
+        beyond paying one new handshake on their next command.
+        """
+        self.ssh.close()
 
     def export_config(self, local_export_dir: str, exclude_patterns: Optional[List[str]] = None) -> bool:
         """Export configuration from remote HA to local directory.
@@ -677,25 +2389,89 @@ class HARemoteManager:
         Returns:
             True if successful
         """
-        default_excludes = ["*.log", "*.db", "*.db-*", "deps/", "__pycache__/", "tts/", ".cloud/", "backups/"]
-        exclude_patterns = (exclude_patterns or []) + default_excludes
+        exclude_patterns = (exclude_patterns or []) + DEFAULT_EXPORT_EXCLUDES
 
         print(f"\n📤 Exporting configuration from {self.ssh.host}...")
 
         # Test connection first
-        success, msg = self.ssh.test_connection()
+        success, msg = self.ssh.ensure_connected()
         if not success:
             print(f"✗ {msg}")
             return False
 
         # Download configuration
-        success = self.ssh.download_directory(self.remote_config_path, local_export_dir, exclude_patterns)
+        success = self.ssh.download_directory(
+            self.remote_config_path,
+            local_export_dir,
+            exclude_patterns,
+            lan_mode=self.lan_mode,
+            parallel=self.parallel_transfers,
+        )
 
         if success:
             print(f"✓ Configuration exported to: {local_export_dir}")
 
         return success
 
+    async def export_config_async(self, local_export_dir: str, exclude_patterns: Optional[List[str]] = None) -> bool:
+        """Export configuration like export_config(), without blocking the event loop.
+
+        Args:
+            local_export_dir: Local directory to export to
+            exclude_patterns: Patterns to exclude
+
+        Returns:
+            True if successful
+        """
+        exclude_patterns = (exclude_patterns or []) + DEFAULT_EXPORT_EXCLUDES
+        ssh = SSHTransferAsync(self.ssh)
+
+        print(f"\n📤 Exporting configuration from {ssh.host}...")
+
+        success, msg = await ssh.ensure_connected()
+        if not success:
+            print(f"✗ {msg}")
+            return False
+
+        success = await ssh.download_directory(
+            self.remote_config_path, local_export_dir, exclude_patterns, lan_mode=self.lan_mode
+        )
+
+        if success:
+            print(f"✓ Configuration exported to: {local_export_dir}")
+
+        return success
+
+    @classmethod
+    async def export_configs_async(
+        cls, configs: List[dict], local_export_root: str, exclude_patterns: Optional[List[str]] = None
+    ) -> Dict[str, bool]:
+        """Export configuration from several Home Assistant hosts concurrently.
+
+        Args:
+            configs: SSH configuration dictionaries, one per host
+            local_export_root: Each host is exported to <local_export_root>/<host>
+            exclude_patterns: Patterns to exclude
+
+        Returns:
+            Dictionary mapping host to export success
+        """
+        managers = [cls(config) for config in configs]
+        results = await asyncio.gather(
+            *[
+                manager.export_config_async(os.path.join(local_export_root, manager.ssh.host), exclude_patterns)
+                for manager in managers
+            ]
+        )
+        return {manager.ssh.host: success for manager, success in zip(managers, results)}
+
+    @classmethod
+    def export_configs(
+        cls, configs: List[dict], local_export_root: str, exclude_patterns: Optional[List[str]] = None
+    ) -> Dict[str, bool]:
+        """Synchronous wrapper around export_configs_async()."""
+        return asyncio.run(cls.export_configs_async(configs, local_export_root, exclude_patterns))
+
     def import_config(self, local_import_dir: str, create_backup: bool = True, restart: bool = False) -> bool:
         """Import configuration from local to remote HA.
 
@@ -710,40 +2486,61 @@ class HARemoteManager:
         print(f"\n📥 Importing configuration to {self.ssh.host}...")
 
         # Test connection
-        success, msg = self.ssh.test_connection()
+        success, msg = self.ssh.ensure_connected()
         if not success:
             print(f"✗ {msg}")
             return False
 
-        # Create backup if requested
+        # Create backup if requested; it may finish in the background during the upload
+        backup_pid = None
         if create_backup:
-            success, backup_path = self.ssh.backup_remote(self.remote_config_path)
+            # An in-place (LAN mode) upload would rewrite the snapshot's hard-linked files
+            success, backup_path, backup_pid = self.ssh.start_backup(
+                self.remote_config_path, background=not self.lan_mode
+            )
             if not success:
                 print("⚠ Backup failed, continuing anyway...")
 
         # Upload configuration
         success = self.ssh.upload_directory(
-            local_import_dir, self.remote_config_path, exclude_patterns=[".git/", "__pycache__/", "*.pyc"]
+            local_import_dir,
+            self.remote_config_path,
+            exclude_patterns=[".git/", "__pycache__/", "*.pyc"],
+            lan_mode=self.lan_mode,
         )
 
+        if backup_pid:
+            if self.ssh.wait_background(backup_pid, check=f"test -s {shlex.quote(backup_path)}"):
+                print(f"✓ Remote backup created: {backup_path}")
+            else:
+                print(f"⚠ Backup did not complete: {backup_path}")
+
         if not success:
             print("✗ Import failed")
             return False
 
-        # Check configuration
+        # Check configuration and restart in a single SSH session
         print("🔍 Checking configuration...")
-        valid, msg = self.ssh.check_config(self.remote_config_path)
-        if not valid:
+        steps = [("check", CONFIG_CHECK_SCRIPT.format(config_path=shlex.quote(self.remote_config_path)))]
+        if restart:
+            steps.append(("restart", RESTART_SCRIPT))
+
+        success, results, stderr = self.ssh.execute_script(steps)
+
+        exit_code, msg = results.get("check", (None, stderr))
+        if exit_code != 0:
             print(f"⚠ Configuration check failed: {msg}")
             print("Consider restoring from backup")
             return False
 
         print("✓ Configuration check passed")
 
-        # Restart if requested
         if restart:
             print("🔄 Restarting Home Assistant...")
-            self.ssh.restart_home_assistant()
+            if results.get("restart", (None, ""))[0] == 0:
+                print("✓ Home Assistant restart initiated")
+            else:
+                print("⚠ Could not restart Home Assistant automatically")
 
         print("✓ Import complete")
         return True
@@ -64,6 +64,28 @@ class TestCreateExportStructure:
         assert (export_path / 'secrets').exists()
 
 
+class TestRunCommand:
+    """Test command execution"""
+    
+    def test_run_command_argv(self, temp_dir):
+        """Test running an argv list without a shell"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        stdout, stderr, code = exporter.run_command([sys.executable, '-c', 'print("ok")'])
+        
+        assert code == 0
+        assert stdout.strip() == 'ok'
+    
+    def test_run_command_missing_binary(self, temp_dir):
+        """Test that a missing executable returns a non-zero code"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        stdout, stderr, code = exporter.run_command(['nonexistent-ha-binary', 'info'])
+        
+        assert code == 1
+        assert stdout == ''
+
+
 class TestGenerateSecretPlaceholder:
     """Test secret placeholder generation"""
     
@@ -150,6 +172,24 @@ class TestSanitizeText:
         # example values should be preserved
         assert 'example' in result.lower()
     
+    def test_sanitize_skips_text_without_anchors(self, temp_dir, mocker):
+        """Test that text without any anchor keyword never reaches the regex engine"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        finditer = mocker.patch('ha_diagnostic_export.re.finditer')
+        
+        result = exporter.sanitize_text('name Living Room')
+        
+        assert result == 'name Living Room'
+        finditer.assert_not_called()
+    
+    def test_sanitize_anchor_case_insensitive(self, temp_dir):
+        """Test that the prefilter does not skip upper-case keys"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        result = exporter.sanitize_text('API_KEY: abcdef123')
+        
+        assert 'abcdef123' not in result
+    
     def test_sanitize_non_string(self, temp_dir):
         """Test sanitization of non-string input"""
         exporter = HAConfigExporter(output_dir=temp_dir)
@@ -161,6 +201,116 @@ class TestSanitizeText:
         assert result is None
 
 
+class TestIsExcluded:
+    """Test config export exclude matching"""
+    
+    def test_is_excluded_suffix_and_names(self, temp_dir):
+        """Test suffix and exact-name exclusions"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        assert exporter.is_excluded('home-assistant_v2.db')
+        assert exporter.is_excluded('zigbee.db-wal')
+        assert exporter.is_excluded('__pycache__')
+        assert exporter.is_excluded('sub/.DS_Store')
+        assert not exporter.is_excluded('automations.yaml')
+    
+    def test_is_excluded_globs(self, temp_dir):
+        """Test glob exclusions against config-relative paths"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        assert exporter.is_excluded('home-assistant.log.1')
+        assert exporter.is_excluded('.storage/lovelace_dashboards')
+        assert not exporter.is_excluded('.storage/core.entity_registry')
+    
+    def test_packages_walk_passes_config_relative_paths(self, temp_dir, mocker):
+        """Test that the packages walk checks paths relative to the config directory"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        mocker.patch('ha_diagnostic_export.os.path.exists', side_effect=lambda path: path == '/config/packages')
+        mocker.patch('ha_diagnostic_export.os.walk', return_value=[
+            ('/config/packages', ['__pycache__', 'lights'], ['lights.yaml']),
+        ])
+        is_excluded = mocker.spy(exporter, 'is_excluded')
+        
+        exporter.export_config_directory()
+        
+        assert [c.args[0] for c in is_excluded.call_args_list] == [
+            'packages/__pycache__', 'packages/lights', 'packages/lights.yaml'
+        ]
+
+
+class TestSanitizeMany:
+    """Test batched sanitization of short strings"""
+    
+    def test_sanitize_many_matches_individual(self, temp_dir):
+        """Test that batched results line up with the inputs"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        names = ['Living Room', 'token: abcdef123', None, 'Kitchen']
+        result = exporter.sanitize_many(names)
+        
+        assert len(result) == 4
+        assert result[0] == 'Living Room'
+        assert 'abcdef123' not in result[1]
+        assert '<<TOKEN_' in result[1]
+        assert result[2] is None
+        assert result[3] == 'Kitchen'
+    
+    def test_sanitize_many_replaces_only_matched_value(self, temp_dir):
+        """Test that a secret found in one value does not rewrite other values"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        result = exporter.sanitize_many(['token: Kitchen', 'Kitchen Light'])
+        
+        assert result == [exporter.sanitize_text('token: Kitchen'), 'Kitchen Light']
+    
+    def test_sanitize_many_match_spanning_values(self, temp_dir):
+        """Test that patterns never match across two values"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        assert exporter.sanitize_many(['Garage password:', 'Opener']) == ['Garage password:', 'Opener']
+    
+    def test_sanitize_many_separator_in_value(self, temp_dir):
+        """Test fallback when a value contains the separator"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        result = exporter.sanitize_many(['a\x1fb', 'password: hunter22'])
+        
+        assert result[0] == 'a\x1fb'
+        assert 'hunter22' not in result[1]
+    
+    def test_sanitize_many_empty(self, temp_dir):
+        """Test sanitizing an empty list"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        assert exporter.sanitize_many([]) == []
+
+
+class TestSanitizeObj:
+    """Test field-level sanitization of parsed JSON data"""
+    
+    def test_sanitize_obj_sensitive_keys(self, temp_dir):
+        """Test that values under sensitive keys are replaced"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        data = {'latitude': 52.52, 'access_token': 'abcdef123', 'friendly_name': 'Phone'}
+        result = exporter.sanitize_obj(data)
+        
+        assert result['latitude'].startswith('<<LATITUDE_')
+        assert result['access_token'].startswith('<<TOKEN_')
+        assert result['friendly_name'] == 'Phone'
+    
+    def test_sanitize_obj_nested_strings(self, temp_dir):
+        """Test that nested string leaves are sanitized"""
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        
+        data = {'entries': [{'url': 'https://host/api?token=abcdef123'}], 'count': 3, 'on': True}
+        result = exporter.sanitize_obj(data)
+        
+        assert 'abcdef123' not in result['entries'][0]['url']
+        assert result['count'] == 3
+        assert result['on'] is True
+
+
 class TestExportYamlFile:
     """Test YAML file export functionality"""
     
@@ -216,6 +366,65 @@ class TestExportJsonFile:
         assert '"name": "test"' in content
 
 
+class TestCreateTarball:
+    """Test export archive creation"""
+    
+    def test_create_tarball_members(self, temp_dir):
+        """Test that ai_upload goes to both archives and secrets only to the full one"""
+        import tarfile
+        
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        exporter.create_export_structure()
+        Path(exporter.ai_upload_path, 'ha_context.md').write_text('# context')
+        Path(exporter.secrets_path, 'secrets_map.json').write_text('{}')
+        
+        full_tarball, ai_tarball = exporter.create_tarball()
+        
+        with tarfile.open(ai_tarball) as tar:
+            ai_names = tar.getnames()
+            assert tar.extractfile('ai_upload/ha_context.md').read() == b'# context'
+        with tarfile.open(full_tarball) as tar:
+            full_names = tar.getnames()
+        
+        assert 'ai_upload' in ai_names
+        assert not any('secrets' in name for name in ai_names)
+        assert f'{exporter.export_name}/ai_upload/ha_context.md' in full_names
+        assert f'{exporter.export_name}/secrets/secrets_map.json' in full_names
+    
+    def test_create_tarball_keeps_directory_symlinks(self, temp_dir):
+        """Test that symlinked directories are archived as links in both tarballs"""
+        import tarfile
+        
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        exporter.create_export_structure()
+        target = Path(temp_dir, 'target')
+        target.mkdir()
+        os.symlink(target, Path(exporter.ai_upload_path, 'linkdir'))
+        
+        full_tarball, ai_tarball = exporter.create_tarball()
+        
+        with tarfile.open(ai_tarball) as tar:
+            assert tar.getmember('ai_upload/linkdir').issym()
+        with tarfile.open(full_tarball) as tar:
+            assert tar.getmember(f'{exporter.export_name}/ai_upload/linkdir').issym()
+    
+    def test_create_tarball_hardlinks_extract(self, temp_dir):
+        """Test that hardlinked files in ai_upload extract from the AI tarball"""
+        import tarfile
+        
+        exporter = HAConfigExporter(output_dir=temp_dir)
+        exporter.create_export_structure()
+        Path(exporter.ai_upload_path, 'a.txt').write_text('shared')
+        os.link(Path(exporter.ai_upload_path, 'a.txt'), Path(exporter.ai_upload_path, 'b.txt'))
+        
+        _, ai_tarball = exporter.create_tarball()
+        
+        extract_dir = Path(temp_dir, 'extracted')
+        with tarfile.open(ai_tarball) as tar:
+            tar.extractall(extract_dir)
+        assert (extract_dir / 'ai_upload' / 'b.txt').read_text() == 'shared'
+
+
 class TestDataValidation:
     """Test data validation"""
     
@@ -32,6 +32,127 @@ class TestExportVerifier:
         assert verifier.export_path == export_path
 
 
+class TestLoadJson:
+    """Test _load_json helper"""
+    
+    @pytest.mark.parametrize('use_orjson', [True, False])
+    def test_load_json(self, temp_dir, monkeypatch, use_orjson):
+        """Test loading JSON with and without orjson"""
+        import ha_export_verifier
+        
+        if use_orjson and not ha_export_verifier.ORJSON_AVAILABLE:
+            pytest.skip('orjson not installed')
+        monkeypatch.setattr(ha_export_verifier, 'ORJSON_AVAILABLE', use_orjson)
+        
+        json_file = Path(temp_dir) / 'data.json'
+        json_file.write_text(json.dumps({'total': 3, 'items': ['a', 'b']}))
+        
+        verifier = ExportVerifier(temp_dir)
+        assert verifier._load_json(str(json_file)) == {'total': 3, 'items': ['a', 'b']}
+    
+    def test_load_json_shares_parse(self, temp_dir):
+        """Test that repeated loads of an unchanged file reuse one parse"""
+        json_file = Path(temp_dir) / 'data.json'
+        json_file.write_text(json.dumps({'total': 3}))
+        
+        first = ExportVerifier(temp_dir)._load_json('data.json')
+        second = ExportVerifier(temp_dir)._load_json('data.json')
+        
+        assert first is second
+    
+    def test_load_json_reparses_changed_file(self, temp_dir):
+        """Test that a modified file is parsed again"""
+        json_file = Path(temp_dir) / 'data.json'
+        json_file.write_text(json.dumps({'total': 3}))
+        verifier = ExportVerifier(temp_dir)
+        assert verifier._load_json('data.json') == {'total': 3}
+        
+        json_file.write_text(json.dumps({'total': 300}))
+        
+        assert verifier._load_json('data.json') == {'total': 300}
+
+
+class TestVerifyAddonsAndIntegrations:
+    """Test verify_addons and verify_integrations methods"""
+    
+    @pytest.mark.parametrize('backend', ['msgspec', 'ijson', 'json'])
+    def test_verify_addons_counts_all(self, temp_dir, monkeypatch, backend):
+        """Test that the total covers every add-on, not just the displayed ones"""
+        import ha_export_verifier
+        
+        if backend == 'msgspec' and not ha_export_verifier.MSGSPEC_AVAILABLE:
+            pytest.skip('msgspec not installed')
+        if backend == 'ijson' and not ha_export_verifier.IJSON_AVAILABLE:
+            pytest.skip('ijson not installed')
+        if backend != 'msgspec':
+            monkeypatch.setattr(ha_export_verifier, 'MSGSPEC_SCHEMAS', {})
+        monkeypatch.setattr(ha_export_verifier, 'IJSON_AVAILABLE', backend == 'ijson')
+        
+        addons_dir = Path(temp_dir) / 'addons'
+        addons_dir.mkdir()
+        addons = [{'name': f'Addon {i}', 'version': '1.0', 'state': 'started'} for i in range(25)]
+        (addons_dir / 'addons_summary.json').write_text(json.dumps({'installed_addons': addons}))
+        
+        verifier = ExportVerifier(temp_dir)
+        
+        assert verifier.verify_addons() == True
+        assert verifier.stats['addons']['total'] == 25
+    
+    @pytest.mark.parametrize('backend', ['msgspec', 'ijson', 'json'])
+    def test_verify_integrations(self, temp_dir, monkeypatch, backend):
+        """Test integration and custom component counts"""
+        import ha_export_verifier
+        
+        if backend == 'msgspec' and not ha_export_verifier.MSGSPEC_AVAILABLE:
+            pytest.skip('msgspec not installed')
+        if backend == 'ijson' and not ha_export_verifier.IJSON_AVAILABLE:
+            pytest.skip('ijson not installed')
+        if backend != 'msgspec':
+            monkeypatch.setattr(ha_export_verifier, 'MSGSPEC_SCHEMAS', {})
+        monkeypatch.setattr(ha_export_verifier, 'IJSON_AVAILABLE', backend == 'ijson')
+        
+        diag_dir = Path(temp_dir) / 'diagnostics'
+        diag_dir.mkdir()
+        (diag_dir / 'integrations.json').write_text(json.dumps({
+            'configured_integrations': [{'domain': f'd{i}', 'title': f'T{i}'} for i in range(12)],
+            'custom_components': [{'domain': 'hacs'}]
+        }))
+        
+        verifier = ExportVerifier(temp_dir)
+        
+        assert verifier.verify_integrations() == True
+        assert verifier.stats['integrations'] == {'configured': 12, 'custom': 1}
+    
+    @pytest.mark.parametrize('backend', ['msgspec', 'ijson', 'json'])
+    def test_load_list_heads_keeps_missing_fields_absent(self, temp_dir, monkeypatch, backend):
+        """Test that displayed records only contain the fields present in the JSON"""
+        import ha_export_verifier
+        
+        if backend == 'msgspec' and not ha_export_verifier.MSGSPEC_AVAILABLE:
+            pytest.skip('msgspec not installed')
+        if backend == 'ijson' and not ha_export_verifier.IJSON_AVAILABLE:
+            pytest.skip('ijson not installed')
+        if backend != 'msgspec':
+            monkeypatch.setattr(ha_export_verifier, 'MSGSPEC_SCHEMAS', {})
+        monkeypatch.setattr(ha_export_verifier, 'IJSON_AVAILABLE', backend == 'ijson')
+        
+        diag_dir = Path(temp_dir) / 'diagnostics'
+        diag_dir.mkdir()
+        (diag_dir / 'integrations.json').write_text(json.dumps({
+            'configured_integrations': [{'domain': 'hue', 'entries': 2}, {'domain': 'mqtt', 'title': 'MQTT'}]
+        }))
+        
+        verifier = ExportVerifier(temp_dir)
+        lists = verifier._load_list_heads(
+            'diagnostics/integrations.json', {'configured_integrations': 1, 'custom_components': 0}
+        )
+        
+        assert lists['configured_integrations'][1] == 2
+        assert lists['configured_integrations'][0][0]['domain'] == 'hue'
+        assert 'title' not in lists['configured_integrations'][0][0]
+        assert lists['custom_components'] == ([], 0)
+
+
 class TestVerifyStructure:
     """Test verify_structure method"""
     
@@ -60,6 +181,14 @@ class TestVerifyStructure:
         assert len(verifier.issues) > 0
         assert any('config' in issue for issue in verifier.issues)
     
+    def test_verify_structure_nonexistent_root(self, temp_dir):
+        """Test verification when the export root itself is missing"""
+        verifier = ExportVerifier(str(Path(temp_dir) / 'missing'))
+        result = verifier.verify_structure()
+        
+        assert result == False
+        assert len(verifier.issues) == 6
+    
     def test_verify_structure_missing_files(self, temp_dir):
         """Test verification with missing required files"""
         # Create directories but not files
@@ -169,6 +298,24 @@ class TestVerifyConfigFiles:
         assert result == True
         assert 'config_files' in verifier.stats
     
+    def test_verify_config_files_counts_nested(self, temp_dir):
+        """Test that YAML/JSON counts include nested directories"""
+        config_dir = Path(temp_dir) / 'config'
+        (config_dir / 'packages' / 'sub').mkdir(parents=True)
+        (config_dir / '.storage').mkdir()
+        
+        (config_dir / 'configuration.yaml').write_text('homeassistant:')
+        (config_dir / 'packages' / 'a.yaml').write_text('a:')
+        (config_dir / 'packages' / 'sub' / 'b.yml').write_text('b:')
+        (config_dir / '.storage' / 'core.json').write_text('{}')
+        
+        verifier = ExportVerifier(temp_dir)
+        verifier.verify_config_files()
+        
+        assert verifier.stats['config_files']['yaml'] == 3
+        assert verifier.stats['config_files']['json'] == 1
+        assert verifier.stats['config_files']['key_files_found'] == 1
+    
     def test_verify_config_files_missing_dir(self, temp_dir):
         """Test config file verification with missing directory"""
         verifier = ExportVerifier(temp_dir)
@@ -202,6 +349,22 @@ class TestVerifySecrets:
         assert 'secrets' in verifier.stats
         assert verifier.stats['secrets']['total'] == 5
     
+    def test_verify_secrets_type_count(self, temp_dir):
+        """Test that secret types are tallied by placeholder prefix"""
+        secrets_dir = Path(temp_dir) / 'secrets'
+        secrets_dir.mkdir(exist_ok=True)
+        
+        secrets_data = {
+            'total_secrets': 3,
+            'secrets': {'<<PASSWORD_1>>': 'a', '<<PASSWORD_2>>': 'b', '<<API_KEY_3>>': 'c'}
+        }
+        (secrets_dir / 'secrets_map.json').write_text(json.dumps(secrets_data))
+        
+        verifier = ExportVerifier(temp_dir)
+        verifier.verify_secrets()
+        
+        assert verifier.stats['secrets']['types'] == 2
+    
     def test_verify_secrets_missing_file(self, temp_dir):
         """Test secrets verification with missing file"""
         verifier = ExportVerifier(temp_dir)
@@ -252,6 +415,113 @@ class TestRun:
         assert 'entities' in verifier.stats or len(verifier.issues) > 0
 
 
+class TestArchiveIndex:
+    """Test verifying a tarball without extracting it"""
+    
+    def _build_export(self, export_dir):
+        for dir_name in ['config/.storage', 'diagnostics', 'secrets', 'addons']:
+            (export_dir / dir_name).mkdir(parents=True)
+        (export_dir / 'METADATA.json').write_text('{}')
+        (export_dir / 'README.md').write_text('# Export')
+        (export_dir / 'config' / 'configuration.yaml').write_text('homeassistant:\n  name: Test')
+        (export_dir / 'config' / '.storage' / 'core.json').write_text('{}')
+        (export_dir / 'diagnostics' / 'entities_registry.json').write_text(json.dumps({
+            'total_entities': 3,
+            'entities_by_domain': {'light': ['light.a', 'light.b'], 'sensor': ['sensor.c']},
+            'entities_by_platform': {},
+            'disabled_entities': ['light.b']
+        }))
+        (export_dir / 'secrets' / 'secrets_map.json').write_text(json.dumps({
+            'total_secrets': 1,
+            'secrets': {'<<PASSWORD_1>>': 'x'}
+        }))
+    
+    def test_archive_matches_directory(self, temp_dir):
+        """Test that tarball and directory verification produce the same results"""
+        import tarfile
+        from ha_export_verifier import ArchiveIndex, EXPORT_JSON_FILES
+        
+        export_dir = Path(temp_dir) / 'ha_config_export_test'
+        self._build_export(export_dir)
+        tarball = Path(temp_dir) / 'export.tar.gz'
+        with tarfile.open(tarball, 'w:gz') as tar:
+            tar.add(export_dir, arcname=export_dir.name)
+        
+        dir_verifier = ExportVerifier(str(export_dir))
+        dir_verifier.run()
+        
+        archive = ArchiveIndex.from_tarball(str(tarball), EXPORT_JSON_FILES.values())
+        tar_verifier = ExportVerifier(str(tarball), archive=archive)
+        tar_verifier.run()
+        
+        assert archive.root == 'ha_config_export_test'
+        assert tar_verifier.stats == dir_verifier.stats
+        assert tar_verifier.issues == dir_verifier.issues
+        assert tar_verifier.warnings == dir_verifier.warnings
+        assert tar_verifier.stats['entities']['active'] == 2
+    
+    def test_archive_missing_files_reported(self, temp_dir):
+        """Test that files and directories absent from the tarball are reported as missing"""
+        import tarfile
+        from ha_export_verifier import ArchiveIndex, EXPORT_JSON_FILES
+        
+        export_dir = Path(temp_dir) / 'export'
+        export_dir.mkdir()
+        (export_dir / 'README.md').write_text('# Export')
+        tarball = Path(temp_dir) / 'export.tar.gz'
+        with tarfile.open(tarball, 'w:gz') as tar:
+            tar.add(export_dir, arcname='export')
+        
+        verifier = ExportVerifier(str(tarball), archive=ArchiveIndex.from_tarball(str(tarball), EXPORT_JSON_FILES.values()))
+        
+        assert verifier.verify_config_files() == False
+        assert verifier.verify_entities() == False
+        assert 'Configuration directory missing' in verifier.issues
+        assert 'Entity registry not exported' in verifier.issues
+    
+    def test_implied_parents_registered_once(self):
+        """Test that ancestors missing from the tarball are created once, not per member"""
+        from ha_export_verifier import ArchiveIndex
+        
+        archive = ArchiveIndex()
+        archive._add('config/.storage/a/b/one.json', False, 1)
+        implied = archive.children['config/.storage/a']['b']
+        archive._add('config/.storage/a/b/two.json', False, 1)
+        
+        assert archive.children['config/.storage/a']['b'] is implied
+        assert archive.exists('config/.storage')
+        assert [entry.name for entry in archive.scandir('config/.storage/a/b')] == ['one.json', 'two.json']
+
+
+class TestParallelRun:
+    """Test that concurrent checks merge output and findings in a fixed order"""
+    
+    def test_run_output_in_check_order(self, temp_dir, capsys):
+        """Test that section headers appear in check order"""
+        verifier = ExportVerifier(temp_dir)
+        verifier.run()
+        
+        out = capsys.readouterr().out
+        headers = ['Export Structure', 'Entity Registry', 'Device Registry', 'Configuration Files',
+                   'Integrations', 'Secrets Mapping', 'Add-on Configurations']
+        positions = [out.index(f'=== Verifying {header} ===') for header in headers]
+        assert positions == sorted(positions)
+    
+    def test_run_issues_match_sequential(self, temp_dir):
+        """Test that issues are merged in the same order as sequential calls"""
+        sequential = ExportVerifier(temp_dir)
+        for check in [sequential.verify_structure, sequential.verify_entities, sequential.verify_devices,
+                      sequential.verify_config_files, sequential.verify_integrations,
+                      sequential.verify_secrets, sequential.verify_addons]:
+            check()
+        
+        parallel = ExportVerifier(temp_dir)
+        parallel.run()
+        
+        assert parallel.issues == sequential.issues
+        assert parallel.warnings == sequential.warnings
+
+
 class TestGenerateReport:
     """Test generate_report method"""
     
@@ -271,6 +541,25 @@ class TestGenerateReport:
         assert isinstance(report, dict)
 
 
+class TestReportSchema:
+    """Test the data-driven statistics section of the report"""
+    
+    def test_report_lists_present_sections(self, temp_dir, capsys):
+        """Test that only collected stats sections are printed"""
+        verifier = ExportVerifier(temp_dir)
+        verifier.stats = {
+            'entities': {'total': 10, 'active': 8, 'domains': 2, 'platforms': 1},
+            'config_files': {'yaml': 4, 'json': 2, 'key_files_found': 1},
+        }
+        
+        assert verifier.generate_report() == True
+        
+        out = capsys.readouterr().out
+        assert '  Entities: 10 (8 active)' in out
+        assert '  Config Files: 4 YAML, 2 JSON' in out
+        assert 'Devices:' not in out
+
+
 class TestIssueTracking:
     """Test issue and warning tracking"""
     
@@ -0,0 +1,477 @@
+"""
+Unit tests for secrets_manager.py
+Tests the SecretsManager and SecretsSanitizer classes.
+"""
+import pytest
+from pathlib import Path
+import sys
+import os
+
+# Add bin directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bin'))
+
+from secrets_manager import SecretsManager, SecretsSanitizer
+
+
+@pytest.fixture
+def manager(temp_dir):
+    """Create a SecretsManager with its own secrets directory"""
+    return SecretsManager(secrets_dir=str(Path(temp_dir) / 'secrets'))
+
+
+@pytest.fixture(params=['ahocorasick', 're'])
+def restore_backend(request, monkeypatch):
+    """Run restore tests with and without pyahocorasick"""
+    import secrets_manager
+
+    if request.param == 'ahocorasick' and not secrets_manager.AHOCORASICK_AVAILABLE:
+        pytest.skip('pyahocorasick not installed')
+    monkeypatch.setattr(secrets_manager, 'AHOCORASICK_AVAILABLE', request.param == 'ahocorasick')
+    return request.param
+
+
+class TestJsonHelpers:
+    """Test the JSON serialization helpers"""
+
+    @pytest.mark.parametrize('use_orjson', [True, False])
+    def test_dumps_returns_bytes(self, monkeypatch, use_orjson):
+        """Test that payloads are bytes and round-trip, including non-ASCII text"""
+        import secrets_manager
+
+        if use_orjson and not secrets_manager.ORJSON_AVAILABLE:
+            pytest.skip('orjson not installed')
+        monkeypatch.setattr(secrets_manager, 'ORJSON_AVAILABLE', use_orjson)
+        data = {'HA_SECRET_PASSWORD_001': 'pässwörd'}
+
+        payload = secrets_manager._json_dumps(data)
+
+        assert isinstance(payload, bytes)
+        assert b' ' not in payload
+        assert secrets_manager._json_loads(payload) == data
+
+
+@pytest.fixture(params=['hyperscan', 're'])
+def sanitize_backend(request, monkeypatch):
+    """Run sanitizer tests with and without the Hyperscan pre-filter"""
+    if request.param == 'hyperscan' and SecretsSanitizer._HYPERSCAN_DB is None:
+        pytest.skip('hyperscan not installed')
+    if request.param == 're':
+        monkeypatch.setattr(SecretsSanitizer, '_HYPERSCAN_DB', None)
+    return request.param
+
+
+@pytest.mark.usefixtures('sanitize_backend')
+class TestSecretsSanitizer:
+    """Test SecretsSanitizer class"""
+
+    def test_sanitize_password(self, manager):
+        """Test that key/value secrets are replaced with labels"""
+        sanitizer = SecretsSanitizer(manager)
+
+        result = sanitizer.sanitize_yaml_content('db_password: super_secret_123')
+
+        assert 'super_secret_123' not in result
+        assert '<<HA_SECRET_PASSWORD_001>>' in result
+
+    def test_sanitize_email_and_ip(self, manager):
+        """Test that standalone emails and IP addresses are replaced"""
+        sanitizer = SecretsSanitizer(manager)
+
+        result = sanitizer.sanitize_yaml_content('notify: admin@home.net\nhost: 192.168.1.20')
+
+        assert 'admin@home.net' not in result
+        assert '192.168.1.20' not in result
+
+    def test_comments_untouched(self, manager):
+        """Test that comment lines are not sanitized"""
+        sanitizer = SecretsSanitizer(manager)
+        content = '# password: super_secret_123'
+
+        assert sanitizer.sanitize_yaml_content(content) == content
+
+    def test_skip_placeholder_values(self, manager):
+        """Test that example/placeholder values are kept"""
+        sanitizer = SecretsSanitizer(manager)
+        content = 'password: your_password_here'
+
+        assert sanitizer.sanitize_yaml_content(content) == content
+
+
+class TestShouldSkip:
+    """Test SecretsSanitizer.should_skip"""
+
+    @pytest.mark.parametrize('value,expected', [
+        ('', True),
+        ('ab', True),
+        ('Example_Token', True),
+        ('***masked***', True),
+        ('your_api_key', True),
+        ('NULL', True),
+        ('super_secret_123', False),
+        ('a+b*c', False),
+    ])
+    def test_should_skip(self, manager, value, expected):
+        """Test placeholder and example detection"""
+        assert SecretsSanitizer(manager).should_skip(value) == expected
+
+
+class TestSecretsManager:
+    """Test SecretsManager class"""
+
+    def test_restore_roundtrip(self, manager, restore_backend):
+        """Test that sanitized text restores to the original"""
+        sanitizer = SecretsSanitizer(manager)
+        content = 'db_password: super_secret_123\ntoken: abcdef123456'
+
+        sanitized = sanitizer.sanitize_yaml_content(content)
+
+        assert manager.restore_secrets_in_text(sanitized) == content
+
+    def test_restore_multi_word_types(self, manager, restore_backend):
+        """Test restoring labels whose type contains an underscore"""
+        label = manager.add_secret('api_key', 'abcdef123456')
+
+        assert label == '<<HA_SECRET_API_KEY_001>>'
+        assert manager.restore_secrets_in_text(f'api_key: {label}') == 'api_key: abcdef123456'
+
+    def test_restore_unknown_label_kept(self, manager, restore_backend):
+        """Test that placeholders without a stored secret are left as-is"""
+        text = 'token: <<HA_SECRET_TOKEN_999>>'
+
+        assert manager.restore_secrets_in_text(text) == text
+
+    def test_restore_adjacent_placeholders(self, manager, restore_backend):
+        """Test restoring placeholders that directly follow each other"""
+        first = manager.add_secret('db_password', 'super_secret_123')
+        second = manager.add_secret('token', 'abcdef123456')
+
+        text = f'{first}{second} and {first}'
+
+        assert manager.restore_secrets_in_text(text) == 'super_secret_123abcdef123456 and super_secret_123'
+
+    @pytest.mark.parametrize('use_orjson', [True, False])
+    def test_vault_roundtrip(self, temp_dir, monkeypatch, use_orjson):
+        """Test that saved secrets and mappings load back in a new manager"""
+        import secrets_manager
+
+        if use_orjson and not secrets_manager.ORJSON_AVAILABLE:
+            pytest.skip('orjson not installed')
+        monkeypatch.setattr(secrets_manager, 'ORJSON_AVAILABLE', use_orjson)
+
+        secrets_dir = str(Path(temp_dir) / 'secrets')
+        manager = SecretsManager(secrets_dir=secrets_dir)
+        label = manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        reloaded = SecretsManager(secrets_dir=secrets_dir)
+
+        assert reloaded.get_secret(label) == 'super_secret_123'
+        assert reloaded.get_mapping_for_ai() == manager.get_mapping_for_ai()
+
+    def test_created_stamped_on_save(self, manager):
+        """Test that new mapping entries get the save timestamp"""
+        import json
+
+        manager.add_secret('db_password', 'super_secret_123')
+        manager.add_secret('token', 'abcdef123456')
+        manager.save()
+
+        data = json.loads(manager.mapping_file.read_text())
+        created = {meta['created'] for meta in data['mapping'].values()}
+        assert created == {data['updated']}
+
+    def test_save_replaces_files_atomically(self, manager, mocker):
+        """Test that a failed write leaves the previous vault and no temp files"""
+        manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+        vault = manager.secrets_file.read_bytes()
+
+        manager.add_secret('token', 'abcdef123456')
+        mocker.patch('secrets_manager.os.replace', side_effect=OSError('disk full'))
+        with pytest.raises(OSError):
+            manager.save()
+
+        assert manager.secrets_file.read_bytes() == vault
+        assert sorted(p.name for p in manager.secrets_dir.iterdir()) == [
+            '.encryption_key', 'secrets_mapping.json', 'secrets_vault.enc'
+        ]
+        assert os.stat(manager.secrets_file).st_mode & 0o777 == 0o600
+
+    def test_save_skipped_when_unchanged(self, manager):
+        """Test that saving again without new secrets does not rewrite the vault"""
+        manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+        vault = manager.secrets_file.read_bytes()
+
+        manager.add_secret('other_password', 'super_secret_123')  # duplicate value
+        manager.save()
+
+        assert manager.secrets_file.read_bytes() == vault
+
+        manager.add_secret('token', 'abcdef123456')
+        manager.save()
+
+        assert manager.secrets_file.read_bytes() != vault
+
+    def test_no_instance_dict(self, manager):
+        """Test that both classes use __slots__"""
+        assert not hasattr(manager, '__dict__')
+        assert not hasattr(SecretsSanitizer(manager), '__dict__')
+
+    def test_vault_decrypted_lazily(self, temp_dir, mocker):
+        """Test that mapping-only operations do not decrypt the vault"""
+        secrets_dir = str(Path(temp_dir) / 'secrets')
+        manager = SecretsManager(secrets_dir=secrets_dir)
+        label = manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        reloaded = SecretsManager(secrets_dir=secrets_dir)
+        load = mocker.spy(SecretsManager, '_ensure_secrets_loaded')
+        reloaded.export_for_ai(str(Path(temp_dir) / 'ai.json'))
+        reloaded.get_statistics()
+        reloaded.add_secret('other_password', 'super_secret_123')  # duplicate value
+        reloaded.save()
+
+        assert load.call_count == 0
+        assert reloaded.get_secret(label) == 'super_secret_123'
+        assert load.call_count == 1
+
+    def test_vault_not_plaintext(self, manager):
+        """Test that the vault file does not contain the secret value"""
+        manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        assert b'super_secret_123' not in manager.secrets_file.read_bytes()
+
+    def test_load_legacy_fernet_vault(self, temp_dir):
+        """Test that vaults written with Fernet can still be read"""
+        import json
+        from cryptography.fernet import Fernet
+
+        secrets_dir = Path(temp_dir) / 'secrets'
+        manager = SecretsManager(secrets_dir=str(secrets_dir))
+        fernet = Fernet(manager.key_file.read_bytes())
+        manager.secrets_file.write_bytes(fernet.encrypt(json.dumps({'HA_SECRET_TOKEN_001': 'abc'}).encode()))
+
+        reloaded = SecretsManager(secrets_dir=str(secrets_dir))
+
+        assert reloaded.get_secret('HA_SECRET_TOKEN_001') == 'abc'
+
+    def test_duplicate_value_reuses_label(self, manager):
+        """Test that the same value gets the same label"""
+        first = manager.add_secret('db_password', 'super_secret_123')
+        second = manager.add_secret('other_password', 'super_secret_123')
+
+        assert first == second
+        assert len(manager.get_mapping_for_ai()) == 1
+
+    def test_mapping_for_ai_cached_until_change(self, manager):
+        """Test that the AI mapping is reused until a secret is added"""
+        manager.add_secret('db_password', 'super_secret_123')
+        first = manager.get_mapping_for_ai()
+
+        assert manager.get_mapping_for_ai() is first
+
+        manager.add_secret('token', 'abcdef123456')
+        second = manager.get_mapping_for_ai()
+
+        assert second is not first
+        assert set(second) == {'HA_SECRET_PASSWORD_001', 'HA_SECRET_TOKEN_002'}
+        assert second['HA_SECRET_TOKEN_002']['placeholder'] == '<<HA_SECRET_TOKEN_002>>'
+
+    def test_duplicate_detection_after_reload(self, temp_dir):
+        """Test that values from a saved mapping are recognised after reload"""
+        secrets_dir = str(Path(temp_dir) / 'secrets')
+        manager = SecretsManager(secrets_dir=secrets_dir)
+        label = manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        reloaded = SecretsManager(secrets_dir=secrets_dir)
+
+        assert reloaded.add_secret('db_password', 'super_secret_123') == label
+
+    @pytest.mark.parametrize('key,value,expected', [
+        ('db_password', 'x', 'PASSWORD'),
+        ('host_password', 'x', 'PASSWORD'),
+        ('db_host', 'x', 'IP_ADDRESS'),
+        ('api-key', 'x', 'API_KEY'),
+        ('home_lng', 'x', 'LONGITUDE'),
+        ('value', 'eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiIxIn0.abc', 'TOKEN'),
+        ('value', '192.168.1.1', 'IP_ADDRESS'),
+        ('value', 'ABCDEF0123456789abcdef0123456789', 'API_KEY'),
+        ('value', 'me@example.org', 'EMAIL'),
+        ('value', 'plain', 'SECRET'),
+    ])
+    def test_detect_secret_type(self, manager, key, value, expected):
+        """Test secret type detection from key names and values"""
+        assert manager._detect_secret_type(key, value) == expected
+
+    def test_legacy_hashes_rehashed_on_load(self, temp_dir):
+        """Test that mappings saved with SHA-256 hashes still detect duplicates"""
+        import hashlib
+        import json
+
+        secrets_dir = str(Path(temp_dir) / 'secrets')
+        manager = SecretsManager(secrets_dir=secrets_dir)
+        label = manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        # Rewrite the mapping as an older version would have saved it
+        data = json.loads(manager.mapping_file.read_text())
+        del data['hash_version']
+        data['mapping'][label.strip('<>')]['hash'] = hashlib.sha256(b'super_secret_123').hexdigest()[:16]
+        manager.mapping_file.write_text(json.dumps(data))
+
+        reloaded = SecretsManager(secrets_dir=secrets_dir)
+
+        assert reloaded.add_secret('db_password', 'super_secret_123') == label
+
+
+class TestFileRewrite:
+    """Test sanitize_file and restore_secrets_in_file"""
+
+    def test_sanitize_and_restore_file_in_place(self, manager, temp_dir):
+        """Test that files are sanitized and restored in place"""
+        import secrets_manager
+
+        original = ''.join(f'sensor_{i}:\n  password: secret_value_{i}\n' for i in range(2000))
+        config_file = Path(temp_dir) / 'configuration.yaml'
+        config_file.write_text(original)
+        os.chmod(config_file, 0o640)
+        sanitizer = SecretsSanitizer(manager)
+
+        assert len(original) > secrets_manager.STREAM_CHUNK_SIZE
+        assert sanitizer.sanitize_file(str(config_file)) == True
+        sanitized = config_file.read_text()
+        assert 'secret_value_' not in sanitized
+        assert sanitized.count('\n') == original.count('\n')
+        assert manager.restore_secrets_in_file(str(config_file)) == True
+        assert config_file.read_text() == original
+        assert os.stat(config_file).st_mode & 0o777 == 0o640
+        assert sorted(os.listdir(temp_dir)) == ['configuration.yaml', 'secrets']
+
+    def test_sanitize_file_to_output_path(self, manager, temp_dir):
+        """Test sanitizing into a separate file keeps the source unchanged"""
+        source = Path(temp_dir) / 'source.yaml'
+        dest = Path(temp_dir) / 'dest.yaml'
+        source.write_text('password: super_secret_123')
+
+        assert SecretsSanitizer(manager).sanitize_file(str(source), str(dest)) == True
+        assert source.read_text() == 'password: super_secret_123'
+        assert dest.read_text() == 'password: <<HA_SECRET_PASSWORD_001>>'
+
+    def test_sanitize_missing_file(self, manager, temp_dir):
+        """Test that a missing file reports failure"""
+        assert SecretsSanitizer(manager).sanitize_file(str(Path(temp_dir) / 'missing.yaml')) == False
+
+    def test_restore_file_without_placeholders_untouched(self, manager, temp_dir):
+        """Test that files without placeholders are not rewritten"""
+        config_file = Path(temp_dir) / 'configuration.yaml'
+        config_file.write_text('homeassistant:\n  name: Home\n')
+        os.utime(config_file, ns=(0, 0))
+
+        assert manager.restore_secrets_in_file(str(config_file)) == True
+        assert os.stat(config_file).st_mtime_ns == 0
+
+        dest = Path(temp_dir) / 'restored.yaml'
+        assert manager.restore_secrets_in_file(str(config_file), str(dest)) == True
+        assert dest.read_text() == 'homeassistant:\n  name: Home\n'
+
+    def test_restore_empty_file(self, manager, temp_dir):
+        """Test restoring an empty file"""
+        config_file = Path(temp_dir) / 'empty.yaml'
+        config_file.touch()
+
+        assert manager.restore_secrets_in_file(str(config_file)) == True
+        assert config_file.read_text() == ''
+
+
+@pytest.mark.usefixtures('sanitize_backend')
+class TestSanitizeLine:
+    """Test SecretsSanitizer.sanitize_line"""
+
+    def test_value_repeated_in_key_untouched(self, manager):
+        """Test that only the matched value is replaced, not other occurrences"""
+        line = 'secret_secret: secret'
+
+        # 'secret' is too short to be skipped and also appears in the key
+        result = SecretsSanitizer(manager).sanitize_line(line)
+
+        assert result == 'secret_secret: <<HA_SECRET_SECRET_001>>'
+
+    def test_overlapping_matches_single_secret(self, manager):
+        """Test that an email inside a password value is stored only once"""
+        result = SecretsSanitizer(manager).sanitize_line('password: admin@home.net')
+
+        assert result == 'password: <<HA_SECRET_PASSWORD_001>>'
+        assert len(manager.get_mapping_for_ai()) == 1
+
+    def test_lines_without_separators(self, manager):
+        """Test the pre-filter keeps bare list items while still catching IPs"""
+        sanitizer = SecretsSanitizer(manager)
+
+        assert sanitizer.sanitize_line('  - password_entry') == '  - password_entry'
+        assert '10.0.0.1' not in sanitizer.sanitize_line('  - 10.0.0.1')
+
+    def test_non_ascii_whitespace(self, manager):
+        """Test that Unicode separators re accepts are not lost to the pre-filter"""
+        sanitizer = SecretsSanitizer(manager)
+
+        assert sanitizer.sanitize_line('lat:\xa052.5200') == 'lat:\xa0<<HA_SECRET_LATITUDE_001>>'
+        assert '52.52' not in sanitizer.sanitize_line('latitude:\u200352.52')
+
+    def test_multiple_values_on_one_line(self, manager):
+        """Test that several matches on one line are all replaced"""
+        result = SecretsSanitizer(manager).sanitize_line('host 10.0.0.1 and 10.0.0.2')
+
+        assert '10.0.0.1' not in result
+        assert '10.0.0.2' not in result
+
+
+class TestPassphraseMode:
+    """Test Argon2id passphrase-derived vault keys"""
+
+    @pytest.fixture(autouse=True)
+    def fast_kdf(self, monkeypatch):
+        """Use cheap Argon2 parameters to keep tests fast"""
+        import secrets_manager
+
+        if not secrets_manager.ARGON2_AVAILABLE:
+            pytest.skip('argon2-cffi not installed')
+        monkeypatch.setattr(secrets_manager, 'ARGON2_TIME_COST', 1)
+        monkeypatch.setattr(secrets_manager, 'ARGON2_MEMORY_COST', 64)
+        monkeypatch.setattr(secrets_manager, 'ARGON2_PARALLELISM', 1)
+
+    def test_passphrase_roundtrip(self, temp_dir, monkeypatch):
+        """Test that a passphrase-protected vault reloads with the same passphrase"""
+        import json
+
+        monkeypatch.setenv('HA_SECRETS_PASSPHRASE', 'correct horse')
+        secrets_dir = str(Path(temp_dir) / 'secrets')
+        manager = SecretsManager(secrets_dir=secrets_dir)
+        label = manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        params = json.loads(manager.key_file.read_text())
+        reloaded = SecretsManager(secrets_dir=secrets_dir)
+
+        assert params['kdf'] == 'argon2id'
+        assert set(params) == {'kdf', 'salt', 'time_cost', 'memory_cost', 'parallelism'}
+        assert reloaded.get_secret(label) == 'super_secret_123'
+        assert 'Argon2id' in reloaded.get_statistics()['encryption']
+
+    def test_wrong_passphrase_rejected(self, temp_dir, monkeypatch):
+        """Test that a wrong passphrase raises instead of loading an empty vault"""
+        monkeypatch.setenv('HA_SECRETS_PASSPHRASE', 'correct horse')
+        secrets_dir = str(Path(temp_dir) / 'secrets')
+        manager = SecretsManager(secrets_dir=secrets_dir)
+        manager.add_secret('db_password', 'super_secret_123')
+        manager.save()
+
+        monkeypatch.setenv('HA_SECRETS_PASSPHRASE', 'wrong')
+        with pytest.raises(ValueError):
+            SecretsManager(secrets_dir=secrets_dir).get_secret('HA_SECRET_PASSWORD_001')
+
+        monkeypatch.delenv('HA_SECRETS_PASSPHRASE')
+        with pytest.raises(ValueError):
+            SecretsManager(secrets_dir=secrets_dir)
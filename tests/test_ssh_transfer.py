@@ -6,13 +6,48 @@ import subprocess
 import os
 import tempfile
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock, call
+from unittest.mock import Mock, patch, MagicMock, AsyncMock, call
+import threading
 import time
+import asyncio
+import hashlib
+import shlex
+import shutil
+import stat
 
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bin'))
 
-from ssh_transfer import SSHTransfer, HARemoteManager
+from ssh_transfer import (
+    SSHTransfer, SSHTransferAsync, HARemoteManager, get_ssh, RESTART_SCRIPT, RESTART_METHODS, CONFIG_CHECK_SCRIPT,
+    run_with_grace,
+)
+
+
+@pytest.fixture(autouse=True)
+def run_via_subprocess_run(monkeypatch):
+    """Route run_with_grace through subprocess.run so tests can mock it."""
+    monkeypatch.setattr(
+        'ssh_transfer.run_with_grace',
+        lambda cmd, timeout, grace=None, **kwargs: subprocess.run(cmd, timeout=timeout, **kwargs),
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_ssh_pool():
+    """Start every test with an empty SSHTransfer pool."""
+    get_ssh.cache_clear()
+    yield
+    get_ssh.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def hash_cache(monkeypatch, tmp_path):
+    """Keep the local hash cache in a per-test file."""
+    cache_file = tmp_path / "hashes.json"
+    monkeypatch.setattr('ssh_transfer.HASH_CACHE_FILE', str(cache_file))
+    monkeypatch.setattr('ssh_transfer._hash_cache', None)
+    return cache_file
 
 
 class TestSSHTransfer:
@@ -67,6 +102,18 @@ class TestSSHTransfer:
         call_args = mock_run.call_args
         assert call_args.kwargs['timeout'] == 30
     
+    @patch('subprocess.run')
+    def test_connection_probe_discards_output(self, mock_run):
+        """The probe runs a no-op and only pipes stderr."""
+        mock_run.return_value = Mock(returncode=0, stdout=None, stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        ssh.test_connection()
+        
+        assert mock_run.call_args.args[0][-1] == "true"
+        assert mock_run.call_args.kwargs['stdout'] == subprocess.DEVNULL
+        assert mock_run.call_args.kwargs['stderr'] == subprocess.PIPE
+    
     @patch('subprocess.run')
     def test_connection_refused(self, mock_run):
         """Test connection refused error."""
@@ -174,6 +221,20 @@ class TestSSHTransfer:
         assert success is False
         assert stderr == "command not found"
     
+    @patch('subprocess.run')
+    def test_execute_command_without_capture(self, mock_run):
+        """capture=False discards stdout but keeps stderr."""
+        mock_run.return_value = Mock(returncode=0, stdout=None, stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        success, stdout, stderr = ssh.execute_command("tar -czf /root/b.tgz -C /config .", capture=False)
+        
+        assert success is True
+        assert stdout == ""
+        assert mock_run.call_args.kwargs['stdout'] == subprocess.DEVNULL
+        assert mock_run.call_args.kwargs['stderr'] == subprocess.PIPE
+        assert 'capture_output' not in mock_run.call_args.kwargs
+    
     @patch('subprocess.run')
     def test_execute_command_timeout(self, mock_run):
         """Test command execution timeout."""
@@ -185,6 +246,154 @@ class TestSSHTransfer:
         assert success is False
         assert "timeout" in stderr.lower()
     
+    @patch('subprocess.run')
+    def test_execute_script_single_session(self, mock_run):
+        """All steps go through one ssh process and are split by sentinel."""
+        mock_run.return_value = Mock(
+            returncode=1,
+            stdout="---STEP:backup---\ndone\n---EXIT:0---\n---STEP:check---\nbad\nconfig\n---EXIT:1---\n",
+            stderr="",
+        )
+        
+        ssh = SSHTransfer(host="test.host.com")
+        success, results, stderr = ssh.execute_script(
+            [("backup", "tar -czf /root/b.tgz -C /config ."), ("check", "ha core check"), ("restart", "ha core restart")]
+        )
+        
+        assert success is False
+        assert results == {"backup": (0, "done"), "check": (1, "bad\nconfig")}
+        mock_run.assert_called_once()
+        script = mock_run.call_args.kwargs['input']
+        assert "echo '---STEP:check---'" in script
+        assert "( ha core check ) 2>&1" in script
+    
+    @patch('subprocess.run')
+    def test_execute_script_timeout(self, mock_run):
+        """Script timeout reports no step results."""
+        mock_run.side_effect = subprocess.TimeoutExpired(cmd="ssh", timeout=120)
+        
+        ssh = SSHTransfer(host="test.host.com")
+        success, results, stderr = ssh.execute_script([("check", "ha core check")])
+        
+        assert success is False
+        assert results == {}
+        assert "timeout" in stderr.lower()
+    
+    @patch('subprocess.run')
+    def test_restart_single_session(self, mock_run, capsys):
+        """Restart method detection and the restart run in one ssh call."""
+        mock_run.return_value = Mock(
+            returncode=0, stdout="TRIED:docker restart homeassistant\n", stderr=""
+        )
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.restart_home_assistant() is True
+        mock_run.assert_called_once()
+        assert mock_run.call_args.args[0][-1] == RESTART_SCRIPT
+        assert "docker restart homeassistant" in capsys.readouterr().out
+    
+    @staticmethod
+    def _restart_script(available, command="true"):
+        """RESTART_SCRIPT with each probe replaced by true/false and the chosen method by command."""
+        script = RESTART_SCRIPT
+        for i, (probe, _) in enumerate(RESTART_METHODS):
+            script = script.replace(probe, "true" if i == available else "false")
+        if available is not None:
+            script = script.replace(RESTART_METHODS[available][1], command)
+        return script
+    
+    def test_restart_script_uses_first_detected_method(self):
+        """Only the method whose probe matches is run."""
+        result = subprocess.run(["sh", "-c", self._restart_script(1)], capture_output=True, text=True)
+        
+        assert result.returncode == 0
+        assert result.stdout.splitlines() == ["TRIED:true"]
+    
+    def test_restart_script_reports_failure(self):
+        """A failing restart is not masked by the other methods."""
+        result = subprocess.run(["sh", "-c", self._restart_script(0, "false")], capture_output=True, text=True)
+        
+        assert result.returncode == 1
+        assert result.stdout.splitlines() == ["TRIED:false"]
+    
+    @patch('subprocess.run')
+    def test_check_config_single_call(self, mock_run):
+        """The config check picks ha or hass remotely in one ssh call."""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="Invalid config for [light]")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.check_config("/config") == (False, "Invalid config for [light]")
+        mock_run.assert_called_once()
+        assert mock_run.call_args.args[0][-1] == CONFIG_CHECK_SCRIPT.format(config_path="/config")
+    
+    def test_check_script_keeps_ha_failure(self):
+        """A failing ha core check is reported instead of falling through to hass."""
+        script = CONFIG_CHECK_SCRIPT.format(config_path="/config")
+        script = script.replace("command -v ha >/dev/null 2>&1", "true").replace("ha core check", "exit 3")
+        
+        result = subprocess.run(["sh", "-c", script], capture_output=True, text=True)
+        
+        assert result.returncode == 3
+        assert result.stderr == ""
+    
+    def test_restart_script_without_known_method(self):
+        """The script fails when no restart method is detected."""
+        result = subprocess.run(["sh", "-c", self._restart_script(None)], capture_output=True, text=True)
+        
+        assert result.returncode == 1
+        assert result.stdout == ""
+    
+    @patch('subprocess.run')
+    def test_execute_background_returns_pid(self, mock_run):
+        """Background commands are detached with nohup and report their PID."""
+        mock_run.return_value = Mock(returncode=0, stdout="4242\n", stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.execute_background("tar -czf /root/b.tgz -C /config .") == "4242"
+        remote = mock_run.call_args.args[0][-1]
+        assert remote.startswith("nohup sh -c 'tar -czf /root/b.tgz -C /config .'")
+        assert remote.endswith("& echo $!")
+    
+    @patch('subprocess.run')
+    def test_wait_background_polls_pid(self, mock_run):
+        """Waiting polls the PID and then runs the check."""
+        mock_run.return_value = Mock(returncode=0, stdout=None, stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.wait_background("4242", check="test -s /root/b.tgz") is True
+        assert mock_run.call_args.args[0][-1] == (
+            "while kill -0 4242 2>/dev/null; do sleep 1; done; test -s /root/b.tgz"
+        )
+    
+    @patch('subprocess.run')
+    def test_start_backup_in_background(self, mock_run):
+        """With rsync, the backup archives a hard-link snapshot in the background."""
+        mock_run.return_value = Mock(returncode=0, stdout="PID:4242\n", stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        ssh._remote_rsync = True
+        with patch.object(SSHTransfer, '_rsync_path', "/usr/bin/rsync"):
+            success, backup_path, pid = ssh.start_backup("/config", "b")
+        
+        assert (success, backup_path, pid) == (True, "/root/b.tar.gz", "4242")
+        assert "cp -al /config /config.b.snapshot" in mock_run.call_args.args[0][-1]
+    
+    @patch('subprocess.run')
+    def test_start_backup_without_rsync_is_synchronous(self, mock_run):
+        """Without rsync the upload may rewrite files, so the backup blocks."""
+        mock_run.return_value = Mock(returncode=0, stdout=None, stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        with patch.object(SSHTransfer, '_rsync_path', None):
+            success, backup_path, pid = ssh.start_backup("/config", "b")
+        
+        assert (success, backup_path, pid) == (True, "/root/b.tar.gz", None)
+        assert mock_run.call_args.args[0][-1] == "tar -czf /root/b.tar.gz -C /config ."
+    
     @patch('subprocess.run')
     def test_download_file_success(self, mock_run, temp_dir):
         """Test successful file download."""
@@ -350,6 +559,119 @@ class TestSSHTransfer:
         assert mock_run.call_args.kwargs['timeout'] == 900
 
 
+class TestRetryBackoff:
+    """Tests for exponential retry backoff."""
+    
+    @pytest.mark.parametrize("attempt,expected", [(0, 2), (1, 4), (2, 8), (3, 10), (10, 10)])
+    def test_backoff_doubles_up_to_cap(self, attempt, expected):
+        """Without jitter the delay doubles per attempt and is capped."""
+        ssh = SSHTransfer(host="test.host.com", retry_delay=2, retry_max_delay=10, retry_jitter=0)
+        
+        assert ssh._backoff(attempt) == expected
+    
+    def test_backoff_jitter_bounds(self):
+        """Jitter stays within the configured fraction of the delay."""
+        ssh = SSHTransfer(host="test.host.com", retry_delay=4, retry_jitter=0.5)
+        
+        delays = [ssh._backoff(0) for _ in range(200)]
+        
+        assert all(2 <= d <= 6 for d in delays)
+        assert len(set(delays)) > 1
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_retry_sleeps_use_backoff(self, mock_sleep, mock_run):
+        """Retry loops sleep for the backoff delay of each attempt."""
+        mock_run.return_value = Mock(returncode=255, stdout="", stderr="Network error")
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3, retry_delay=1, retry_jitter=0)
+        ssh.test_connection()
+        
+        assert mock_sleep.call_args_list == [call(1), call(2)]
+
+
+class TestErrorClassification:
+    """Tests for permanent vs. transient error handling."""
+    
+    @pytest.mark.parametrize("stderr,kind", [
+        ("scp: /x: No such file or directory", "perm"),
+        ("Host key verification failed.", "perm"),
+        ("ssh: Could not resolve hostname x: Name or service not known", "perm"),
+        ("Connection reset by peer", "transient"),
+        ("ssh: connect to host x port 22: Connection timed out", "transient"),
+        ("ssh: connect to host x port 22: Connection refused", "transient"),
+        ("Network error", "unknown"),
+    ])
+    def test_classify_stderr(self, stderr, kind):
+        """stderr is mapped to the expected error class."""
+        assert SSHTransfer._classify_stderr(stderr) == kind
+    
+    @pytest.mark.parametrize("stderr,expected", [
+        ("ssh: connect to host x port 22: No route to host", "No route to host"),
+        ("scp: /remote/a: No such file or directory", "No such file or directory"),
+        ("Permission denied (publickey)", "Permission denied"),
+        ("Network error", None),
+    ])
+    def test_match_err(self, stderr, expected):
+        """The single-scan matcher finds the known error fragment."""
+        assert SSHTransfer._match_err(stderr) == expected
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_connection_permanent_error_not_retried(self, mock_sleep, mock_run):
+        """Host key failures return after a single attempt."""
+        mock_run.return_value = Mock(returncode=255, stdout="", stderr="Host key verification failed.")
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3)
+        success, message = ssh.test_connection()
+        
+        assert success is False
+        assert mock_run.call_count == 1
+        mock_sleep.assert_not_called()
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_connection_refused_is_retried(self, mock_sleep, mock_run):
+        """Refused connections are retried, e.g. while HA restarts."""
+        mock_run.side_effect = [
+            Mock(returncode=255, stdout="", stderr="Connection refused"),
+            Mock(returncode=0, stdout="", stderr=""),
+        ]
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3)
+        success, message = ssh.test_connection()
+        
+        assert success is True
+        assert mock_run.call_count == 2
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_download_permanent_error_not_retried(self, mock_sleep, mock_run, temp_dir):
+        """Downloads fail fast on unresolvable hosts."""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="ssh: Could not resolve hostname x")
+        
+        ssh = SSHTransfer(host="x", retry_attempts=3)
+        
+        assert ssh.download_file("/remote/a.txt", os.path.join(temp_dir, "a.txt")) is False
+        assert mock_run.call_count == 1
+        mock_sleep.assert_not_called()
+
+    
+    @patch('subprocess.run')
+    @patch('pathlib.Path.exists')
+    @patch('time.sleep')
+    def test_upload_permanent_error_not_retried(self, mock_sleep, mock_exists, mock_run):
+        """Uploads fail fast on host key mismatches."""
+        mock_exists.return_value = True
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="Host key verification failed.")
+        
+        ssh = SSHTransfer(host="x", retry_attempts=3)
+        
+        assert ssh.upload_file("/local/a.txt", "/remote/a.txt") is False
+        assert mock_run.call_count == 1
+        mock_sleep.assert_not_called()
+
+
 class TestHARemoteManager:
     """Tests for HARemoteManager class."""
     
@@ -380,7 +702,8 @@ class TestHARemoteManager:
             connection_timeout=45,
             transfer_timeout=900,
             retry_attempts=5,
-            retry_delay=3
+            retry_delay=3,
+            use_paramiko=False
         )
     
     @patch('ssh_transfer.SSHTransfer')
@@ -406,7 +729,7 @@ class TestHARemoteManager:
         """Test successful configuration export."""
         # Mock the SSH transfer object
         mock_ssh = Mock()
-        mock_ssh.test_connection.return_value = (True, "Connected")
+        mock_ssh.ensure_connected.return_value = (True, "Connected")
         mock_ssh.download_directory.return_value = True
         mock_ssh_class.return_value = mock_ssh
         
@@ -417,14 +740,14 @@ class TestHARemoteManager:
         success = manager.export_config(export_dir)
         
         assert success is True
-        mock_ssh.test_connection.assert_called_once()
+        mock_ssh.ensure_connected.assert_called_once()
         mock_ssh.download_directory.assert_called_once()
     
     @patch('ssh_transfer.SSHTransfer')
     def test_export_config_connection_failure(self, mock_ssh_class):
         """Test export when connection fails."""
         mock_ssh = Mock()
-        mock_ssh.test_connection.return_value = (False, "Connection failed")
+        mock_ssh.ensure_connected.return_value = (False, "Connection failed")
         mock_ssh_class.return_value = mock_ssh
         
         config = {'host': 'ha.local'}
@@ -433,17 +756,17 @@ class TestHARemoteManager:
         success = manager.export_config("/tmp/export")
         
         assert success is False
-        mock_ssh.test_connection.assert_called_once()
+        mock_ssh.ensure_connected.assert_called_once()
         mock_ssh.download_directory.assert_not_called()
     
     @patch('ssh_transfer.SSHTransfer')
     def test_import_config_with_backup(self, mock_ssh_class):
         """Test import with backup creation."""
         mock_ssh = Mock()
-        mock_ssh.test_connection.return_value = (True, "Connected")
-        mock_ssh.backup_remote.return_value = (True, "/backup/path")
+        mock_ssh.ensure_connected.return_value = (True, "Connected")
+        mock_ssh.start_backup.return_value = (True, "/backup/path", None)
         mock_ssh.upload_directory.return_value = True
-        mock_ssh.check_config.return_value = (True, "Valid")
+        mock_ssh.execute_script.return_value = (True, {"check": (0, "Valid")}, "")
         mock_ssh_class.return_value = mock_ssh
         
         config = {'host': 'ha.local'}
@@ -452,9 +775,936 @@ class TestHARemoteManager:
         success = manager.import_config("/local/config", create_backup=True)
         
         assert success is True
-        mock_ssh.backup_remote.assert_called_once()
+        mock_ssh.start_backup.assert_called_once()
         mock_ssh.upload_directory.assert_called_once()
-        mock_ssh.check_config.assert_called_once()
+        mock_ssh.execute_script.assert_called_once()
+        mock_ssh.wait_background.assert_not_called()
+    
+    @patch('ssh_transfer.SSHTransfer')
+    def test_import_config_waits_for_background_backup(self, mock_ssh_class):
+        """A background backup is awaited after the upload, before the check."""
+        mock_ssh = Mock()
+        mock_ssh.ensure_connected.return_value = (True, "Connected")
+        mock_ssh.start_backup.return_value = (True, "/root/b.tar.gz", "4242")
+        mock_ssh.upload_directory.return_value = True
+        mock_ssh.wait_background.return_value = True
+        mock_ssh.execute_script.return_value = (True, {"check": (0, "Valid")}, "")
+        mock_ssh_class.return_value = mock_ssh
+        
+        manager = HARemoteManager({'host': 'ha.local'})
+        
+        assert manager.import_config("/local/config") is True
+        mock_ssh.wait_background.assert_called_once_with("4242", check="test -s /root/b.tar.gz")
+        names = [c[0] for c in mock_ssh.method_calls]
+        assert names.index("upload_directory") < names.index("wait_background") < names.index("execute_script")
+    
+    @patch('ssh_transfer.SSHTransfer')
+    def test_import_config_check_and_restart_batched(self, mock_ssh_class):
+        """Check and restart run as one remote script after the upload."""
+        mock_ssh = Mock()
+        mock_ssh.ensure_connected.return_value = (True, "Connected")
+        mock_ssh.upload_directory.return_value = True
+        mock_ssh.execute_script.return_value = (True, {"check": (0, ""), "restart": (0, "")}, "")
+        mock_ssh_class.return_value = mock_ssh
+        
+        manager = HARemoteManager({'host': 'ha.local'})
+        success = manager.import_config("/local/config", create_backup=False, restart=True)
+        
+        assert success is True
+        steps = mock_ssh.execute_script.call_args.args[0]
+        assert [name for name, _ in steps] == ["check", "restart"]
+        assert "ha core check" in steps[0][1]
+        assert steps[1][1] == RESTART_SCRIPT
+        mock_ssh.restart_home_assistant.assert_not_called()
+    
+    @patch('ssh_transfer.SSHTransfer')
+    def test_import_config_check_failure(self, mock_ssh_class):
+        """A failing check step fails the import."""
+        mock_ssh = Mock()
+        mock_ssh.ensure_connected.return_value = (True, "Connected")
+        mock_ssh.upload_directory.return_value = True
+        mock_ssh.execute_script.return_value = (False, {"check": (1, "Invalid config")}, "")
+        mock_ssh_class.return_value = mock_ssh
+        
+        manager = HARemoteManager({'host': 'ha.local'})
+        
+        assert manager.import_config("/local/config", create_backup=False, restart=True) is False
+
+
+@pytest.fixture
+def fake_paramiko(monkeypatch):
+    """Install a stand-in paramiko module with an empty connection pool."""
+    module = MagicMock()
+    module.SSHException = type("SSHException", (Exception,), {})
+    module.AuthenticationException = type("AuthenticationException", (module.SSHException,), {})
+    client = module.SSHClient.return_value
+    client.get_transport.return_value.is_active.return_value = True
+    stdout = MagicMock()
+    stdout.read.return_value = b"out"
+    stdout.channel.recv_exit_status.return_value = 0
+    client.exec_command.return_value = (MagicMock(), stdout, MagicMock(read=Mock(return_value=b"")))
+    monkeypatch.setattr('ssh_transfer.paramiko', module, raising=False)
+    monkeypatch.setattr('ssh_transfer.PARAMIKO_AVAILABLE', True)
+    monkeypatch.setattr('ssh_transfer._SSH_POOL', {})
+    return module
+
+
+@pytest.fixture
+def local_ssh(temp_dir):
+    """An SSHTransfer whose ssh runs the remote command in a local shell."""
+    fake_ssh = Path(temp_dir) / "fake_ssh"
+    fake_ssh.write_text('#!/bin/sh\nshift\nexec sh -c "$1"\n')
+    fake_ssh.chmod(0o755)
+    ssh = SSHTransfer(host="test.host.com")
+    ssh._ssh_base = (str(fake_ssh),)
+    return ssh
+
+
+@pytest.mark.skipif(shutil.which("tar") is None, reason="tar not installed")
+class TestTarStream:
+    """Tests for the tar-over-ssh directory fallback."""
+    
+    def _make_tree(self, root):
+        (root / "packages").mkdir(parents=True)
+        (root / "packages" / "lights.yaml").write_text("light:")
+        (root / "configuration.yaml").write_text("homeassistant:")
+        (root / "home-assistant.log").write_text("noise")
+        (root / "deps").mkdir()
+        (root / "deps" / "lib.py").write_text("")
+    
+    def test_download_round_trip(self, local_ssh, temp_dir):
+        """A remote tree arrives intact, minus excluded files and dirs."""
+        remote = Path(temp_dir) / "remote"
+        local = Path(temp_dir) / "local"
+        self._make_tree(remote)
+        
+        assert local_ssh._tar_download_dir(str(remote), str(local), ["*.log", "deps/"]) is True
+        
+        assert (local / "packages" / "lights.yaml").read_text() == "light:"
+        assert (local / "configuration.yaml").exists()
+        assert not (local / "home-assistant.log").exists()
+        assert not (local / "deps").exists()
+    
+    def test_upload_round_trip(self, local_ssh, temp_dir):
+        """Uploads unpack into the remote directory itself, creating it if needed."""
+        local = Path(temp_dir) / "local"
+        remote = Path(temp_dir) / "remote" / "config"
+        self._make_tree(local)
+        
+        assert local_ssh._tar_upload_dir(str(local), str(remote), []) is True
+        
+        assert (remote / "packages" / "lights.yaml").exists()
+        assert not (remote / "local").exists()
+    
+    def test_remote_failure_reported(self, local_ssh, temp_dir, capsys):
+        """A failing remote tar fails the download with its error."""
+        assert local_ssh._tar_download_dir("/nonexistent/dir", str(Path(temp_dir) / "out"), []) is False
+        assert "tar download failed" in capsys.readouterr().out
+    
+    def test_pipeline_timeout_kills_both(self):
+        """Both ends of the pipe are killed when the timeout passes."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        start = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired):
+            ssh._run_pipeline(["sleep", "5"], ["cat"], timeout=0.2)
+        assert time.monotonic() - start < 3
+
+
+class TestBatchedPaths:
+    """Tests for copying several sources with one rsync run."""
+    
+    def test_upload_paths_single_rsync(self, temp_dir):
+        """All sources go into one rsync command ahead of the destination."""
+        ssh = SSHTransfer(host="test.host.com")
+        ssh._remote_rsync = True
+        
+        with patch.object(SSHTransfer, '_rsync_path', "/usr/bin/rsync"), \
+             patch.object(ssh, '_stream_command', return_value=(0, "")) as mock_stream:
+            assert ssh.upload_paths(["/tmp/a/", "/tmp/b.yaml"], "/config") is True
+        
+        mock_stream.assert_called_once()
+        assert mock_stream.call_args.args[0][-3:] == ["/tmp/a", "/tmp/b.yaml", "root@test.host.com:/config/"]
+    
+    def test_download_paths_single_rsync(self, temp_dir):
+        """Remote sources share one rsync run."""
+        ssh = SSHTransfer(host="test.host.com")
+        ssh._remote_rsync = True
+        
+        with patch.object(SSHTransfer, '_rsync_path', "/usr/bin/rsync"), \
+             patch.object(ssh, '_stream_command', return_value=(0, "")) as mock_stream:
+            assert ssh.download_paths(["/config/packages", "/config/blueprints"], temp_dir) is True
+        
+        assert mock_stream.call_args.args[0][-3:-1] == [
+            "root@test.host.com:/config/packages",
+            "root@test.host.com:/config/blueprints",
+        ]
+    
+    def test_upload_paths_without_rsync(self):
+        """Without rsync each path is copied on its own."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(SSHTransfer, '_rsync_path', None), \
+             patch.object(ssh, 'upload_file', return_value=True) as mock_upload:
+            assert ssh.upload_paths(["/tmp/a", "/tmp/b.yaml"], "/config/") is True
+        
+        assert mock_upload.call_args_list == [
+            call("/tmp/a", "/config/a"),
+            call("/tmp/b.yaml", "/config/b.yaml"),
+        ]
+    
+    @patch('shutil.which', return_value="/usr/bin/sshpass")
+    def test_password_survives_directory_listing(self, mock_which, temp_dir):
+        """Listing entries for a parallel download does not drop SSHPASS before rsync runs."""
+        ssh = SSHTransfer(host="test.host.com", password="secret")
+        seen = []
+        
+        def fake_stream(*args):
+            seen.append(os.environ.get('SSHPASS'))
+            return 0, ""
+        
+        with patch('subprocess.run', return_value=Mock(returncode=0, stdout="a\nb\n", stderr="")), \
+             patch.object(ssh, '_stream_command', side_effect=fake_stream):
+            assert ssh._rsync_download("/config", temp_dir, [], parallel=2) is True
+        
+        assert seen == ["secret", "secret"]
+        assert 'SSHPASS' not in os.environ
+
+
+class TestExplicitMaster:
+    """Tests for opening and closing the master connection explicitly."""
+    
+    @patch('subprocess.run')
+    def test_start_master_backgrounds_ssh(self, mock_run, monkeypatch, tmp_path):
+        """start_master runs ssh -N -f with stdio detached."""
+        monkeypatch.setattr('ssh_transfer.CONTROL_DIR', str(tmp_path))
+        mock_run.return_value = Mock(returncode=0)
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.start_master() is True
+        cmd = mock_run.call_args.args[0]
+        assert cmd[-3:] == ["-N", "-f", "root@test.host.com"]
+        assert mock_run.call_args.kwargs['stderr'] == subprocess.DEVNULL
+    
+    @patch('subprocess.run')
+    def test_start_master_skipped_when_running(self, mock_run, monkeypatch, tmp_path):
+        """No ssh is started if the existing master answers its check."""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        monkeypatch.setattr('ssh_transfer.CONTROL_DIR', str(tmp_path))
+        ssh = SSHTransfer(host="test.host.com")
+        Path(ssh._control_path).touch()
+        
+        assert ssh.start_master() is True
+        mock_run.assert_called_once()
+        assert mock_run.call_args.args[0][:3] == ["ssh", "-O", "check"]
+    
+    @patch('ssh_transfer.SSHTransfer')
+    def test_manager_context_opens_and_closes(self, mock_ssh_class):
+        """Using the manager as a context manager brackets the master connection."""
+        mock_ssh = mock_ssh_class.return_value
+        
+        with HARemoteManager({'host': 'ha.local'}) as manager:
+            mock_ssh.start_master.assert_called_once()
+            mock_ssh.close.assert_not_called()
+        
+        assert manager.ssh is mock_ssh
+        mock_ssh.close.assert_called_once()
+
+
+class TestParallelDownload:
+    """Tests for splitting a directory download over several rsync processes."""
+    
+    def test_entries_split_round_robin(self):
+        """Top-level entries are spread evenly over the workers."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(ssh, 'execute_command', return_value=(True, "a\nb\n.storage\nd\ne\n", "")):
+            assert ssh._split_remote_entries("/config", 2) == [["a", ".storage", "e"], ["b", "d"]]
+    
+    def test_unsafe_entry_names_disable_split(self):
+        """Names needing shell quoting fall back to a single rsync."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(ssh, 'execute_command', return_value=(True, "a\nmy file.yaml\n", "")):
+            assert ssh._split_remote_entries("/config", 2) is None
+    
+    def test_rsync_download_runs_one_command_per_group(self, temp_dir):
+        """Each group gets its own rsync; only the first echoes progress."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(ssh, 'execute_command', return_value=(True, "a\nb\nc\n", "")), \
+             patch.object(ssh, '_stream_command', return_value=(0, "")) as mock_stream:
+            assert ssh._rsync_download("/config", temp_dir, [], parallel=2) is True
+        
+        assert mock_stream.call_count == 2
+        sources = sorted(c.args[0][-3:-1] for c in mock_stream.call_args_list)
+        assert sources[0] == ["root@test.host.com:/config/a", "root@test.host.com:/config/c"]
+        assert sorted(c.args[2] for c in mock_stream.call_args_list) == [False, True]
+    
+    def test_workers_share_one_thread_pool(self, temp_dir):
+        """Parallel rsync workers run on the module's shared executor."""
+        from ssh_transfer import _get_executor
+        ssh = SSHTransfer(host="test.host.com")
+        threads = []
+        
+        def fake_stream(cmd, timeout, echo):
+            threads.append(threading.current_thread().name)
+            return 0, ""
+        
+        with patch.object(ssh, 'execute_command', return_value=(True, "a\nb\n", "")), \
+             patch.object(ssh, '_stream_command', side_effect=fake_stream):
+            assert ssh._rsync_download("/config", temp_dir, [], parallel=2) is True
+        
+        assert all(name.startswith("ha-ssh") for name in threads)
+        assert _get_executor() is _get_executor()
+    
+    def test_failed_worker_fails_download(self, temp_dir):
+        """The download fails if any worker fails."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(ssh, 'execute_command', return_value=(True, "a\nb\n", "")), \
+             patch.object(ssh, '_stream_command', side_effect=[(0, ""), (23, "partial transfer")]):
+            assert ssh._rsync_download("/config", temp_dir, [], parallel=2) is False
+
+
+class TestParamikoBackend:
+    """Tests for the pooled paramiko command and SFTP path."""
+    
+    @patch('subprocess.run')
+    def test_commands_reuse_pooled_client(self, mock_run, fake_paramiko):
+        """Consecutive commands share one paramiko connection."""
+        ssh = SSHTransfer(host="test.host.com", use_paramiko=True)
+        
+        assert ssh.execute_command("ls") == (True, "out", "")
+        assert ssh.execute_command("ls") == (True, "out", "")
+        
+        fake_paramiko.SSHClient.assert_called_once()
+        fake_paramiko.SSHClient.return_value.get_transport.return_value.set_keepalive.assert_called_once_with(30)
+        mock_run.assert_not_called()
+    
+    @patch('subprocess.run')
+    def test_manager_config_enables_paramiko(self, mock_run, fake_paramiko):
+        """use_paramiko in the manager config reaches the shared SSHTransfer."""
+        manager = HARemoteManager({'host': 'ha.local', 'use_paramiko': True})
+        
+        assert manager.ssh.use_paramiko is True
+        assert manager.ssh.execute_command("ls") == (True, "out", "")
+        mock_run.assert_not_called()
+    
+    def test_dropped_connection_is_replaced(self, fake_paramiko):
+        """A pooled client whose transport died is closed, not reused."""
+        ssh = SSHTransfer(host="test.host.com", use_paramiko=True)
+        ssh.execute_command("ls")
+        fake_paramiko.SSHClient.return_value.get_transport.return_value.is_active.return_value = False
+        
+        ssh.execute_command("ls")
+        
+        assert fake_paramiko.SSHClient.call_count == 2
+    
+    @patch('subprocess.run')
+    def test_upload_file_uses_sftp(self, mock_run, fake_paramiko, temp_dir):
+        """Single files are uploaded with SFTP put."""
+        local = Path(temp_dir) / "configuration.yaml"
+        local.write_text("homeassistant:")
+        sftp = fake_paramiko.SSHClient.return_value.open_sftp.return_value.__enter__.return_value
+        
+        ssh = SSHTransfer(host="test.host.com", use_paramiko=True)
+        
+        assert ssh.upload_file(str(local), "/config/configuration.yaml") is True
+        sftp.put.assert_called_once_with(str(local), "/config/configuration.yaml")
+        mock_run.assert_not_called()
+    
+    def test_large_download_buffered_and_preallocated(self, fake_paramiko, temp_dir, monkeypatch):
+        """Large files are streamed with getfo into a preallocated local file."""
+        monkeypatch.setattr('ssh_transfer.SFTP_LARGE_FILE', 16)
+        sftp = fake_paramiko.SSHClient.return_value.open_sftp.return_value.__enter__.return_value
+        sftp.stat.return_value = Mock(st_mode=stat.S_IFREG, st_size=32)
+        sftp.getfo.side_effect = lambda remote, f, prefetch: f.write(b"x" * 32)
+        local = os.path.join(temp_dir, "backup.tar.zst")
+        
+        ssh = SSHTransfer(host="test.host.com", use_paramiko=True)
+        
+        assert ssh.download_file("/root/backup.tar.zst", local) is True
+        sftp.get.assert_not_called()
+        assert os.path.getsize(local) == 32
+    
+    @patch('subprocess.run')
+    def test_directory_upload_falls_back_to_scp(self, mock_run, fake_paramiko, temp_dir):
+        """Directories are still copied with scp -r."""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com", use_paramiko=True)
+        
+        assert ssh.upload_file(temp_dir, "/config") is True
+        assert mock_run.call_args[0][0][0] == "scp"
+    
+    def test_directory_upload_over_sftp(self, fake_paramiko, temp_dir):
+        """Without rsync or tar, directories go over parallel SFTP channels."""
+        root = Path(temp_dir) / "config"
+        (root / "packages").mkdir(parents=True)
+        (root / "packages" / "lights.yaml").write_text("light:")
+        (root / "configuration.yaml").write_text("homeassistant:")
+        (root / "home-assistant.log").write_text("noise")
+        (root / "deps").mkdir()
+        (root / "deps" / "lib.py").write_text("")
+        sftp = fake_paramiko.SSHClient.return_value.open_sftp.return_value.__enter__.return_value
+        sftp.stat.side_effect = FileNotFoundError
+        
+        ssh = SSHTransfer(host="test.host.com", use_paramiko=True)
+        with patch.object(SSHTransfer, '_rsync_path', None), patch.object(SSHTransfer, '_tar_path', None):
+            assert ssh.upload_directory(str(root), "/config", ["*.log", "deps/"]) is True
+        
+        assert sftp.mkdir.call_args_list == [call("/config"), call("/config/packages")]
+        assert {c.args[1] for c in sftp.put.call_args_list} == {
+            "/config/configuration.yaml",
+            "/config/packages/lights.yaml",
+        }
+        assert all(c.kwargs['confirm'] is False for c in sftp.put.call_args_list)
+    
+    def test_rsync_style_excludes(self):
+        """Directory-only, basename and path patterns follow rsync's rules."""
+        assert SSHTransfer._is_excluded("deps", True, ["deps/"]) is True
+        assert SSHTransfer._is_excluded("deps", False, ["deps/"]) is False
+        assert SSHTransfer._is_excluded("a/b.log", False, ["*.log"]) is True
+        assert SSHTransfer._is_excluded("a/b.log", False, ["/b.log"]) is False
+    
+    def test_ignored_without_paramiko(self, monkeypatch):
+        """use_paramiko falls back to subprocesses when paramiko is missing."""
+        monkeypatch.setattr('ssh_transfer.PARAMIKO_AVAILABLE', False)
+        
+        assert SSHTransfer(host="test.host.com", use_paramiko=True).use_paramiko is False
+
+
+class TestTransportOptions:
+    """Tests for SSH compression and cipher options."""
+    
+    def test_defaults_compress_with_aes_gcm(self):
+        """ssh and scp compress and put AES-GCM first without dropping other ciphers."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        for cmd in (ssh._get_ssh_command_base(), ssh._get_scp_command_base()):
+            assert "-C" in cmd
+            assert "-c" not in cmd
+            assert "Ciphers=^aes128-gcm@openssh.com" in cmd
+    
+    def test_disabled(self):
+        """compress=False and cipher=None leave OpenSSH defaults."""
+        ssh = SSHTransfer(host="test.host.com", compress=False, cipher=None)
+        
+        cmd = ssh._get_ssh_command_base()
+        assert "-C" not in cmd
+        assert "-c" not in cmd
+        assert not any(arg.startswith("Ciphers=") for arg in cmd)
+    
+    def test_rsync_gets_cipher_without_double_compression(self):
+        """rsync's ssh transport uses the cipher but leaves compression to -z."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        cmd = ssh._build_rsync_command("src/", "dst/", [])
+        ssh_opts = shlex.split(cmd[cmd.index("-e") + 1])
+        
+        assert "Ciphers=^aes128-gcm@openssh.com" in ssh_opts
+        assert "-C" not in ssh_opts
+        assert "Compression=no" in ssh_opts
+    
+    def test_rsync_cipher_override(self):
+        """A custom cipher such as ChaCha20 on ARM hosts reaches rsync's transport."""
+        ssh = SSHTransfer(host="test.host.com", cipher="chacha20-poly1305@openssh.com")
+        
+        cmd = ssh._build_rsync_command("src/", "dst/", [])
+        ssh_opts = shlex.split(cmd[cmd.index("-e") + 1])
+        
+        assert "Ciphers=^chacha20-poly1305@openssh.com" in ssh_opts
+        assert "-c" not in ssh_opts
+    
+    def test_rsync_resumes_into_partial_dir(self):
+        """WAN transfers use light compression and keep interrupted files aside."""
+        cmd = SSHTransfer(host="test.host.com")._build_rsync_command("src/", "dst/", [])
+        
+        assert "--compress-level=1" in cmd
+        assert "--partial-dir=.rsync-partial" in cmd
+        assert "--inplace" not in cmd
+
+
+class TestSpawnOptions:
+    """Tests for launching children in the posix_spawn-friendly way."""
+    
+    def test_absolute_executable_without_closing_fds(self):
+        """Programs are resolved to an absolute path and fds are left to PEP 446."""
+        from ssh_transfer import _spawn_kwargs
+        
+        assert _spawn_kwargs(["sh", "-c", "true"]) == {"close_fds": False, "executable": shutil.which("sh")}
+    
+    def test_unknown_program_left_to_popen(self):
+        """An unresolvable program is passed through, so Popen raises as before."""
+        from ssh_transfer import _spawn_kwargs
+        
+        assert _spawn_kwargs(["no-such-program-xyz"]) == {"close_fds": False}
+    
+    @patch('subprocess.run')
+    def test_execute_command_uses_spawn_options(self, mock_run):
+        """Remote commands are launched with close_fds=False."""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        
+        SSHTransfer(host="test.host.com").execute_command("true")
+        
+        assert mock_run.call_args.kwargs['close_fds'] is False
+
+
+class TestRunWithGrace:
+    """Tests for graceful termination of timed-out commands."""
+    
+    def test_completed_process(self):
+        """Finished commands report their status and output."""
+        result = run_with_grace(
+            ["sh", "-c", "echo out; echo err >&2; exit 3"],
+            timeout=10,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        
+        assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "err\n")
+    
+    def test_sigterm_before_sigkill(self, temp_dir):
+        """A timed-out command receives SIGTERM and can clean up."""
+        marker = os.path.join(temp_dir, "terminated")
+        script = f"trap 'touch {marker}; exit 0' TERM; while :; do sleep 0.05; done"
+        
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_with_grace(["sh", "-c", script], timeout=0.3, grace=5)
+        
+        assert os.path.exists(marker)
+    
+    def test_sigkill_after_grace(self):
+        """A command ignoring SIGTERM is killed once the grace period ends."""
+        start = time.monotonic()
+        
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_with_grace(["sh", "-c", "trap '' TERM; while :; do sleep 0.05; done"], timeout=0.2, grace=0.2)
+        
+        assert time.monotonic() - start < 5
+
+
+class TestCommandBaseCache:
+    """Tests for base commands built once per instance."""
+    
+    def test_base_built_once_and_copied(self):
+        """Each call returns an independent copy of the cached base."""
+        ssh = SSHTransfer(host="test.host.com", port=2222)
+        
+        with patch.object(SSHTransfer, '_build_ssh_base') as mock_build:
+            first = ssh._get_ssh_command_base()
+            first.append("user@host")
+            second = ssh._get_ssh_command_base()
+        
+        mock_build.assert_not_called()
+        assert "user@host" not in second
+        assert second[:3] == ["ssh", "-p", "2222"]
+        assert ssh._get_scp_command_base()[:3] == ["scp", "-P", "2222"]
+    
+    def test_rsync_transport_built_once(self):
+        """rsync commands reuse the -e ssh command built at construction."""
+        ssh = SSHTransfer(host="test.host.com", port=2222)
+        
+        with patch.object(SSHTransfer, '_build_rsync_transport') as mock_build:
+            first = ssh._build_rsync_command("src/", "dst/", [])
+            second = ssh._build_rsync_command("src2/", "dst/", [])
+        
+        mock_build.assert_not_called()
+        assert first[0] == "rsync"
+        assert first[first.index("-e") + 1] == second[second.index("-e") + 1]
+        assert first[first.index("-e") + 1].startswith("ssh -p 2222")
+
+
+class TestRetryLoopSetup:
+    """Tests for work done once per transfer rather than per attempt."""
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    @patch('pathlib.Path.mkdir')
+    def test_download_mkdir_once(self, mock_mkdir, mock_sleep, mock_run):
+        """The local parent directory is created once, not per retry."""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="Network error")
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3)
+        ssh.download_file("/remote/test.txt", "/local/missing/test.txt")
+        
+        assert mock_run.call_count == 3
+        mock_mkdir.assert_called_once()
+    
+    @patch('subprocess.run')
+    def test_download_recreates_deleted_directory(self, mock_run, temp_dir):
+        """A long-lived instance recreates a local directory removed between downloads."""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        export_dir = Path(temp_dir) / "export"
+        
+        ssh = SSHTransfer(host="test.host.com")
+        ssh.download_file("/remote/a.yaml", str(export_dir / "a.yaml"))
+        shutil.rmtree(export_dir)
+        ssh.download_file("/remote/b.yaml", str(export_dir / "b.yaml"))
+        
+        assert export_dir.is_dir()
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    @patch('pathlib.Path.exists', return_value=True)
+    def test_upload_exists_checked_once(self, mock_exists, mock_sleep, mock_run):
+        """The local source is checked once, not per retry."""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="Network error")
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3)
+        ssh.upload_file("/local/test.txt", "/remote/test.txt")
+        
+        assert mock_run.call_count == 3
+        mock_exists.assert_called_once()
+
+
+class TestDownloadVerification:
+    """Tests for skipping re-transfers whose data already landed."""
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_retry_skipped_when_hash_matches(self, mock_sleep, mock_run, temp_dir):
+        """A retry is skipped if the local file already matches the remote hash."""
+        local_path = os.path.join(temp_dir, "test.txt")
+        Path(local_path).write_bytes(b"hello\n")
+        digest = hashlib.sha256(b"hello\n").hexdigest()
+        mock_run.side_effect = [
+            Mock(returncode=1, stdout="", stderr="Connection reset by peer"),
+            Mock(returncode=0, stdout=f"sha256sum\n{digest}  /remote/test.txt\n", stderr=""),
+        ]
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3)
+        
+        assert ssh.download_file("/remote/test.txt", local_path) is True
+        assert mock_run.call_count == 2
+    
+    @patch('subprocess.run')
+    @patch('time.sleep')
+    def test_retry_transfers_when_hash_differs(self, mock_sleep, mock_run, temp_dir):
+        """A partial local file is re-transferred."""
+        local_path = os.path.join(temp_dir, "test.txt")
+        Path(local_path).write_bytes(b"hel")
+        digest = hashlib.sha256(b"hello\n").hexdigest()
+        mock_run.side_effect = [
+            Mock(returncode=1, stdout="", stderr="Connection reset by peer"),
+            Mock(returncode=0, stdout=f"sha256sum\n{digest}  /remote/test.txt\n", stderr=""),
+            Mock(returncode=0, stdout="", stderr=""),
+        ]
+        
+        ssh = SSHTransfer(host="test.host.com", retry_attempts=3)
+        
+        assert ssh.download_file("/remote/test.txt", local_path) is True
+        assert mock_run.call_count == 3
+        assert "scp" in mock_run.call_args.args[0]
+    
+    @patch('subprocess.run')
+    def test_upload_skipped_when_unchanged(self, mock_run, temp_dir):
+        """skip_unchanged uploads nothing when the remote checksum matches."""
+        local_path = os.path.join(temp_dir, "configuration.yaml")
+        Path(local_path).write_bytes(b"hello\n")
+        digest = hashlib.sha256(b"hello\n").hexdigest()
+        mock_run.return_value = Mock(returncode=0, stdout=f"sha256sum\n{digest}  /config/c.yaml\n", stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.upload_file(local_path, "/config/c.yaml", skip_unchanged=True) is True
+        mock_run.assert_called_once()
+        assert "scp" not in mock_run.call_args.args[0]
+    
+    @patch('subprocess.run')
+    def test_download_transfers_when_changed(self, mock_run, temp_dir):
+        """skip_unchanged still downloads when the checksums differ."""
+        local_path = os.path.join(temp_dir, "configuration.yaml")
+        Path(local_path).write_bytes(b"old\n")
+        digest = hashlib.sha256(b"new\n").hexdigest()
+        mock_run.side_effect = [
+            Mock(returncode=0, stdout=f"sha256sum\n{digest}  /config/c.yaml\n", stderr=""),
+            Mock(returncode=0, stdout="", stderr=""),
+        ]
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh.download_file("/config/c.yaml", local_path, skip_unchanged=True) is True
+        assert "scp" in mock_run.call_args.args[0]
+    
+    def test_local_hash_cached_until_file_changes(self, temp_dir, hash_cache):
+        """Local digests are reused from the cache file until size or mtime change."""
+        local_path = os.path.join(temp_dir, "test.txt")
+        Path(local_path).write_bytes(b"hello\n")
+        
+        with patch.object(SSHTransfer, '_local_hash', wraps=SSHTransfer._local_hash) as mock_hash:
+            first = SSHTransfer._cached_local_hash(local_path, "sha256sum")
+            second = SSHTransfer._cached_local_hash(local_path, "sha256sum")
+            Path(local_path).write_bytes(b"changed\n")
+            third = SSHTransfer._cached_local_hash(local_path, "sha256sum")
+        
+        assert first == second == hashlib.sha256(b"hello\n").hexdigest()
+        assert third == hashlib.sha256(b"changed\n").hexdigest()
+        assert mock_hash.call_count == 2
+        assert hash_cache.exists()
+    
+    @patch('subprocess.run')
+    def test_remote_hash_unavailable(self, mock_run):
+        """Hosts without a usable checksum tool report no hash."""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="")
+        
+        assert SSHTransfer(host="test.host.com")._remote_hash("/remote/test.txt") is None
+
+
+class TestBackupCompression:
+    """Tests for multi-core backup compression."""
+    
+    @patch('subprocess.run')
+    def test_zstd_backup(self, mock_run):
+        """zstd archives use all cores and a .tar.zst suffix."""
+        mock_run.side_effect = [
+            Mock(returncode=0, stdout="zstd\n", stderr=""),
+            Mock(returncode=0, stdout=None, stderr=""),
+        ]
+        
+        ssh = SSHTransfer(host="test.host.com")
+        success, backup_path = ssh.backup_remote("/config", "b")
+        
+        assert (success, backup_path) == (True, "/root/b.tar.zst")
+        assert mock_run.call_args.args[0][-1] == (
+            "tar --use-compress-program='zstd -T0 -3' -cf /root/b.tar.zst -C /config ."
+        )
+    
+    @patch('subprocess.run')
+    def test_probe_runs_once(self, mock_run):
+        """The remote compressor is probed once per instance."""
+        mock_run.return_value = Mock(returncode=0, stdout="pigz\n", stderr="")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        ssh._backup_command("/config", "/root/a.tar.gz")
+        command = ssh._backup_command("/config", "/root/b.tar.gz")
+        
+        assert command == "tar --use-compress-program=pigz -cf /root/b.tar.gz -C /config ."
+        mock_run.assert_called_once()
+    
+    @patch('subprocess.run')
+    def test_falls_back_to_gzip(self, mock_run):
+        """An unexpected probe result keeps plain tar -z."""
+        mock_run.return_value = Mock(returncode=127, stdout="", stderr="sh: not found")
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh._backup_command("/config", "/root/b.tar.gz") == "tar -czf /root/b.tar.gz -C /config ."
+
+
+class TestLanMode:
+    """Tests for LAN-tuned rsync transfers."""
+    
+    def test_default_flags_compress(self):
+        """Without lan_mode rsync compresses its delta transfer."""
+        cmd = SSHTransfer(host="test.host.com")._build_rsync_command("src/", "dst/", [])
+        
+        assert "-avz" in cmd
+        assert "--inplace" not in cmd
+    
+    def test_lan_flags(self):
+        """lan_mode copies whole files in place without compression."""
+        cmd = SSHTransfer(host="test.host.com")._build_rsync_command("src/", "dst/", [], lan_mode=True)
+        
+        assert "-avz" not in cmd
+        assert {"-av", "--whole-file", "--inplace"} <= set(cmd)
+    
+    @patch('ssh_transfer.SSHTransfer')
+    def test_manager_passes_lan_mode(self, mock_ssh_class):
+        """lan_mode from the config reaches the transfers, and keeps the backup synchronous."""
+        mock_ssh = Mock()
+        mock_ssh.ensure_connected.return_value = (True, "Connected")
+        mock_ssh.start_backup.return_value = (True, "/root/b.tar.gz", None)
+        mock_ssh.upload_directory.return_value = True
+        mock_ssh.download_directory.return_value = True
+        mock_ssh.execute_script.return_value = (True, {"check": (0, "")}, "")
+        mock_ssh_class.return_value = mock_ssh
+        
+        manager = HARemoteManager({'host': 'ha.local', 'lan_mode': True})
+        manager.export_config("/tmp/export")
+        manager.import_config("/local/config")
+        
+        assert mock_ssh.download_directory.call_args.kwargs['lan_mode'] is True
+        assert mock_ssh.upload_directory.call_args.kwargs['lan_mode'] is True
+        assert mock_ssh.start_backup.call_args.kwargs['background'] is False
+
+
+class TestToolLookup:
+    """Tests for cached local tool lookup."""
+    
+    @patch('subprocess.run')
+    def test_has_rsync_uses_cached_path(self, mock_run):
+        """rsync availability comes from the cached PATH lookup."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(SSHTransfer, '_rsync_path', "/usr/bin/rsync"):
+            assert ssh._has_rsync() is True
+        with patch.object(SSHTransfer, '_rsync_path', None):
+            assert ssh._has_rsync() is False
+        mock_run.assert_not_called()
+    
+    @patch('subprocess.run')
+    def test_remote_rsync_probed_once(self, mock_run):
+        """The remote rsync check runs one ssh probe per instance."""
+        mock_run.return_value = Mock(returncode=0, stdout="yes\n", stderr="")
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(SSHTransfer, '_rsync_path', "/usr/bin/rsync"):
+            assert ssh._can_rsync() is True
+            assert ssh._can_rsync() is True
+        
+        mock_run.assert_called_once()
+    
+    @patch('subprocess.run')
+    def test_missing_remote_rsync_uses_scp(self, mock_run):
+        """Without rsync on the remote host, directories go through scp."""
+        mock_run.side_effect = [
+            Mock(returncode=0, stdout="no\n", stderr=""),
+            Mock(returncode=0, stdout="", stderr=""),
+        ]
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch.object(SSHTransfer, '_rsync_path', "/usr/bin/rsync"), \
+             patch.object(SSHTransfer, '_tar_path', None):
+            assert ssh.upload_directory("/tmp", "/config") is True
+        
+        assert mock_run.call_args.args[0][0] == "scp"
+        assert ssh._remote_rsync is False
+    
+    @patch('subprocess.run')
+    def test_failed_probe_not_cached(self, mock_run):
+        """A probe that could not connect is retried next time."""
+        mock_run.return_value = Mock(returncode=255, stdout="", stderr="Connection refused")
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh._has_remote_rsync() is True
+        assert ssh._remote_rsync is None
+    
+    @patch('shutil.which', return_value="/opt/bin/sshpass")
+    def test_sshpass_resolved_once(self, mock_which):
+        """Password auth runs sshpass by the path resolved at construction."""
+        ssh = SSHTransfer(host="test.host.com", password="secret")
+        
+        assert ssh._get_ssh_command_base()[:2] == ["/opt/bin/sshpass", "-e"]
+        assert ssh._get_scp_command_base()[:2] == ["/opt/bin/sshpass", "-e"]
+        mock_which.assert_called_once_with("sshpass")
+    
+    @patch('shutil.which', return_value=None)
+    def test_missing_sshpass_fails_fast(self, mock_which):
+        """A missing sshpass is reported at construction."""
+        with pytest.raises(FileNotFoundError, match="sshpass"):
+            SSHTransfer(host="test.host.com", password="secret")
+    
+    @patch('shutil.which')
+    def test_key_auth_needs_no_sshpass(self, mock_which):
+        """Key authentication never looks up sshpass."""
+        ssh = SSHTransfer(host="test.host.com", key_path="~/.ssh/id_ed25519", password="secret")
+        
+        assert ssh._sshpass_path is None
+        mock_which.assert_not_called()
+
+
+class TestStreamCommand:
+    """Tests for live-streamed command output."""
+    
+    def test_progress_only_on_terminal(self):
+        """Overall progress is requested only when stdout is a terminal."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch('sys.stdout.isatty', return_value=True):
+            assert "--info=progress2" in ssh._build_rsync_command("src/", "dst/", [])
+        with patch('sys.stdout.isatty', return_value=False):
+            cmd = ssh._build_rsync_command("src/", "dst/", [])
+        assert "--info=progress2" not in cmd
+        assert "--progress" not in cmd
+        assert "--info=stats2" in cmd
+    
+    def test_excludes_passed_as_file(self):
+        """Exclude patterns go to rsync as one filter merge file, reused across commands."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        first = ssh._build_rsync_command("src/", "dst/", ["*.log", "deps/", "*.db", "tts/"])
+        second = ssh._build_rsync_command("src2/", "dst/", ["*.log", "deps/", "*.db", "tts/"])
+        
+        assert "--exclude" not in first
+        option = next(arg for arg in first if arg.startswith("--filter=merge "))
+        assert option in second
+        assert Path(option.split(" ", 1)[1]).read_text() == "- deps/\n- tts/\n- *.log\n- *.db\n"
+    
+    def test_no_exclude_file_without_patterns(self):
+        """Commands without excludes need no filter file."""
+        cmd = SSHTransfer(host="test.host.com")._build_rsync_command("src/", "dst/", [])
+        
+        assert not any(arg.startswith(("--exclude", "--filter")) for arg in cmd)
+    
+    def test_rsync_stall_timeout(self):
+        """rsync exits on its own when the transfer stalls."""
+        cmd = SSHTransfer(host="test.host.com")._build_rsync_command("src/", "dst/", [])
+        
+        assert "--timeout=120" in cmd
+    
+    def test_output_streamed_and_tail_kept(self, capsys):
+        """Output is echoed as it arrives and only the tail is returned."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with patch('ssh_transfer.OUTPUT_TAIL_LINES', 3):
+            returncode, output = ssh._stream_command(
+                ["sh", "-c", "for i in 1 2 3 4 5; do echo line$i; done; echo oops >&2; exit 2"], timeout=10
+            )
+        
+        assert returncode == 2
+        assert output == "line4\nline5\noops\n"
+        assert "line1" in capsys.readouterr().out
+    
+    def test_timeout_kills_command(self):
+        """A command exceeding the timeout is killed and reported."""
+        ssh = SSHTransfer(host="test.host.com")
+        
+        with pytest.raises(subprocess.TimeoutExpired):
+            ssh._stream_command(["sleep", "5"], timeout=0.1)
+    
+    @patch('subprocess.Popen')
+    def test_rsync_download_streams(self, mock_popen, temp_dir):
+        """rsync runs through Popen rather than buffering with subprocess.run."""
+        proc = Mock()
+        proc.stdout = MagicMock(__iter__=Mock(return_value=iter(["file.yaml\n"])))
+        proc.wait.return_value = 0
+        mock_popen.return_value = proc
+        
+        ssh = SSHTransfer(host="test.host.com")
+        
+        assert ssh._rsync_download("/config", os.path.join(temp_dir, "out"), []) is True
+        assert mock_popen.call_args.kwargs['stderr'] == subprocess.STDOUT
+
+
+class TestConnectionPool:
+    """Tests for sharing SSHTransfer instances per endpoint."""
+    
+    def test_same_settings_share_instance(self):
+        """The factory returns one instance per connection identity."""
+        assert get_ssh("a.local", port=22) is get_ssh("a.local", port=22)
+        assert get_ssh("a.local", port=22) is not get_ssh("a.local", port=2222)
+    
+    def test_instances_hash_by_connection(self):
+        """SSHTransfer equality and hash follow the connection identity."""
+        first = SSHTransfer(host="a.local", user="root", port=22)
+        second = SSHTransfer(host="a.local", user="root", port=22, transfer_timeout=5)
+        other = SSHTransfer(host="a.local", user="admin", port=22)
+        
+        assert first == second
+        assert hash(first) == hash(second)
+        assert first != other
+        assert len({first, second, other}) == 2
+    
+    def test_managers_share_connection(self):
+        """Managers for the same host reuse one SSHTransfer."""
+        first = HARemoteManager({'host': 'ha.local', 'remote_config_path': '/config'})
+        second = HARemoteManager({'host': 'ha.local', 'remote_config_path': '/config/packages'})
+        
+        assert first.ssh is second.ssh
 
 
 class TestTimeoutConfiguration:
@@ -493,3 +1743,220 @@ class TestTimeoutConfiguration:
         ssh.execute_command("long_command", timeout=200)
         
         assert mock_run.call_args.kwargs['timeout'] == 200
+
+
+class TestControlMaster:
+    """Tests for OpenSSH ControlMaster multiplexing."""
+
+    @pytest.fixture(autouse=True)
+    def control_dir(self, temp_dir, monkeypatch):
+        """Keep control sockets inside the test's temp directory."""
+        monkeypatch.setattr('ssh_transfer.CONTROL_DIR', temp_dir)
+        return temp_dir
+
+    def test_control_options_in_ssh_and_scp(self, control_dir):
+        """Both ssh and scp reuse the same control socket."""
+        ssh = SSHTransfer(host="test.host.com")
+
+        for cmd in (ssh._get_ssh_command_base(), ssh._get_scp_command_base()):
+            assert "ControlMaster=auto" in cmd
+            assert f"ControlPath={ssh._control_path}" in cmd
+            assert "ControlPersist=60s" in cmd
+            assert "ServerAliveInterval=30" in cmd
+        assert ssh._control_path.startswith(control_dir)
+
+    def test_control_path_per_endpoint(self):
+        """Different endpoints get different sockets, same endpoint shares one."""
+        first = SSHTransfer(host="a.host", port=22)
+        same = SSHTransfer(host="a.host", port=22)
+        other = SSHTransfer(host="a.host", port=2222)
+
+        assert first._control_path == same._control_path
+        assert first._control_path != other._control_path
+
+    @patch('subprocess.run')
+    def test_ensure_connected_skips_probe_with_master(self, mock_run):
+        """A live master is confirmed locally with 'ssh -O check', without a probe."""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        ssh = SSHTransfer(host="test.host.com")
+        Path(ssh._control_path).touch()
+
+        assert ssh.ensure_connected() == (True, "Connection active")
+        mock_run.assert_called_once()
+        cmd = mock_run.call_args.args[0]
+        assert cmd[:3] == ["ssh", "-O", "check"]
+        assert f"ControlPath={ssh._control_path}" in cmd
+
+    @patch('subprocess.run')
+    def test_ensure_connected_probes_with_stale_socket(self, mock_run):
+        """A socket left by a dead master does not count as a connection."""
+        mock_run.side_effect = [
+            Mock(returncode=255, stdout="", stderr="Control socket connect: Connection refused"),
+            Mock(returncode=0, stdout="", stderr=""),
+        ]
+        ssh = SSHTransfer(host="test.host.com")
+        Path(ssh._control_path).touch()
+
+        assert ssh.ensure_connected() == (True, "Connection successful")
+        assert mock_run.call_count == 2
+
+    @patch('subprocess.run')
+    def test_ensure_connected_probes_without_master(self, mock_run):
+        """Without a master, ensure_connected runs a real probe."""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        ssh = SSHTransfer(host="test.host.com")
+
+        assert ssh.ensure_connected() == (True, "Connection successful")
+        mock_run.assert_called_once()
+
+    def test_multiplex_disabled(self):
+        """multiplex=False leaves the commands unchanged."""
+        ssh = SSHTransfer(host="test.host.com", multiplex=False)
+
+        assert ssh._control_path is None
+        assert not any("Control" in arg for arg in ssh._get_ssh_command_base())
+
+    def test_rsync_uses_uncompressed_master(self, temp_dir):
+        """rsync joins its own uncompressed master, since -z already compresses."""
+        ssh = SSHTransfer(host="test.host.com")
+
+        cmd = ssh._build_rsync_command("test.host.com:/config/", os.path.join(temp_dir, "out"), [])
+
+        ssh_opts = cmd[cmd.index("-e") + 1]
+        assert f"ControlPath={ssh._rsync_control_path}" in ssh_opts
+        assert ssh._rsync_control_path != ssh._control_path
+
+    def test_uncompressed_transfers_share_one_master(self):
+        """Without ssh compression, ssh/scp and rsync multiplex over one master."""
+        ssh = SSHTransfer(host="test.host.com", compress=False)
+
+        assert ssh._rsync_control_path == ssh._control_path
+
+    def test_control_path_per_transport_settings(self):
+        """Instances that would open the master differently never share it."""
+        base = SSHTransfer(host="a.host")
+
+        assert SSHTransfer(host="a.host", compress=False)._control_path != base._control_path
+        assert SSHTransfer(host="a.host", cipher=None)._control_path != base._control_path
+
+    @patch('subprocess.run')
+    def test_close_shuts_down_both_masters(self, mock_run):
+        """close() exits the compressed and the rsync master."""
+        ssh = SSHTransfer(host="test.host.com")
+        Path(ssh._control_path).touch()
+        Path(ssh._rsync_control_path).touch()
+
+        ssh.close()
+
+        closed = {c.args[0][c.args[0].index("-o") + 1] for c in mock_run.call_args_list}
+        assert closed == {f"ControlPath={ssh._control_path}", f"ControlPath={ssh._rsync_control_path}"}
+
+    @patch('subprocess.run')
+    def test_close_only_when_master_running(self, mock_run):
+        """close() sends 'ssh -O exit' only if the socket exists."""
+        ssh = SSHTransfer(host="test.host.com")
+
+        ssh.close()
+        mock_run.assert_not_called()
+
+        Path(ssh._control_path).touch()
+        ssh.close()
+        cmd = mock_run.call_args.args[0]
+        assert cmd[:3] == ["ssh", "-O", "exit"]
+        assert f"ControlPath={ssh._control_path}" in cmd
+
+
+def _fake_process(returncode=0, stdout=b"", stderr=b""):
+    """Build a stand-in for an asyncio subprocess."""
+    proc = Mock()
+    proc.returncode = returncode
+    proc.communicate = AsyncMock(return_value=(stdout, stderr))
+    proc.wait = AsyncMock(return_value=returncode)
+    return proc
+
+
+class TestSSHTransferAsync:
+    """Tests for the asyncio transfer API."""
+    
+    @patch('asyncio.create_subprocess_exec', new_callable=AsyncMock)
+    def test_execute_command(self, mock_exec):
+        """Commands run through create_subprocess_exec."""
+        mock_exec.return_value = _fake_process(stdout=b"output")
+        
+        ssh = SSHTransferAsync(SSHTransfer(host="test.host.com"))
+        success, stdout, stderr = asyncio.run(ssh.execute_command("ls"))
+        
+        assert success is True
+        assert stdout == "output"
+        assert mock_exec.call_args.args[-1] == "ls"
+    
+    @patch('shutil.which', return_value="/usr/bin/sshpass")
+    @patch('asyncio.create_subprocess_exec', new_callable=AsyncMock)
+    def test_password_passed_via_child_env(self, mock_exec, mock_which):
+        """SSHPASS goes to the child environment, not os.environ."""
+        mock_exec.return_value = _fake_process()
+        
+        ssh = SSHTransferAsync(SSHTransfer(host="test.host.com", password="secret"))
+        asyncio.run(ssh.execute_command("ls"))
+        
+        assert mock_exec.call_args.kwargs['env']['SSHPASS'] == "secret"
+        assert 'SSHPASS' not in os.environ
+    
+    @patch('asyncio.create_subprocess_exec', new_callable=AsyncMock)
+    def test_ensure_connected_probes_with_stale_socket(self, mock_exec, monkeypatch, tmp_path):
+        """The async check also asks the master instead of trusting the socket file."""
+        mock_exec.side_effect = [_fake_process(returncode=255), _fake_process()]
+        monkeypatch.setattr('ssh_transfer.CONTROL_DIR', str(tmp_path))
+        transfer = SSHTransfer(host="test.host.com")
+        Path(transfer._control_path).touch()
+        
+        ssh = SSHTransferAsync(transfer)
+        assert asyncio.run(ssh.ensure_connected()) == (True, "Connection successful")
+        assert mock_exec.call_args_list[0].args[:3] == ("ssh", "-O", "check")
+    
+    @patch('asyncio.create_subprocess_exec', new_callable=AsyncMock)
+    def test_timeout_kills_process(self, mock_exec):
+        """A command exceeding its timeout is killed."""
+        proc = _fake_process()
+        
+        async def hang():
+            await asyncio.sleep(10)
+        
+        proc.communicate = hang
+        mock_exec.return_value = proc
+        
+        ssh = SSHTransferAsync(SSHTransfer(host="test.host.com"))
+        success, stdout, stderr = asyncio.run(ssh.execute_command("sleep 10", timeout=0.01))
+        
+        assert success is False
+        assert "timeout" in stderr.lower()
+        proc.kill.assert_called_once()
+    
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    @patch('asyncio.create_subprocess_exec', new_callable=AsyncMock)
+    def test_connection_retries_transient(self, mock_exec, mock_sleep):
+        """Transient failures are retried with backoff."""
+        mock_exec.side_effect = [_fake_process(255, stderr=b"Connection reset"), _fake_process()]
+        
+        ssh = SSHTransferAsync(SSHTransfer(host="test.host.com"))
+        
+        assert asyncio.run(ssh.test_connection()) == (True, "Connection successful")
+        mock_sleep.assert_called_once()
+    
+    def test_export_configs_runs_hosts_concurrently(self, temp_dir):
+        """export_configs exports each host into its own directory."""
+        running = []
+        peak = []
+        
+        async def fake_export(self, local_export_dir, exclude_patterns=None):
+            running.append(local_export_dir)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(local_export_dir)
+            return self.ssh.host != "b.local"
+        
+        with patch.object(HARemoteManager, 'export_config_async', fake_export):
+            results = HARemoteManager.export_configs([{'host': 'a.local'}, {'host': 'b.local'}], temp_dir)
+        
+        assert results == {'a.local': True, 'b.local': False}
+        assert max(peak) == 2